@@ -1,4 +1,5 @@
 """Main Flask application for Campus Resource Hub."""
+import click
 from flask import Flask, redirect, url_for
 from flask_login import LoginManager
 from src.database import init_db
@@ -9,16 +10,28 @@ from dotenv import load_dotenv
 # Load environment variables from .env file
 load_dotenv()
 
-def create_app():
-    """Create and configure the Flask application."""
+def create_app(test_config=None):
+    """Create and configure the Flask application.
+    
+    Args:
+        test_config: Optional config overrides applied before the database is
+            initialized (e.g. a temporary SQLALCHEMY_DATABASE_URI for tests)
+    """
     app = Flask(__name__)
     
     # Secret key for sessions
     app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
     
+    if test_config:
+        app.config.update(test_config)
+    
     # Initialize database
     init_db(app)
     
+    # Cache for hot counters (see src/utils/cache.py)
+    from src.utils.cache import init_cache
+    init_cache(app)
+    
     # Setup Flask-Login
     login_manager = LoginManager()
     login_manager.init_app(app)
@@ -51,6 +64,42 @@ def create_app():
     app.register_blueprint(profile_bp, url_prefix='/profile')
     app.register_blueprint(admin_bp, url_prefix='/admin')
     
+    @app.cli.command('recompute-resource-stats')
+    def recompute_resource_stats_command():
+        """Recompute denormalized resource rating/booking counters."""
+        from src.views.resources import recompute_resource_stats
+        repaired = recompute_resource_stats()
+        print(f'Repaired counters on {repaired} resource(s).')
+    
+    @app.cli.command('backfill-conversations')
+    def backfill_conversations_command():
+        """Create conversations for message threads that do not have one."""
+        from src.views.messages import backfill_conversations
+        created = backfill_conversations()
+        print(f'Created {created} conversation(s).')
+    
+    @app.cli.command('complete-past-bookings')
+    def complete_past_bookings_command():
+        """Mark approved bookings that have ended as completed."""
+        from src.utils import mark_past_bookings_completed
+        completed = mark_past_bookings_completed()
+        print(f'Marked {completed} booking(s) completed.')
+    
+    @app.cli.command('update-booking-rollups')
+    @click.option('--full', is_flag=True, help='Rebuild every rollup instead of only changed days.')
+    def update_booking_rollups_command(full):
+        """Update the booking analytics rollups from new or changed bookings."""
+        from src.utils.analytics import update_booking_rollups
+        recomputed = update_booking_rollups(full=full)
+        print(f'Recomputed rollups for {recomputed} resource-day(s).')
+    
+    @app.cli.command('archive-notifications')
+    def archive_notifications_command():
+        """Archive old read notifications and purge expired archived ones."""
+        from src.utils.notifications import apply_notification_retention
+        archived, purged = apply_notification_retention()
+        print(f'Archived {archived} notification(s); purged {purged} archived notification(s).')
+    
     @app.route('/')
     def index():
         """Home page route."""
@@ -66,5 +115,9 @@ if __name__ == '__main__':
     app = create_app()
     # Only run in debug mode if not in production
     debug_mode = os.environ.get('FLASK_ENV') != 'production'
+    # With the debug reloader, only the child process serving requests runs jobs
+    if not debug_mode or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        from src.utils.scheduler import start_background_jobs
+        start_background_jobs(app)
     app.run(debug=debug_mode, host='0.0.0.0', port=5000)
 
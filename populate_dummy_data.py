@@ -1,7 +1,7 @@
 """Script to populate the database with dummy data for testing."""
 from app import create_app
 from src.database import db
-from src.models import User, Resource, ResourceImage, ResourceEquipment, Booking, Review, Message, Notification
+from src.models import User, Resource, ResourceImage, ResourceEquipment, Booking, Review, Message, Notification, Conversation, ConversationParticipant
 from datetime import datetime, timedelta
 import random
 
@@ -13,6 +13,8 @@ def populate_dummy_data():
         # Clear existing data (optional - comment out if you want to keep existing data)
         print("Clearing existing data...")
         Message.query.delete()
+        ConversationParticipant.query.delete()
+        Conversation.query.delete()
         Notification.query.delete()
         Review.query.delete()
         Booking.query.delete()
@@ -118,7 +120,7 @@ def populate_dummy_data():
                 'capacity': 2,
                 'status': 'published',
                 'owner': staff1,
-                'availability_rules': 'Mon-Fri 9AM-6PM (Staff supervision required)',
+                'availability_rules': 'Mon-Fri 9AM-6PM; Max 3h',
                 'requires_approval': True,
                 'images': ['https://images.unsplash.com/photo-1627704671340-0969d7dbac25?w=800'],
                 'equipment': ['Prusa i3 MK3S+', 'PLA/ABS Filaments', 'Design Software', 'Safety Equipment']
@@ -131,7 +133,7 @@ def populate_dummy_data():
                 'capacity': 100,
                 'status': 'published',
                 'owner': admin,
-                'availability_rules': 'Available daily 8AM-11PM with advance booking',
+                'availability_rules': 'Daily 8AM-11PM',
                 'requires_approval': True,
                 'images': ['https://images.unsplash.com/photo-1761344580244-767bc4e2e8c8?w=800'],
                 'equipment': ['Audio System', 'Projector & Screen', '100 Chairs', 'Stage Area', 'Microphones']
@@ -144,7 +146,7 @@ def populate_dummy_data():
                 'capacity': 1,
                 'status': 'published',
                 'owner': staff2,
-                'availability_rules': 'Check-out for up to 3 days, training required',
+                'availability_rules': 'Mon-Fri 9AM-5PM; Min 1h',
                 'requires_approval': True,
                 'images': ['https://images.unsplash.com/photo-1625252698782-6f9614445f60?w=800'],
                 'equipment': ['Sony A7 III Camera', 'LED Light Panel (2x)', 'Tripod', 'Shotgun Microphone', 'SD Cards']
@@ -318,6 +320,10 @@ def populate_dummy_data():
         db.session.commit()
         print(f"Created {len(reviews_data)} reviews")
         
+        # Reviews and bookings above bypass the view paths that maintain counters
+        from src.views.resources import recompute_resource_stats
+        recompute_resource_stats()
+        
         print("Creating messages...")
         # Create some messages
         booking = Booking.query.filter_by(status='pending').first()
@@ -341,6 +347,10 @@ def populate_dummy_data():
             db.session.add(message2)
         
         db.session.commit()
+        
+        # Messages above bypass send_message, which maintains conversations
+        from src.views.messages import backfill_conversations
+        backfill_conversations()
         print("Created sample messages")
         
         print("\n" + "="*60)
@@ -1,28 +1,221 @@
 """Database configuration and initialization."""
 from flask_sqlalchemy import SQLAlchemy
 from flask import Flask
+from sqlalchemy import event, inspect, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.schema import CreateIndex
 import os
 
 db = SQLAlchemy()
 
+# PRAGMAs applied to every new SQLite connection. Each can be overridden with
+# an environment variable of the same name prefixed with SQLITE_ (for example
+# SQLITE_BUSY_TIMEOUT=10000).
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',        # Readers no longer block on the writer
+    'synchronous': 'NORMAL',      # Safe with WAL; fsync only at checkpoints
+    'busy_timeout': '5000',       # ms to wait for the write lock before "database is locked"
+    'cache_size': '-64000',       # Negative = KiB, so 64 MB of page cache per connection
+    'mmap_size': '268435456',     # 256 MB memory-mapped I/O
+    'temp_store': 'MEMORY',
+}
 
-def init_db(app: Flask):
-    """Initialize the database with the Flask app."""
-    # Configure SQLite database
+
+def get_database_url():
+    """Database URL from DATABASE_URL, defaulting to the SQLite file in instance/."""
+    url = os.environ.get('DATABASE_URL')
+    if url:
+        # Some hosts still hand out the scheme SQLAlchemy 1.4+ no longer accepts
+        if url.startswith('postgres://'):
+            url = 'postgresql://' + url[len('postgres://'):]
+        return url
+    
     basedir = os.path.abspath(os.path.dirname(__file__))
     db_path = os.path.join(basedir, '..', 'instance', 'campus_resource_hub.db')
     
     # Ensure instance directory exists
     os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    return f'sqlite:///{db_path}'
+
+
+def get_engine_options(url):
+    """
+    Engine/pool options for a database URL, read from the environment.
+    
+    Supported variables: DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT,
+    DB_POOL_RECYCLE (seconds) and DB_POOL_PRE_PING (true/false). Pool sizing
+    is only passed when set, since in-memory SQLite uses a pool without it.
+    
+    Args:
+        url: Database URL
+    
+    Returns:
+        dict: Keyword arguments for create_engine / SQLALCHEMY_ENGINE_OPTIONS
+    """
+    options = {
+        'pool_pre_ping': os.environ.get('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes'),
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+    }
+    for env_name, option in (('DB_POOL_SIZE', 'pool_size'),
+                             ('DB_MAX_OVERFLOW', 'max_overflow'),
+                             ('DB_POOL_TIMEOUT', 'pool_timeout')):
+        if os.environ.get(env_name):
+            options[option] = int(os.environ[env_name])
+    
+    if make_url(url).get_backend_name() == 'sqlite':
+        # Connections are handed between request threads by the pool
+        options['connect_args'] = {'check_same_thread': False}
+    return options
+
+
+def get_sqlite_pragmas():
+    """SQLITE_PRAGMAS with any SQLITE_<NAME> environment overrides applied."""
+    return {name: os.environ.get(f'SQLITE_{name.upper()}', value)
+            for name, value in SQLITE_PRAGMAS.items()}
+
+
+def configure_engine(engine, pragmas=None):
+    """
+    Apply connection-level tuning to an engine.
+    
+    For SQLite, runs the PRAGMAs on every new DBAPI connection; other
+    databases are left to their server configuration.
+    
+    Args:
+        engine: SQLAlchemy Engine
+        pragmas: Optional dict overriding get_sqlite_pragmas()
+    """
+    if engine.dialect.name != 'sqlite':
+        return
+    pragmas = get_sqlite_pragmas() if pragmas is None else pragmas
+    
+    @event.listens_for(engine, 'connect')
+    def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f'PRAGMA {name}={value}')
+        finally:
+            cursor.close()
+
+
+def init_db(app: Flask):
+    """Initialize the database with the Flask app.
     
-    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+    The database URL comes from app.config['SQLALCHEMY_DATABASE_URI'] when
+    already set (e.g. by tests), otherwise from DATABASE_URL / instance/.
+    """
+    url = app.config.get('SQLALCHEMY_DATABASE_URI') or get_database_url()
+    app.config['SQLALCHEMY_DATABASE_URI'] = url
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', get_engine_options(url))
     
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     
     db.init_app(app)
     
+    with app.app_context():
+        configure_engine(db.engine)
+    
+    # Registers the full-text index DDL hooks before tables are created
+    from src.utils.search import init_search_index
+    
     with app.app_context():
         db.create_all()
+        added_columns = upgrade_schema()
+        app.config['SEARCH_FTS_ENABLED'] = init_search_index()
+        
+        # Counters added to an existing database start at zero; backfill them
+        if any(table == 'resources' for table, _ in added_columns):
+            from src.views.resources import recompute_resource_stats
+            recompute_resource_stats()
+        
+        # Conversations were introduced after messages; build them from the message log
+        if ('messages', 'conversation_id') in added_columns:
+            from src.views.messages import backfill_conversations
+            backfill_conversations()
     
     return db
 
+
+def upgrade_schema():
+    """Bring an existing database up to date with the models.
+    
+    db.create_all() only creates missing tables, so columns and indexes added
+    to models after a database was first created are added here. New columns
+    must be nullable or carry a server_default.
+    
+    Returns:
+        list: (table, column) pairs that were added
+    """
+    inspector = inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    added_columns = []
+    
+    with db.engine.begin() as connection:
+        for table in db.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            
+            existing_columns = {col['name'] for col in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns:
+                    continue
+                column_type = column.type.compile(dialect=db.engine.dialect)
+                ddl = f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'
+                if column.server_default is not None:
+                    default = column.server_default.arg
+                    if isinstance(default, str):
+                        default = "'" + default.replace("'", "''") + "'"
+                    else:
+                        default = default.text
+                    ddl += f' DEFAULT {default}'
+                if not column.nullable:
+                    ddl += ' NOT NULL'
+                connection.execute(text(ddl))
+                added_columns.append((table.name, column.name))
+            
+            for index in table.indexes:
+                connection.execute(CreateIndex(index, if_not_exists=True))
+    
+    return added_columns
+
+
+def begin_transaction():
+    """Make sure the current transaction has started on the database.
+    
+    pysqlite only sends BEGIN before the first write, so a SAVEPOINT taken
+    after nothing but SELECTs becomes the outermost transaction and its
+    RELEASE commits. Call this before db.session.begin_nested() so the
+    savepoint nests inside the request's transaction. Other drivers begin
+    before the first statement and need nothing.
+    """
+    connection = db.session.connection()
+    if connection.dialect.name == 'sqlite':
+        dbapi_connection = connection.connection.dbapi_connection
+        if not dbapi_connection.in_transaction:
+            connection.exec_driver_sql('BEGIN')
+
+
+def acquire_resource_lock(resource_id):
+    """Serialize booking writes for a resource until the current transaction ends.
+    
+    Call this before checking for conflicts and inserting a booking, so two
+    concurrent requests cannot both pass the check for the same slot.
+    
+    - SQLite: starts the transaction with BEGIN IMMEDIATE, taking the database
+      write lock up front (other writers wait on the busy timeout). If the
+      connection is already in a transaction it has already written, and
+      therefore already holds the write lock.
+    - Other databases: locks the resource row with SELECT ... FOR UPDATE,
+      which serializes writers per resource only.
+    """
+    connection = db.session.connection()
+    if connection.dialect.name == 'sqlite':
+        dbapi_connection = connection.connection.dbapi_connection
+        if not dbapi_connection.in_transaction:
+            connection.exec_driver_sql('BEGIN IMMEDIATE')
+    else:
+        from src.models import Resource
+        connection.execute(
+            db.select(Resource.id).where(Resource.id == resource_id).with_for_update()
+        )
@@ -4,7 +4,9 @@ from src.models.resource import Resource, ResourceImage, ResourceEquipment
 from src.models.booking import Booking
 from src.models.review import Review
 from src.models.message import Message
-from src.models.notification import Notification
+from src.models.conversation import Conversation, ConversationParticipant
+from src.models.notification import Notification, NotificationArchive
+from src.models.analytics import HourlyBookingRollup, DailyBookingRollup, JobWatermark
 
 __all__ = [
     'User',
@@ -14,5 +16,11 @@ __all__ = [
     'Booking',
     'Review',
     'Message',
-    'Notification'
+    'Conversation',
+    'ConversationParticipant',
+    'Notification',
+    'NotificationArchive',
+    'HourlyBookingRollup',
+    'DailyBookingRollup',
+    'JobWatermark'
 ]
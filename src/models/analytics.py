@@ -0,0 +1,74 @@
+"""Booking analytics rollup models for the Campus Resource Hub."""
+from sqlalchemy.orm import declared_attr
+from src.database import db
+
+
+class BookingRollupMixin:
+    """Booking metrics of one resource over one period.
+    
+    Bookings are counted in the period they start in; booked minutes of
+    approved and completed bookings are split across every period they overlap.
+    """
+    
+    PERIOD_MINUTES = None
+    
+    id = db.Column(db.Integer, primary_key=True)
+    period_start = db.Column(db.DateTime, nullable=False)
+    bookings = db.Column(db.Integer, default=0, nullable=False)  # Every booking starting in the period
+    approved = db.Column(db.Integer, default=0, nullable=False)  # Approved or completed
+    rejected = db.Column(db.Integer, default=0, nullable=False)
+    cancelled = db.Column(db.Integer, default=0, nullable=False)
+    booked_minutes = db.Column(db.Integer, default=0, nullable=False)
+    
+    @declared_attr
+    def resource_id(cls):
+        return db.Column(db.Integer, db.ForeignKey('resources.id', ondelete='CASCADE'), nullable=False)
+    
+    @property
+    def utilization(self):
+        """Fraction of the period the resource was booked."""
+        return self.booked_minutes / self.PERIOD_MINUTES
+
+
+class HourlyBookingRollup(BookingRollupMixin, db.Model):
+    """Booking metrics per resource per hour."""
+    
+    __tablename__ = 'booking_rollups_hourly'
+    
+    PERIOD_MINUTES = 60
+    
+    __table_args__ = (
+        db.UniqueConstraint('resource_id', 'period_start', name='unique_hourly_rollup'),
+        db.Index('ix_booking_rollups_hourly_period', 'period_start'),
+    )
+    
+    def __repr__(self):
+        return f'<HourlyBookingRollup {self.resource_id} {self.period_start}>'
+
+
+class DailyBookingRollup(BookingRollupMixin, db.Model):
+    """Booking metrics per resource per day."""
+    
+    __tablename__ = 'booking_rollups_daily'
+    
+    PERIOD_MINUTES = 24 * 60
+    
+    __table_args__ = (
+        db.UniqueConstraint('resource_id', 'period_start', name='unique_daily_rollup'),
+        db.Index('ix_booking_rollups_daily_period', 'period_start'),
+    )
+    
+    def __repr__(self):
+        return f'<DailyBookingRollup {self.resource_id} {self.period_start}>'
+
+
+class JobWatermark(db.Model):
+    """How far an incremental background job has processed its source rows."""
+    
+    __tablename__ = 'job_watermarks'
+    
+    name = db.Column(db.String(100), primary_key=True)
+    value = db.Column(db.DateTime, nullable=False)
+    
+    def __repr__(self):
+        return f'<JobWatermark {self.name} {self.value}>'
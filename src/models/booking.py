@@ -16,11 +16,33 @@ class Booking(db.Model):
     status = db.Column(db.String(20), nullable=False, default='pending')  # pending, approved, rejected, completed, cancelled
     notes = db.Column(db.Text, nullable=True)
     recurrence = db.Column(db.String(20), nullable=True, default='none')  # none, daily, weekly
+    series_id = db.Column(db.String(32), nullable=True, index=True)  # Shared by all occurrences of a recurring booking
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     
+    # Composite indexes for conflict detection range scans
+    __table_args__ = (
+        db.Index('ix_bookings_resource_status_time', 'resource_id', 'status', 'start_time', 'end_time'),
+        db.Index('ix_bookings_user_status_start', 'user_id', 'status', 'start_time'),
+        db.Index('ix_bookings_user_start', 'user_id', 'start_time', 'id'),  # Past bookings pages
+        db.Index('ix_bookings_status_end', 'status', 'end_time'),  # Completed-booking sweep
+        db.Index('ix_bookings_updated', 'updated_at'),  # Analytics rollup watermark
+        db.Index('ix_bookings_created', 'created_at'),  # Recent activity
+    )
+    
     # Relationships (backref is defined in Resource model)
     
+    @property
+    def effective_status(self):
+        """Status as seen by users: approved bookings that have ended read as completed.
+        
+        The background sweep persists this periodically, so an approved booking
+        may still be stored as approved for a short while after it ends.
+        """
+        if self.status == 'approved' and self.end_time < datetime.utcnow():
+            return 'completed'
+        return self.status
+    
     def __repr__(self):
         return f'<Booking {self.id}>'
 
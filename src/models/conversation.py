@@ -0,0 +1,57 @@
+"""Conversation models for the Campus Resource Hub."""
+from datetime import datetime
+from src.database import db
+
+
+class Conversation(db.Model):
+    """Conversation model: one per message thread, with its latest activity materialized."""
+    
+    __tablename__ = 'conversations'
+    
+    PREVIEW_LENGTH = 200
+    
+    id = db.Column(db.Integer, primary_key=True)
+    thread_id = db.Column(db.String(100), nullable=False, unique=True)  # resource_<id>, booking_<id> or direct_<user>_<user>
+    resource_id = db.Column(db.Integer, db.ForeignKey('resources.id', ondelete='SET NULL'), nullable=True)
+    booking_id = db.Column(db.Integer, db.ForeignKey('bookings.id', ondelete='SET NULL'), nullable=True)
+    last_message_at = db.Column(db.DateTime, nullable=True)
+    last_message_preview = db.Column(db.String(PREVIEW_LENGTH), nullable=True)
+    last_sender_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    # Relationships
+    participants = db.relationship('ConversationParticipant', backref='conversation', lazy='dynamic',
+                                   cascade='all, delete-orphan')
+    messages = db.relationship('Message', backref='conversation', lazy='dynamic')
+    resource = db.relationship('Resource')
+    booking = db.relationship('Booking')
+    
+    def __repr__(self):
+        return f'<Conversation {self.thread_id}>'
+
+
+class ConversationParticipant(db.Model):
+    """A user's membership in a conversation, with their unread count.
+    
+    last_message_at is copied from the conversation so a user's inbox is a
+    single index range scan on (user_id, last_message_at).
+    """
+    
+    __tablename__ = 'conversation_participants'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    conversation_id = db.Column(db.Integer, db.ForeignKey('conversations.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    unread_count = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    last_message_at = db.Column(db.DateTime, nullable=True)
+    
+    __table_args__ = (
+        db.UniqueConstraint('conversation_id', 'user_id', name='unique_conversation_participant'),
+        db.Index('ix_conversation_participants_user_last', 'user_id', last_message_at.desc()),
+    )
+    
+    # Relationships
+    user = db.relationship('User')
+    
+    def __repr__(self):
+        return f'<ConversationParticipant {self.conversation_id}:{self.user_id}>'
@@ -10,12 +10,18 @@ class Message(db.Model):
     
     id = db.Column(db.Integer, primary_key=True)
     thread_id = db.Column(db.String(100), nullable=True, index=True)  # Can link to booking_id or be a conversation thread
-    sender_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    receiver_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    conversation_id = db.Column(db.Integer, db.ForeignKey('conversations.id'), nullable=True, index=True)
+    sender_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    receiver_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     content = db.Column(db.Text, nullable=False)
     read = db.Column(db.Boolean, default=False, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     
+    # Thread history is paged newest-first by (created_at, id) within a thread
+    __table_args__ = (
+        db.Index('ix_messages_thread_created', 'thread_id', 'created_at'),
+    )
+    
     def __repr__(self):
         return f'<Message {self.id}>'
 
@@ -17,6 +17,31 @@ class Notification(db.Model):
     link = db.Column(db.String(500), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     
+    __table_args__ = (
+        db.Index('ix_notifications_user_created', 'user_id', 'created_at'),  # Paged notification list
+        db.Index('ix_notifications_user_read_created', 'user_id', 'read', 'created_at'),  # Unread counts, bulk state changes
+        db.Index('ix_notifications_read_created', 'read', 'created_at'),  # Retention sweep
+    )
+    
     def __repr__(self):
         return f'<Notification {self.id}>'
 
+
+class NotificationArchive(db.Model):
+    """Read notifications moved out of the notifications table by the retention job."""
+    
+    __tablename__ = 'notifications_archive'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    notification_id = db.Column(db.Integer, nullable=False, index=True)  # Id the row had in notifications
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    type = db.Column(db.String(50), nullable=False)
+    title = db.Column(db.String(255), nullable=False)
+    message = db.Column(db.Text, nullable=False)
+    link = db.Column(db.String(500), nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+    
+    def __repr__(self):
+        return f'<NotificationArchive {self.id}>'
+
@@ -1,5 +1,7 @@
 """Resource model for the Campus Resource Hub."""
 from datetime import datetime
+from sqlalchemy import case
+from sqlalchemy.ext.hybrid import hybrid_property
 from src.database import db
 
 
@@ -9,7 +11,7 @@ class Resource(db.Model):
     __tablename__ = 'resources'
     
     id = db.Column(db.Integer, primary_key=True)
-    title = db.Column(db.String(255), nullable=False)
+    title = db.Column(db.String(255), nullable=False, index=True)
     description = db.Column(db.Text, nullable=False)
     category = db.Column(db.String(50), nullable=False)  # study-room, lab-equipment, event-space, av-equipment, tutoring, other
     location = db.Column(db.String(255), nullable=False)
@@ -18,19 +20,44 @@ class Resource(db.Model):
     owner_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     availability_rules = db.Column(db.Text, nullable=True)
     requires_approval = db.Column(db.Boolean, default=False, nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     
+    # Denormalized counters, maintained by the review/booking write paths
+    rating_sum = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    review_count = db.Column(db.Integer, default=0, server_default='0', nullable=False, index=True)
+    booking_count = db.Column(db.Integer, default=0, server_default='0', nullable=False, index=True)
+    
+    # Bumped with every booking write that changes this resource's calendar (see src.utils.calendar_feed)
+    calendar_version = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    
     # Relationships
     images = db.relationship('ResourceImage', backref='resource', lazy='dynamic', cascade='all, delete-orphan')
     equipment = db.relationship('ResourceEquipment', backref='resource', lazy='dynamic', cascade='all, delete-orphan')
     bookings = db.relationship('Booking', backref='resource', lazy='dynamic', cascade='all, delete-orphan')
     reviews = db.relationship('Review', backref='resource', lazy='dynamic', cascade='all, delete-orphan')
     
+    @hybrid_property
+    def rating(self):
+        """Average review rating, or 0.0 when the resource has no reviews."""
+        if not self.review_count:
+            return 0.0
+        return round(self.rating_sum / self.review_count, 1)
+    
+    @rating.expression
+    def rating(cls):
+        return case(
+            (cls.review_count > 0, cls.rating_sum * 1.0 / cls.review_count),
+            else_=0.0
+        )
+    
     def __repr__(self):
         return f'<Resource {self.title}>'
 
 
+db.Index('ix_resources_rating', Resource.rating)
+
+
 class ResourceImage(db.Model):
     """Resource images model."""
     
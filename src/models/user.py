@@ -13,11 +13,11 @@ class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     email = db.Column(db.String(255), unique=True, nullable=False, index=True)
     password_hash = db.Column(db.String(255), nullable=False)
-    name = db.Column(db.String(255), nullable=False)
+    name = db.Column(db.String(255), nullable=False, index=True)
     role = db.Column(db.String(20), nullable=False, default='student')  # student, staff, admin
     department = db.Column(db.String(255), nullable=True)
     profile_image = db.Column(db.String(500), nullable=True)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
     
     # Relationships
     resources = db.relationship('Resource', backref='owner', lazy='dynamic', cascade='all, delete-orphan')
@@ -93,23 +93,28 @@ def delete_profile_picture(image_path):
 
 
 def mark_past_bookings_completed():
-    """Mark approved bookings that have passed their end time as completed."""
+    """
+    Mark approved bookings that have passed their end time as completed.
+    
+    Runs as one set-based UPDATE and is meant to be called from the background
+    sweep (see src.utils.scheduler), not from request handlers; views derive
+    "completed" at read time via Booking.effective_status.
+    
+    Returns:
+        int: Number of bookings marked completed
+    """
     from datetime import datetime
+    from sqlalchemy import update
     from src.database import db
     from src.models import Booking
     
     now = datetime.utcnow()
     
-    # Find all approved bookings that have ended
-    past_bookings = Booking.query.filter(
-        Booking.status == 'approved',
-        Booking.end_time < now
-    ).all()
-    
-    # Mark them as completed
-    for booking in past_bookings:
-        booking.status = 'completed'
-    
-    if past_bookings:
-        db.session.commit()
-
+    result = db.session.execute(
+        update(Booking)
+        .where(Booking.status == 'approved', Booking.end_time < now)
+        .values(status='completed', updated_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return result.rowcount
@@ -0,0 +1,104 @@
+"""Overview statistics shown on every admin tab.
+
+All four numbers are read in one SELECT of scalar subqueries and cached for
+ADMIN_STATS_TTL seconds. Commits that add or delete users, resources or
+bookings, or change a resource or booking status, drop the cached numbers
+automatically; code that changes those rows with bulk statements calls
+invalidate_admin_stats() instead.
+"""
+import os
+from flask import current_app
+from sqlalchemy import event, func, inspect, select
+from src.database import db
+from src.utils.cache import get_cache
+
+DEFAULT_TTL = 10  # seconds
+
+STAT_NAMES = ('total_users', 'active_resources', 'pending_approvals', 'total_bookings')
+
+_STALE_KEY = 'admin_stats_stale'
+
+
+def _cache_key(name):
+    return f'admin_stats:{name}'
+
+
+def _stats_query():
+    """One SELECT returning every overview number as a column."""
+    from src.models import Booking, Resource, User
+    
+    return select(
+        select(func.count(User.id)).scalar_subquery().label('total_users'),
+        select(func.count(Resource.id)).where(Resource.status == 'published')
+            .scalar_subquery().label('active_resources'),
+        select(func.count(Booking.id)).where(Booking.status == 'pending')
+            .scalar_subquery().label('pending_approvals'),
+        select(func.count(Booking.id)).scalar_subquery().label('total_bookings')
+    )
+
+
+def get_admin_stats():
+    """
+    Get the admin overview numbers, from the cache when possible.
+    
+    Returns:
+        dict: total_users, active_resources, pending_approvals and total_bookings
+    """
+    cache = get_cache()
+    keys = [_cache_key(name) for name in STAT_NAMES]
+    cached = cache.get_many(keys)
+    if None not in cached:
+        return dict(zip(STAT_NAMES, cached))
+    
+    stats = dict(db.session.execute(_stats_query()).one()._mapping)
+    ttl = int(current_app.config.get('ADMIN_STATS_TTL', os.environ.get('ADMIN_STATS_TTL', DEFAULT_TTL)))
+    for name, key in zip(STAT_NAMES, keys):
+        cache.set(key, stats[name], ttl=ttl)
+    return stats
+
+
+def invalidate_admin_stats(session=None):
+    """
+    Drop the cached overview numbers once the current transaction commits.
+    
+    Args:
+        session: Session the change was made in (defaults to db.session)
+    """
+    session = session or db.session
+    session.info[_STALE_KEY] = True
+
+
+def _changes_stats(obj):
+    """Whether a dirty object's change can move an overview number."""
+    from src.models import Booking, Resource
+    
+    if isinstance(obj, (Booking, Resource)):
+        return inspect(obj).attrs.status.history.has_changes()
+    return False
+
+
+@event.listens_for(db.session, 'after_flush')
+def _detect_stats_changes(session, flush_context):
+    """Mark the overview numbers stale when a flush touches the rows they count."""
+    from src.models import Booking, Resource, User
+    
+    counted = (Booking, Resource, User)
+    if any(isinstance(obj, counted) for obj in session.new) \
+            or any(isinstance(obj, counted) for obj in session.deleted) \
+            or any(_changes_stats(obj) for obj in session.dirty):
+        session.info[_STALE_KEY] = True
+
+
+@event.listens_for(db.session, 'after_commit')
+def _drop_stale_stats(session):
+    """Drop the cached overview numbers after a commit that changed them."""
+    if session.info.pop(_STALE_KEY, False):
+        cache = get_cache()
+        for name in STAT_NAMES:
+            cache.delete(_cache_key(name))
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _keep_stats_on_rollback(session):
+    """A rolled back transaction changed nothing."""
+    session.info.pop(_STALE_KEY, None)
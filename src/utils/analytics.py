@@ -0,0 +1,228 @@
+"""Booking analytics rollups for the Campus Resource Hub.
+
+Hourly and daily booking metrics per resource are kept in the
+booking_rollups_hourly and booking_rollups_daily tables so dashboards never
+scan the raw bookings table. update_booking_rollups() maintains them
+incrementally: it finds bookings created or changed since its watermark and
+recomputes only the (resource, day) pairs those bookings touch.
+
+Booking writes only ever move a booking within its day, so recomputing the
+current days of changed bookings is enough. Bookings removed by deleting a
+user are not seen; `flask update-booking-rollups --full` rebuilds everything.
+"""
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from sqlalchemy import and_, delete, extract, func, insert, or_, select
+from src.database import db
+from src.models import Booking, DailyBookingRollup, HourlyBookingRollup, JobWatermark, Resource
+
+WATERMARK_NAME = 'booking_rollups'
+
+# Changed bookings are looked up this far before the watermark, so a write that
+# committed after a run started but carries an earlier updated_at is not missed
+WATERMARK_OVERLAP = timedelta(minutes=5)
+
+# (resource, day) pairs recomputed per transaction
+ROLLUP_BATCH_SIZE = 200
+
+APPROVED_STATUSES = ('approved', 'completed')
+
+_METRICS = ('bookings', 'approved', 'rejected', 'cancelled', 'booked_minutes')
+
+
+def _days_touched(start_time, end_time):
+    """Dates a booking overlaps."""
+    day = start_time.date()
+    last = max(start_time, end_time - timedelta(microseconds=1)).date()
+    days = []
+    while day <= last:
+        days.append(day)
+        day += timedelta(days=1)
+    return days
+
+
+def _add_booking(hourly, booking, days):
+    """Add a booking's contribution to the hourly buckets of the given days."""
+    start_hour = booking.start_time.replace(minute=0, second=0, microsecond=0)
+    if start_hour.date() in days:
+        bucket = hourly[(booking.resource_id, start_hour)]
+        bucket['bookings'] += 1
+        if booking.status in APPROVED_STATUSES:
+            bucket['approved'] += 1
+        elif booking.status in ('rejected', 'cancelled'):
+            bucket[booking.status] += 1
+    
+    if booking.status not in APPROVED_STATUSES:
+        return
+    hour = start_hour
+    while hour < booking.end_time:
+        next_hour = hour + timedelta(hours=1)
+        if hour.date() in days:
+            overlap = min(next_hour, booking.end_time) - max(hour, booking.start_time)
+            hourly[(booking.resource_id, hour)]['booked_minutes'] += int(overlap.total_seconds() // 60)
+        hour = next_hour
+
+
+def _recompute_days(resource_id, days):
+    """Rebuild the hourly and daily rollups of one resource on the given days."""
+    day_bounds = [(datetime.combine(day, time.min), datetime.combine(day, time.min) + timedelta(days=1))
+                  for day in days]
+    
+    bookings = Booking.query.filter(
+        Booking.resource_id == resource_id,
+        or_(*[and_(Booking.start_time < day_end, Booking.end_time > day_start)
+              for day_start, day_end in day_bounds])
+    ).all()
+    
+    hourly = defaultdict(lambda: dict.fromkeys(_METRICS, 0))
+    for booking in bookings:
+        _add_booking(hourly, booking, days)
+    
+    daily = defaultdict(lambda: dict.fromkeys(_METRICS, 0))
+    for (_, hour), metrics in hourly.items():
+        day_metrics = daily[datetime.combine(hour.date(), time.min)]
+        for name in _METRICS:
+            day_metrics[name] += metrics[name]
+    
+    for model in (HourlyBookingRollup, DailyBookingRollup):
+        db.session.execute(delete(model).where(
+            model.resource_id == resource_id,
+            or_(*[and_(model.period_start >= day_start, model.period_start < day_end)
+                  for day_start, day_end in day_bounds])
+        ))
+    if hourly:
+        db.session.execute(insert(HourlyBookingRollup), [
+            dict(metrics, resource_id=resource_id, period_start=hour)
+            for (_, hour), metrics in hourly.items()
+        ])
+        db.session.execute(insert(DailyBookingRollup), [
+            dict(metrics, resource_id=resource_id, period_start=day)
+            for day, metrics in daily.items()
+        ])
+
+
+def update_booking_rollups(full=False, batch_size=ROLLUP_BATCH_SIZE):
+    """
+    Bring the booking rollups up to date with the bookings table.
+    
+    Args:
+        full: Rebuild every rollup instead of only the days changed since the watermark
+        batch_size: (resource, day) pairs recomputed per transaction
+    
+    Returns:
+        int: Number of (resource, day) pairs recomputed
+    """
+    run_started = datetime.utcnow()
+    watermark = db.session.get(JobWatermark, WATERMARK_NAME)
+    
+    changed = db.session.query(Booking.resource_id, Booking.start_time, Booking.end_time)
+    if full or watermark is None:
+        db.session.execute(delete(HourlyBookingRollup))
+        db.session.execute(delete(DailyBookingRollup))
+    else:
+        changed = changed.filter(Booking.updated_at >= watermark.value - WATERMARK_OVERLAP)
+    
+    affected = defaultdict(set)
+    for resource_id, start_time, end_time in changed:
+        affected[resource_id].update(_days_touched(start_time, end_time))
+    
+    pairs = [(resource_id, day) for resource_id in sorted(affected) for day in sorted(affected[resource_id])]
+    for i in range(0, len(pairs), batch_size):
+        by_resource = defaultdict(set)
+        for resource_id, day in pairs[i:i + batch_size]:
+            by_resource[resource_id].add(day)
+        for resource_id, days in by_resource.items():
+            _recompute_days(resource_id, days)
+        db.session.commit()
+    
+    # Rollups of deleted resources
+    for model in (HourlyBookingRollup, DailyBookingRollup):
+        db.session.execute(delete(model).where(model.resource_id.not_in(select(Resource.id))))
+    
+    if watermark is None:
+        db.session.add(JobWatermark(name=WATERMARK_NAME, value=run_started))
+    else:
+        watermark.value = run_started
+    db.session.commit()
+    return len(pairs)
+
+
+def _window(days):
+    """The last `days` days up to the end of today, as [since, until)."""
+    until = datetime.combine(datetime.utcnow().date(), time.min) + timedelta(days=1)
+    return until - timedelta(days=days), until
+
+
+def get_top_resources(days=30, limit=5):
+    """
+    Resources with the most bookings starting in the last `days` days, up to
+    the end of today.
+    
+    Returns:
+        list: (resource_id, title, booking_count) tuples, most booked first
+    """
+    since, until = _window(days)
+    total = func.sum(DailyBookingRollup.bookings).label('booking_count')
+    return db.session.query(Resource.id, Resource.title, total)\
+        .join(DailyBookingRollup, DailyBookingRollup.resource_id == Resource.id)\
+        .filter(DailyBookingRollup.period_start >= since, DailyBookingRollup.period_start < until)\
+        .group_by(Resource.id, Resource.title)\
+        .order_by(total.desc(), Resource.id)\
+        .limit(limit).all()
+
+
+def get_category_booking_stats(days=30):
+    """
+    Booking metrics per resource category over the last `days` days, up to
+    the end of today.
+    
+    Utilization is booked time as a fraction of all the time every resource in
+    the category could have been booked.
+    
+    Returns:
+        list: dicts with category, bookings, approved, rejected, cancelled,
+              booked_minutes, approval_rate (None without decisions) and utilization
+    """
+    since, until = _window(days)
+    rows = db.session.query(
+        Resource.category,
+        func.count(func.distinct(Resource.id)),
+        *[func.sum(getattr(DailyBookingRollup, name)) for name in _METRICS]
+    ).join(DailyBookingRollup, DailyBookingRollup.resource_id == Resource.id)\
+     .filter(DailyBookingRollup.period_start >= since, DailyBookingRollup.period_start < until)\
+     .group_by(Resource.category)\
+     .order_by(Resource.category).all()
+    
+    resource_counts = dict(db.session.query(Resource.category, func.count(Resource.id))
+                           .filter(Resource.status == 'published')
+                           .group_by(Resource.category).all())
+    
+    stats = []
+    for category, booked_resources, *totals in rows:
+        metrics = dict(zip(_METRICS, totals))
+        decided = metrics['approved'] + metrics['rejected']
+        resources = max(resource_counts.get(category, 0), booked_resources)
+        stats.append(dict(
+            metrics,
+            category=category,
+            approval_rate=metrics['approved'] / decided if decided else None,
+            utilization=metrics['booked_minutes'] / (resources * days * 24 * 60)
+        ))
+    return stats
+
+
+def get_busiest_hours(days=30):
+    """
+    Number of bookings starting in each hour of the day over the last `days`
+    days, up to the end of today.
+    
+    Returns:
+        list: (hour, booking_count) tuples for the hours that had bookings, by hour
+    """
+    since, until = _window(days)
+    hour = extract('hour', HourlyBookingRollup.period_start)
+    rows = db.session.query(hour, func.sum(HourlyBookingRollup.bookings))\
+        .filter(HourlyBookingRollup.period_start >= since, HourlyBookingRollup.period_start < until)\
+        .group_by(hour)\
+        .order_by(hour).all()
+    return [(int(h), int(count)) for h, count in rows if count]
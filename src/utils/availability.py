@@ -0,0 +1,392 @@
+"""Resource availability rules for the Campus Resource Hub.
+
+A resource's availability_rules text is a list of clauses separated by
+commas, semicolons or new lines:
+
+- Opening windows: "Mon-Fri 8AM-10PM", "Tuesdays & Thursdays 2PM-5PM",
+  "Daily 9:00-17:00", "Weekends 10AM-4PM", "Fri 10PM-2AM" (overnight). A
+  clause with only times reuses the previous clause's days, so
+  "Mon-Fri 9AM-12PM, 1PM-5PM" closes over lunch.
+- Blackout dates: "Closed 2026-12-25", "Closed 2026-12-24 to 2027-01-01".
+- Duration limits: "Min 30m", "Max 4h", "Max 2h30m".
+
+Without any opening window the resource is open at all hours. Rules compile
+into an AvailabilitySchedule: merged opening windows as sorted minute-of-week
+intervals and merged blackout date ranges, both searched with bisect, so
+checking a booking is O(log n). Compiled schedules are cached per resource.
+"""
+import re
+from bisect import bisect_right
+from datetime import date, datetime, time, timedelta
+from src.utils.cache import MemoryCache
+
+DAY_NAMES = ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')
+
+DAY_MINUTES = 24 * 60
+WEEK_MINUTES = 7 * DAY_MINUTES
+
+DAY_GROUPS = {
+    'daily': range(7),
+    'every day': range(7),
+    'weekdays': range(5),
+    'weekends': range(5, 7)
+}
+
+_TIME = r'(?:noon|midnight|\d{1,2}(?::\d{2})?\s*(?:am|pm)?)'
+_TIME_RANGE_RE = re.compile(rf'({_TIME})\s*(?:-|–|to)\s*({_TIME})')
+_DATE = r'\d{4}-\d{2}-\d{2}'
+_CLOSED_RE = re.compile(rf'closed\s+(?:on\s+)?({_DATE})(?:\s*(?:to|–|-)\s*({_DATE}))?')
+_LIMIT_RE = re.compile(r'(min|max)(?:imum)?(?:\s+duration)?\s+(.+)')
+_DURATION_RE = re.compile(r'(?:(\d+)\s*h(?:ours?|rs?)?)?\s*(?:(\d+)\s*m(?:in(?:ute)?s?)?)?')
+
+# Compiled schedules kept per process, keyed by resource id
+SCHEDULE_CACHE_SIZE = 1024
+_schedules = MemoryCache(maxsize=SCHEDULE_CACHE_SIZE, ttl=24 * 60 * 60)
+
+
+def _format_duration(minutes):
+    hours, minutes = divmod(minutes, 60)
+    parts = []
+    if hours:
+        parts.append(f'{hours} hour{"s" if hours != 1 else ""}')
+    if minutes:
+        parts.append(f'{minutes} minute{"s" if minutes != 1 else ""}')
+    return ' '.join(parts)
+
+
+def _merge(intervals):
+    """Merge overlapping or touching (start, end) intervals into a sorted tuple."""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return tuple((start, end) for start, end in merged)
+
+
+class AvailabilitySchedule:
+    """Compiled availability rules of one resource."""
+    
+    __slots__ = ('rules', 'windows', 'blackouts', 'min_duration', 'max_duration',
+                 '_window_starts', '_blackout_starts')
+    
+    def __init__(self, rules, windows=None, blackouts=(), min_duration=None, max_duration=None):
+        """
+        Args:
+            rules: The rules text the schedule was compiled from
+            windows: (start, end) minute-of-week intervals the resource is open,
+                     with Monday 00:00 as 0; None when it is always open
+            blackouts: (first_day, last_day) date ranges the resource is closed
+            min_duration: Shortest booking in minutes, or None
+            max_duration: Longest booking in minutes, or None
+        """
+        self.rules = rules
+        self.windows = _merge(windows) if windows is not None else None
+        merged_days = _merge((first.toordinal(), last.toordinal() + 1) for first, last in blackouts)
+        self.blackouts = tuple((date.fromordinal(first), date.fromordinal(end - 1))
+                               for first, end in merged_days)
+        self.min_duration = min_duration
+        self.max_duration = max_duration
+        self._window_starts = [start for start, _ in self.windows] if self.windows is not None else None
+        self._blackout_starts = [first for first, _ in self.blackouts]
+    
+    def _window_end(self, minute):
+        """End of the opening window containing a minute of the week, or None."""
+        i = bisect_right(self._window_starts, minute) - 1
+        if i >= 0 and self.windows[i][1] > minute:
+            return self.windows[i][1]
+        return None
+    
+    def _is_open(self, start_time, minutes):
+        if self.windows is None:
+            return True
+        if minutes >= WEEK_MINUTES:
+            return self.windows == ((0, WEEK_MINUTES),)
+        start = start_time.weekday() * DAY_MINUTES + start_time.hour * 60 + start_time.minute
+        end = start + minutes
+        window_end = self._window_end(start)
+        if window_end is None:
+            return False
+        if end <= window_end:
+            return True
+        # Continue into the next week through a window that opens at Monday 00:00
+        if window_end == WEEK_MINUTES and end > WEEK_MINUTES:
+            next_end = self._window_end(0)
+            return next_end is not None and end - WEEK_MINUTES <= next_end
+        return False
+    
+    def _blackout_on(self, first_day, last_day):
+        """First blackout range overlapping the given days, or None."""
+        i = bisect_right(self._blackout_starts, last_day) - 1
+        if i >= 0 and self.blackouts[i][1] >= first_day:
+            return self.blackouts[i]
+        return None
+    
+    def check_duration(self, minutes):
+        """
+        Check a booking length against the minimum and maximum durations.
+        
+        Raises:
+            ValueError: If the booking would be too short or too long
+        """
+        if self.min_duration and minutes < self.min_duration:
+            raise ValueError(f'Bookings of this resource must be at least {_format_duration(self.min_duration)}.')
+        if self.max_duration and minutes > self.max_duration:
+            raise ValueError(f'Bookings of this resource can be at most {_format_duration(self.max_duration)}.')
+    
+    def open_intervals(self, range_start, range_end):
+        """
+        Times the resource is open within a range.
+        
+        Returns:
+            list: Sorted, non-overlapping (start, end) datetimes, clipped to the range
+        """
+        if self.windows is None:
+            intervals = [(range_start, range_end)]
+        else:
+            intervals = []
+            week_start = datetime.combine(range_start.date() - timedelta(days=range_start.weekday()), time.min)
+            while week_start < range_end:
+                for window_start, window_end in self.windows:
+                    start = max(week_start + timedelta(minutes=window_start), range_start)
+                    end = min(week_start + timedelta(minutes=window_end), range_end)
+                    if start >= end:
+                        continue
+                    # Join windows that run on past the end of the week
+                    if intervals and intervals[-1][1] == start:
+                        intervals[-1] = (intervals[-1][0], end)
+                    else:
+                        intervals.append((start, end))
+                week_start += timedelta(days=7)
+        
+        closed = [(datetime.combine(first, time.min), datetime.combine(last + timedelta(days=1), time.min))
+                  for first, last in self.blackouts]
+        return subtract_intervals(intervals, closed)
+    
+    def validate(self, start_time, end_time):
+        """
+        Check that a booking fits the schedule.
+        
+        Raises:
+            ValueError: With a message saying why the booking does not fit
+        """
+        minutes = int((end_time - start_time).total_seconds() // 60)
+        self.check_duration(minutes)
+        
+        last_day = (max(start_time, end_time - timedelta(microseconds=1))).date()
+        blackout = self._blackout_on(start_time.date(), last_day)
+        if blackout:
+            closed = blackout[0].strftime('%B %d, %Y')
+            if blackout[1] != blackout[0]:
+                closed += f' to {blackout[1].strftime("%B %d, %Y")}'
+            raise ValueError(f'This resource is closed {"from" if blackout[1] != blackout[0] else "on"} {closed}.')
+        
+        if not self._is_open(start_time, minutes):
+            raise ValueError(f'The requested time is outside the hours this resource is available ({self.rules}).')
+    
+    def is_available(self, start_time, end_time):
+        """Whether a booking from start_time to end_time fits the schedule."""
+        try:
+            self.validate(start_time, end_time)
+        except ValueError:
+            return False
+        return True
+
+
+def subtract_intervals(intervals, removals):
+    """
+    Remove intervals from a list of intervals in one sorted sweep.
+    
+    Args:
+        intervals: Sorted, non-overlapping (start, end) pairs
+        removals: (start, end) pairs sorted by start; they may overlap each other
+    
+    Returns:
+        list: The parts of intervals not covered by any removal, in order
+    """
+    remaining = []
+    first = 0
+    for start, end in intervals:
+        cursor = start
+        while first < len(removals) and removals[first][1] <= cursor:
+            first += 1
+        i = first
+        while i < len(removals) and removals[i][0] < end:
+            removal_start, removal_end = removals[i]
+            if removal_start > cursor:
+                remaining.append((cursor, removal_start))
+            cursor = max(cursor, removal_end)
+            if cursor >= end:
+                break
+            i += 1
+        if cursor < end:
+            remaining.append((cursor, end))
+    return remaining
+
+
+def _parse_day(word):
+    word = word.strip().rstrip('.')
+    if word.endswith('days'):
+        word = word[:-1]
+    if len(word) >= 3:
+        for i, name in enumerate(DAY_NAMES):
+            if name.startswith(word):
+                return i
+    raise ValueError(f'Unknown day "{word}".')
+
+
+def _parse_days(text):
+    """Parse a day list such as 'mon-fri', 'tue & thu' or 'weekends' into day numbers."""
+    text = text.strip()
+    if text in DAY_GROUPS:
+        return set(DAY_GROUPS[text])
+    days = set()
+    for part in re.split(r'\s*(?:&|/|\band\b|\+)\s*', text):
+        if '-' in part or ' to ' in part:
+            first, last = (_parse_day(day) for day in re.split(r'\s*(?:-|\bto\b)\s*', part, maxsplit=1))
+            day = first
+            days.add(day)
+            while day != last:
+                day = (day + 1) % 7
+                days.add(day)
+        else:
+            days.add(_parse_day(part))
+    return days
+
+
+def _parse_time(text, is_end=False):
+    """Parse '8am', '8:30 PM', '17:00', 'noon' or 'midnight' into minutes after midnight."""
+    text = text.replace(' ', '')
+    if text == 'noon':
+        return 12 * 60
+    if text == 'midnight':
+        return DAY_MINUTES if is_end else 0
+    match = re.fullmatch(r'(\d{1,2})(?::(\d{2}))?(am|pm)?', text)
+    hour, minute, meridiem = int(match.group(1)), int(match.group(2) or 0), match.group(3)
+    if meridiem:
+        if not 1 <= hour <= 12:
+            raise ValueError(f'Invalid time "{text}".')
+        hour = hour % 12 + (12 if meridiem == 'pm' else 0)
+    if minute > 59 or hour > 24 or (hour == 24 and minute):
+        raise ValueError(f'Invalid time "{text}".')
+    minutes = hour * 60 + minute
+    if is_end and minutes == 0:
+        return DAY_MINUTES
+    return minutes
+
+
+def _parse_duration(text):
+    match = _DURATION_RE.fullmatch(text.strip())
+    if not match or not any(match.groups()):
+        raise ValueError(f'Invalid duration "{text}"; use e.g. 30m, 2h or 1h30m.')
+    return int(match.group(1) or 0) * 60 + int(match.group(2) or 0)
+
+
+def parse_availability(rules):
+    """
+    Compile availability rules text into a schedule.
+    
+    Args:
+        rules: Rules text in the format described in this module's docstring
+    
+    Returns:
+        AvailabilitySchedule
+    
+    Raises:
+        ValueError: If a clause cannot be parsed
+    """
+    windows = []
+    has_windows = False
+    blackouts = []
+    limits = {}
+    days = None
+    
+    for clause in re.split(r'[,;\n]', rules):
+        clause = clause.strip().lower()
+        if not clause:
+            continue
+        
+        match = _CLOSED_RE.fullmatch(clause)
+        if match:
+            try:
+                first = date.fromisoformat(match.group(1))
+                last = date.fromisoformat(match.group(2) or match.group(1))
+            except ValueError:
+                raise ValueError(f'Invalid date in "{clause}".')
+            if last < first:
+                raise ValueError(f'Blackout "{clause}" ends before it starts.')
+            blackouts.append((first, last))
+            continue
+        
+        match = _LIMIT_RE.fullmatch(clause)
+        if match:
+            limits[match.group(1)] = _parse_duration(match.group(2))
+            continue
+        
+        ranges = list(_TIME_RANGE_RE.finditer(clause))
+        if not ranges:
+            raise ValueError(f'Could not understand "{clause}".')
+        day_text = clause[:ranges[0].start()].strip()
+        between = _TIME_RANGE_RE.sub('', clause[ranges[0].start():])
+        if re.sub(r'&|\band\b|\s', '', between):
+            raise ValueError(f'Could not understand "{clause}".')
+        if day_text:
+            days = _parse_days(day_text)
+        elif days is None:
+            raise ValueError(f'"{clause}" does not say which days it applies to.')
+        
+        has_windows = True
+        for time_range in ranges:
+            start = _parse_time(time_range.group(1))
+            end = _parse_time(time_range.group(2), is_end=True)
+            if end == start:
+                raise ValueError(f'"{time_range.group(0)}" is an empty time range.')
+            if end < start:
+                end += DAY_MINUTES  # Overnight, e.g. 10PM-2AM
+            for day in days:
+                window_start, window_end = day * DAY_MINUTES + start, day * DAY_MINUTES + end
+                if window_end > WEEK_MINUTES:
+                    windows.append((0, window_end - WEEK_MINUTES))
+                    window_end = WEEK_MINUTES
+                windows.append((window_start, window_end))
+    
+    if limits.get('min') and limits.get('max') and limits['min'] > limits['max']:
+        raise ValueError('The minimum duration is longer than the maximum duration.')
+    
+    return AvailabilitySchedule(
+        rules.strip(),
+        windows=windows if has_windows else None,
+        blackouts=blackouts,
+        min_duration=limits.get('min'),
+        max_duration=limits.get('max')
+    )
+
+
+def get_resource_schedule(resource):
+    """
+    Compiled availability schedule of a resource, from the per-resource cache.
+    
+    Returns:
+        AvailabilitySchedule, or None when the resource has no rules or its rules
+        are free text from before rules were structured (shown but not enforced)
+    """
+    rules = (resource.availability_rules or '').strip()
+    cached = _schedules.get(resource.id)
+    # Comparing the text keeps other processes' edits from serving a stale schedule
+    if cached is not None and cached[0] == rules:
+        return cached[1]
+    
+    schedule = None
+    if rules:
+        try:
+            schedule = parse_availability(rules)
+        except ValueError:
+            pass
+    _schedules.set(resource.id, (rules, schedule))
+    return schedule
+
+
+def invalidate_resource_schedule(resource_id):
+    """Drop a resource's compiled schedule after its rules change."""
+    _schedules.delete(resource_id)
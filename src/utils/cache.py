@@ -0,0 +1,182 @@
+"""Small key/value caches for counters, with swappable backends.
+
+- MemoryCache: in-process LRU with a TTL (the default). Each process has its
+  own copy, so with several worker processes a value can be stale for up to
+  the TTL.
+- RedisCache: any Redis-compatible server, shared by all processes. Needs the
+  optional `redis` package.
+
+The backend is chosen by app.config['CACHE_URL'] (or the CACHE_URL
+environment variable): 'memory://' (default), 'redis://host:port/db', or
+'none' to disable caching.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app, has_app_context
+
+DEFAULT_TTL = 60  # seconds
+DEFAULT_MAXSIZE = 10000
+
+
+class NullCache:
+    """Cache that stores nothing; every lookup is a miss."""
+    
+    def get(self, key):
+        return None
+    
+    def get_many(self, keys):
+        return [None] * len(keys)
+    
+    def set(self, key, value, ttl=None):
+        pass
+    
+    def incr(self, key, delta=1):
+        return None
+    
+    def delete(self, key):
+        pass
+    
+    def clear(self):
+        pass
+
+
+class MemoryCache:
+    """Thread-safe in-process LRU cache whose entries expire after a TTL."""
+    
+    def __init__(self, maxsize=DEFAULT_MAXSIZE, ttl=DEFAULT_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._data = OrderedDict()  # key -> (expires_at, value)
+    
+    def get(self, key):
+        """Return the cached value, or None if missing or expired."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+    
+    def get_many(self, keys):
+        """Return the cached values of several keys, None for each miss."""
+        return [self.get(key) for key in keys]
+    
+    def set(self, key, value, ttl=None):
+        """Store a value, evicting the least recently used entry when full.
+        
+        Args:
+            ttl: Lifetime of this entry in seconds; defaults to the cache's TTL
+        """
+        with self._lock:
+            self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+    
+    def incr(self, key, delta=1):
+        """
+        Add delta to a cached integer, keeping its expiry.
+        
+        Returns:
+            int: The new value, or None if the key was not cached (it is not created)
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                self._data.pop(key, None)
+                return None
+            expires_at, value = entry
+            self._data[key] = (expires_at, value + delta)
+            return value + delta
+    
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+    
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class RedisCache:
+    """Cache backed by a Redis-compatible server; values are integers."""
+    
+    # INCRBY only when the key exists, so a write never creates a partial count
+    _INCR_IF_EXISTS = """
+        if redis.call('EXISTS', KEYS[1]) == 1 then
+            return redis.call('INCRBY', KEYS[1], ARGV[1])
+        end
+        return nil
+    """
+    
+    def __init__(self, client, ttl=DEFAULT_TTL, prefix='crh:'):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+    
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        return int(value) if value is not None else None
+    
+    def get_many(self, keys):
+        values = self.client.mget([self.prefix + key for key in keys])
+        return [int(value) if value is not None else None for value in values]
+    
+    def set(self, key, value, ttl=None):
+        self.client.set(self.prefix + key, value, ex=self.ttl if ttl is None else ttl)
+    
+    def incr(self, key, delta=1):
+        return self.client.eval(self._INCR_IF_EXISTS, 1, self.prefix + key, delta)
+    
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+    
+    def clear(self):
+        for key in self.client.scan_iter(self.prefix + '*'):
+            self.client.delete(key)
+
+
+def create_cache(url, ttl=DEFAULT_TTL, maxsize=DEFAULT_MAXSIZE):
+    """
+    Create a cache backend from a URL.
+    
+    Args:
+        url: 'memory://', 'none', or a redis:// / rediss:// / unix:// URL
+        ttl: Entry lifetime in seconds
+        maxsize: Maximum entries for the in-memory backend
+    
+    Returns:
+        A cache backend
+    
+    Raises:
+        ValueError: If the URL scheme is not supported
+    """
+    if not url or url == 'none':
+        return NullCache()
+    if url.startswith('memory://'):
+        return MemoryCache(maxsize=maxsize, ttl=ttl)
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        import redis
+        return RedisCache(redis.Redis.from_url(url), ttl=ttl)
+    raise ValueError(f'Unsupported cache URL: {url}')
+
+
+def init_cache(app):
+    """Create the app's cache backend from its configuration."""
+    url = app.config.get('CACHE_URL', os.environ.get('CACHE_URL', 'memory://'))
+    ttl = int(app.config.get('CACHE_TTL', os.environ.get('CACHE_TTL', DEFAULT_TTL)))
+    app.extensions['cache'] = create_cache(url, ttl=ttl)
+
+
+def get_cache():
+    """The cache backend of the current app (a NullCache outside an app or if none was set up)."""
+    if not has_app_context():
+        return NullCache()
+    return current_app.extensions.get('cache') or NullCache()
@@ -0,0 +1,178 @@
+"""Calendar feeds of resource occupancy and user bookings.
+
+Every resource carries a calendar_version that is bumped in the same
+transaction as any booking write that can change its calendar, so feed
+responses can be tagged with an ETag built from the version and answered
+with 304 Not Modified without reading any bookings. ORM writes are detected
+by a session hook; code that writes bookings with bulk statements calls
+bump_calendar_version() itself.
+"""
+from datetime import datetime
+from flask import current_app
+from itsdangerous import BadSignature, URLSafeSerializer
+from sqlalchemy import event, inspect, update
+from src.database import db
+
+# Booking statuses that occupy a resource, and how feeds label them
+OCCUPYING_STATUSES = {'approved': 'booked', 'completed': 'booked', 'pending': 'pending'}
+
+_TOKEN_SALT = 'calendar-feed'
+
+
+def bump_calendar_version(resource_ids, session=None):
+    """
+    Mark the calendars of resources as changed, in the current transaction.
+    
+    Args:
+        resource_ids: Iterable of resource ids
+        session: Session the change was made in (defaults to db.session)
+    """
+    from src.models import Resource
+    
+    resource_ids = set(resource_ids)
+    if not resource_ids:
+        return
+    session = session or db.session
+    session.connection().execute(
+        update(Resource.__table__)
+        .where(Resource.__table__.c.id.in_(resource_ids))
+        .values(calendar_version=Resource.__table__.c.calendar_version + 1,
+                updated_at=Resource.__table__.c.updated_at)
+    )
+
+
+def _changed_resource_ids(obj):
+    """Resource ids whose calendar a dirty booking's change affects."""
+    state = inspect(obj)
+    if not any(state.attrs[name].history.has_changes() for name in ('status', 'start_time', 'end_time')) \
+            and not state.attrs.resource_id.history.has_changes():
+        return set()
+    history = state.attrs.resource_id.history
+    return {resource_id for resource_id in (*history.deleted, obj.resource_id) if resource_id is not None}
+
+
+@event.listens_for(db.session, 'after_flush')
+def _bump_changed_calendars(session, flush_context):
+    """Bump the calendar version of resources whose bookings were flushed."""
+    from src.models import Booking
+    
+    resource_ids = set()
+    for obj in session.new | session.deleted:
+        if isinstance(obj, Booking):
+            resource_ids.add(obj.resource_id)
+    for obj in session.dirty:
+        if isinstance(obj, Booking):
+            resource_ids |= _changed_resource_ids(obj)
+    resource_ids.discard(None)
+    bump_calendar_version(resource_ids, session)
+
+
+def get_occupancy(resource_id, start_time, end_time):
+    """
+    Occupied intervals of a resource within a time range.
+    
+    One range query over the (resource_id, status, start_time, end_time)
+    booking index; touching or overlapping bookings with the same label are
+    merged.
+    
+    Returns:
+        list: [start, end, label] lists in start order, label 'booked' or 'pending'
+    """
+    from src.models import Booking
+    
+    rows = db.session.query(Booking.start_time, Booking.end_time, Booking.status).filter(
+        Booking.resource_id == resource_id,
+        Booking.status.in_(list(OCCUPYING_STATUSES)),
+        Booking.start_time < end_time,
+        Booking.end_time > start_time
+    ).order_by(Booking.start_time).all()
+    
+    intervals = []
+    for start, end, status in rows:
+        label = OCCUPYING_STATUSES[status]
+        if intervals and intervals[-1][2] == label and start <= intervals[-1][1]:
+            intervals[-1][1] = max(intervals[-1][1], end)
+        else:
+            intervals.append([start, end, label])
+    return intervals
+
+
+def calendar_token(user_id):
+    """Signed token identifying a user's booking feed, for calendar clients without a session."""
+    return URLSafeSerializer(current_app.config['SECRET_KEY'], salt=_TOKEN_SALT).dumps(user_id)
+
+
+def user_id_from_calendar_token(token):
+    """The user id a calendar token was issued for, or None if it is invalid."""
+    try:
+        return URLSafeSerializer(current_app.config['SECRET_KEY'], salt=_TOKEN_SALT).loads(token)
+    except BadSignature:
+        return None
+
+
+def _ical_text(value):
+    """Escape a value for an iCalendar TEXT property."""
+    return value.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,') \
+        .replace('\r\n', '\\n').replace('\n', '\\n')
+
+
+def _fold(line):
+    """Fold a content line into 75-octet pieces as RFC 5545 requires."""
+    pieces = []
+    current, size = '', 0
+    for char in line:
+        char_size = len(char.encode('utf-8'))
+        if size + char_size > 75:
+            pieces.append(current)
+            current, size = ' ', 1
+        current += char
+        size += char_size
+    pieces.append(current)
+    return '\r\n'.join(pieces)
+
+
+def _ical_time(value):
+    return value.strftime('%Y%m%dT%H%M%S')
+
+
+def build_ical(name, events):
+    """
+    Render events as an iCalendar document.
+    
+    Booking times are stored without a time zone, so they are written as
+    floating times that calendar clients show as they are.
+    
+    Args:
+        name: Calendar name shown by clients
+        events: Iterable of dicts with uid, start, end, summary and optional
+                location, description and status ('CONFIRMED' or 'TENTATIVE')
+    
+    Returns:
+        str: The iCalendar text, with CRLF line endings
+    """
+    stamp = datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')
+    lines = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//Campus Resource Hub//Bookings//EN',
+        'CALSCALE:GREGORIAN',
+        f'X-WR-CALNAME:{_ical_text(name)}'
+    ]
+    for item in events:
+        lines += [
+            'BEGIN:VEVENT',
+            f'UID:{item["uid"]}',
+            f'DTSTAMP:{stamp}',
+            f'DTSTART:{_ical_time(item["start"])}',
+            f'DTEND:{_ical_time(item["end"])}',
+            f'SUMMARY:{_ical_text(item["summary"])}'
+        ]
+        if item.get('location'):
+            lines.append(f'LOCATION:{_ical_text(item["location"])}')
+        if item.get('description'):
+            lines.append(f'DESCRIPTION:{_ical_text(item["description"])}')
+        if item.get('status'):
+            lines.append(f'STATUS:{item["status"]}')
+        lines.append('END:VEVENT')
+    lines.append('END:VCALENDAR')
+    return '\r\n'.join(_fold(line) for line in lines) + '\r\n'
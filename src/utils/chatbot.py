@@ -27,7 +27,7 @@ Table: resources
 - capacity (INTEGER)
 - status (TEXT) - values: 'draft', 'published', 'archived'
 - owner_id (INTEGER, FOREIGN KEY to users.id)
-- availability_rules (TEXT, nullable)
+- availability_rules (TEXT, nullable) - e.g. 'Mon-Fri 8AM-10PM, Sat-Sun 10AM-6PM, Closed 2026-12-25, Max 4h'
 - requires_approval (BOOLEAN)
 - created_at (DATETIME)
 - updated_at (DATETIME)
@@ -53,6 +53,18 @@ Table: reviews
 - created_at (DATETIME)
 - UNIQUE constraint on (resource_id, user_id)
 
+Tables: booking_rollups_hourly, booking_rollups_daily
+(pre-aggregated booking metrics; prefer these over bookings for counts and trends)
+- id (INTEGER, PRIMARY KEY)
+- resource_id (INTEGER, FOREIGN KEY to resources.id)
+- period_start (DATETIME) - start of the hour or day
+- bookings (INTEGER) - bookings starting in the period
+- approved (INTEGER) - approved or completed bookings starting in the period
+- rejected (INTEGER)
+- cancelled (INTEGER)
+- booked_minutes (INTEGER) - approved booking time falling within the period
+- UNIQUE constraint on (resource_id, period_start)
+
 Sample questions you can help with:
 - What time of day do most resources get booked for?
 - Which resources are the most popular?
@@ -0,0 +1,203 @@
+"""In-process pub/sub for pushing notification changes to connected browsers.
+
+Committed notification changes are published to per-user subscriber queues,
+which the Server-Sent Events endpoint in src.views.notifications drains, and
+are written through to each user's cached unread count.
+
+- New Notification rows are picked up automatically: they are captured when
+  the session flushes and applied only after the transaction commits, so
+  subscribers and the cache never see notifications that are rolled back.
+- Notifications marked read through the ORM are detected the same way. Code
+  that inserts notifications or changes read state with bulk statements must
+  call record_new_notifications / notify_unread_changed itself.
+
+Subscribers live in the memory of one process, so a stream only carries
+changes committed by the process serving it. Pages only open a stream when
+NOTIFICATION_STREAM_SINGLE_PROCESS is set, which should be done when the app
+runs in one process with an async worker (e.g. gunicorn -k gevent, so that
+idle streams cost a greenlet instead of a thread); otherwise they just poll.
+"""
+import json
+import queue
+import threading
+from collections import defaultdict
+from sqlalchemy import event, inspect
+from src.database import db
+from src.utils.cache import get_cache
+
+# Events buffered per subscriber before the oldest are dropped in favour of a resync
+SUBSCRIBER_QUEUE_SIZE = 100
+
+_SESSION_KEY = 'notification_events'
+
+
+class NotificationBroker:
+    """Fan out events to every subscriber queue of a user."""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+    
+    def subscribe(self, user_id):
+        """Register a new subscriber for a user and return its queue."""
+        subscriber = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers[user_id].add(subscriber)
+        return subscriber
+    
+    def unsubscribe(self, user_id, subscriber):
+        """Remove a subscriber queue."""
+        with self._lock:
+            subscribers = self._subscribers.get(user_id)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._subscribers[user_id]
+    
+    def subscriber_count(self, user_id=None):
+        """Number of subscribers, for one user or in total."""
+        with self._lock:
+            if user_id is not None:
+                return len(self._subscribers.get(user_id, ()))
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+    
+    def publish(self, user_id, event_type, data=None):
+        """
+        Send an event to every subscriber of a user without blocking.
+        
+        A subscriber whose queue is full (a stalled client) has its backlog
+        replaced by a single 'resync' event telling it to reload.
+        """
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait((event_type, data))
+            except queue.Full:
+                with subscriber.mutex:
+                    subscriber.queue.clear()
+                subscriber.put_nowait(('resync', None))
+
+
+broker = NotificationBroker()
+
+
+def serialize_notification(notification):
+    """JSON-ready representation of a notification, as used by the notification APIs."""
+    return {
+        'id': notification.id,
+        'type': notification.type,
+        'title': notification.title,
+        'message': notification.message,
+        'read': notification.read,
+        'link': notification.link,
+        'created_at': notification.created_at.isoformat()
+    }
+
+
+def format_sse(event_type, data):
+    """Format one Server-Sent Events message."""
+    return f'event: {event_type}\ndata: {json.dumps(data)}\n\n'
+
+
+def unread_cache_key(user_id):
+    """Cache key of a user's unread notification count."""
+    return f'unread_notifications:{user_id}'
+
+
+def get_unread_count(user_id):
+    """
+    Get a user's unread notification count, from the cache when possible.
+    
+    On a miss the count is read from the database and cached; from then on the
+    commit hooks below keep it up to date.
+    """
+    cache = get_cache()
+    key = unread_cache_key(user_id)
+    count = cache.get(key)
+    if count is None:
+        from src.models import Notification
+        count = Notification.query.filter_by(user_id=user_id, read=False).count()
+        cache.set(key, count)
+    return count
+
+
+def notify_unread_changed(user_id, count=None, session=None, delta=None):
+    """
+    Record an unread-count change made outside the ORM (e.g. a bulk UPDATE).
+    
+    Applied when the current transaction commits: the cached count is set to
+    `count` when it is known, adjusted by `delta` when only the change is
+    known, otherwise dropped, and subscribers are told to refresh their count.
+    
+    Args:
+        user_id: User whose notifications changed
+        count: The user's unread count after the change, if known
+        session: Session the change was made in (defaults to db.session)
+        delta: Change in the user's unread count, used when `count` is not known
+    """
+    session = session or db.session
+    change = ('incr', delta) if count is None and delta is not None else ('set', count)
+    session.info.setdefault(_SESSION_KEY, []).append((user_id, 'unread', None, change))
+
+
+def record_new_notifications(notifications, session=None):
+    """
+    Record notifications inserted outside a flush (e.g. a bulk INSERT).
+    
+    They are published and counted when the current transaction commits,
+    like notifications added through the session.
+    """
+    session = session or db.session
+    events = session.info.setdefault(_SESSION_KEY, [])
+    for notification in notifications:
+        delta = 0 if notification.read else 1
+        events.append((notification.user_id, 'notification', serialize_notification(notification), ('incr', delta)))
+
+
+@event.listens_for(db.session, 'after_flush')
+def _collect_notification_events(session, flush_context):
+    """Capture new and read-state-changed notifications while their state is loaded."""
+    from src.models import Notification
+    
+    record_new_notifications([obj for obj in session.new if isinstance(obj, Notification)], session)
+    
+    events = session.info[_SESSION_KEY]
+    for obj in session.dirty:
+        if isinstance(obj, Notification) and inspect(obj).attrs.read.history.has_changes():
+            delta = -1 if obj.read else 1
+            events.append((obj.user_id, 'unread', None, ('incr', delta)))
+
+
+def _apply_to_cache(cache, user_id, change):
+    """Write a committed unread-count change through to the cache."""
+    operation, value = change
+    key = unread_cache_key(user_id)
+    if operation == 'incr':
+        if value:
+            count = cache.incr(key, value)
+            if count is not None and count < 0:
+                cache.delete(key)
+    elif value is None:
+        cache.delete(key)
+    else:
+        cache.set(key, value)
+
+
+@event.listens_for(db.session, 'after_commit')
+def _publish_notification_events(session):
+    """Apply and publish the events of a committed transaction."""
+    events = session.info.pop(_SESSION_KEY, [])
+    if not events:
+        return
+    
+    cache = get_cache()
+    for user_id, event_type, data, change in events:
+        _apply_to_cache(cache, user_id, change)
+        broker.publish(user_id, event_type, data)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_notification_events(session):
+    """Drop the events of a rolled back transaction."""
+    session.info.pop(_SESSION_KEY, None)
@@ -0,0 +1,286 @@
+"""Notification service for the Campus Resource Hub.
+
+Every notification is created through this module:
+
+- create_notification adds a single notification to the current session.
+- notify_many / notify_users insert many notifications with one bulk INSERT,
+  for events that reach many users at once (cancelled series, archived
+  resources, announcements).
+
+Bulk notifications can be deferred: they are handed to a background
+dispatcher once the current transaction commits, so the request does not
+wait on the insert, and are dropped if it rolls back.
+
+Retention keeps the notifications table bounded: read notifications older
+than NOTIFICATION_RETENTION_DAYS, or beyond each user's newest
+NOTIFICATION_KEEP_PER_USER, are moved to notifications_archive in batches,
+and archived rows are deleted after NOTIFICATION_ARCHIVE_RETENTION_DAYS.
+Unread notifications are never archived.
+"""
+import os
+import queue
+import threading
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import delete, event, func, insert, literal, select
+from src.database import db
+from src.models import Notification, NotificationArchive
+from src.utils.notification_stream import record_new_notifications
+
+_DEFERRED_KEY = 'deferred_notifications'
+
+DEFAULT_RETENTION_DAYS = 90
+DEFAULT_KEEP_PER_USER = 200
+DEFAULT_ARCHIVE_RETENTION_DAYS = 730  # 0 keeps archived notifications forever
+RETENTION_BATCH_SIZE = 1000
+
+_ARCHIVED_COLUMNS = ['user_id', 'type', 'title', 'message', 'link', 'created_at']
+
+
+def create_notification(user_id, notification_type, title, message, link=None):
+    """Helper function to create notifications."""
+    notification = Notification(
+        user_id=user_id,
+        type=notification_type,
+        title=title,
+        message=message,
+        link=link,
+        read=False
+    )
+    db.session.add(notification)
+    return notification
+
+
+def notify_many(notifications, defer=None):
+    """
+    Create many notifications with a single bulk INSERT.
+    
+    Args:
+        notifications: Iterable of dicts with user_id, type, title, message
+            and an optional link
+        defer: Write the notifications on the background dispatcher after the
+            current transaction commits instead of inside it. Defaults to
+            app.config['NOTIFICATIONS_DEFERRED'].
+    
+    Returns:
+        int: Number of notifications created (or queued)
+    """
+    now = datetime.utcnow()
+    rows = [{
+        'user_id': n['user_id'],
+        'type': n['type'],
+        'title': n['title'],
+        'message': n['message'],
+        'link': n.get('link'),
+        'read': False,
+        'created_at': now
+    } for n in notifications]
+    if not rows:
+        return 0
+    
+    if defer is None:
+        defer = current_app.config.get('NOTIFICATIONS_DEFERRED', False)
+    if defer:
+        db.session.info.setdefault(_DEFERRED_KEY, []).extend(rows)
+        return len(rows)
+    
+    created = db.session.scalars(insert(Notification).returning(Notification), rows).all()
+    record_new_notifications(created)
+    return len(created)
+
+
+def notify_users(user_ids, notification_type, title, message, link=None, defer=None):
+    """
+    Send the same notification to many users with one bulk INSERT.
+    
+    Args:
+        user_ids: IDs of the users to notify; duplicates are ignored
+        notification_type: Notification type, e.g. 'announcement'
+        title: Notification title
+        message: Notification text
+        link: Optional link
+        defer: See notify_many
+    
+    Returns:
+        int: Number of notifications created (or queued)
+    """
+    return notify_many(({
+        'user_id': user_id,
+        'type': notification_type,
+        'title': title,
+        'message': message,
+        'link': link
+    } for user_id in dict.fromkeys(user_ids)), defer=defer)
+
+
+class NotificationDispatcher:
+    """Background worker that writes deferred notifications in its own app context."""
+    
+    def __init__(self, app):
+        self.app = app
+        self.queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+    
+    def submit(self, rows):
+        """Queue notification rows to be inserted by the worker."""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='notification-dispatcher', daemon=True)
+                self._thread.start()
+        self.queue.put(rows)
+    
+    def join(self):
+        """Block until every queued batch has been written."""
+        self.queue.join()
+    
+    def _run(self):
+        while True:
+            rows = self.queue.get()
+            try:
+                with self.app.app_context():
+                    try:
+                        notify_many(rows, defer=False)
+                        db.session.commit()
+                    except Exception as e:
+                        db.session.rollback()
+                        self.app.logger.exception(f'Failed to write {len(rows)} deferred notification(s): {e}')
+                    finally:
+                        db.session.remove()
+            finally:
+                self.queue.task_done()
+
+
+def get_dispatcher(app=None):
+    """The notification dispatcher of an app (the current one by default), created on first use."""
+    app = app or current_app._get_current_object()
+    dispatcher = app.extensions.get('notification_dispatcher')
+    if dispatcher is None:
+        dispatcher = app.extensions.setdefault('notification_dispatcher', NotificationDispatcher(app))
+    return dispatcher
+
+
+@event.listens_for(db.session, 'after_commit')
+def _dispatch_deferred_notifications(session):
+    """Hand deferred notifications to the dispatcher once their transaction commits."""
+    rows = session.info.pop(_DEFERRED_KEY, None)
+    if rows:
+        get_dispatcher().submit(rows)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_deferred_notifications(session):
+    """Drop deferred notifications of a rolled back transaction."""
+    session.info.pop(_DEFERRED_KEY, None)
+
+
+def _retention_setting(name, default):
+    """Read an integer retention setting from the app config or the environment."""
+    return int(current_app.config.get(name, os.environ.get(name, default)))
+
+
+def _archive_batch(ids, archived_at):
+    """Move the given notifications to the archive table and commit."""
+    columns = [getattr(Notification, name) for name in _ARCHIVED_COLUMNS]
+    db.session.execute(
+        insert(NotificationArchive).from_select(
+            ['notification_id', *_ARCHIVED_COLUMNS, 'archived_at'],
+            select(Notification.id, *columns, literal(archived_at)).where(Notification.id.in_(ids))
+        )
+    )
+    db.session.execute(delete(Notification).where(Notification.id.in_(ids)))
+    db.session.commit()
+
+
+def archive_old_notifications(batch_size=RETENTION_BATCH_SIZE):
+    """
+    Move read notifications outside the retention policy to the archive table.
+    
+    A read notification is archived when it is older than
+    NOTIFICATION_RETENTION_DAYS or is not among its user's newest
+    NOTIFICATION_KEEP_PER_USER notifications. Each batch is copied and deleted
+    in its own short transaction so the job never holds a long write lock.
+    
+    Args:
+        batch_size: Maximum notifications moved per transaction
+    
+    Returns:
+        int: Number of notifications archived
+    """
+    cutoff = datetime.utcnow() - timedelta(days=_retention_setting('NOTIFICATION_RETENTION_DAYS', DEFAULT_RETENTION_DAYS))
+    keep = _retention_setting('NOTIFICATION_KEEP_PER_USER', DEFAULT_KEEP_PER_USER)
+    archived = 0
+    
+    # Expired by age: walks the (read, created_at) index
+    expired = select(Notification.id)\
+        .where(Notification.read == True, Notification.created_at < cutoff)\
+        .limit(batch_size)
+    while True:
+        ids = db.session.scalars(expired).all()
+        if not ids:
+            break
+        _archive_batch(ids, datetime.utcnow())
+        archived += len(ids)
+    
+    # Over the per-user limit: only users with more than `keep` notifications are ranked
+    over_limit_users = select(Notification.user_id)\
+        .group_by(Notification.user_id)\
+        .having(func.count(Notification.id) > keep)
+    ranked = select(
+        Notification.id,
+        Notification.read,
+        func.row_number().over(
+            partition_by=Notification.user_id,
+            order_by=(Notification.created_at.desc(), Notification.id.desc())
+        ).label('position')
+    ).where(Notification.user_id.in_(over_limit_users)).subquery()
+    overflow = select(ranked.c.id)\
+        .where(ranked.c.read == True, ranked.c.position > keep)\
+        .limit(batch_size)
+    while True:
+        ids = db.session.scalars(overflow).all()
+        if not ids:
+            break
+        _archive_batch(ids, datetime.utcnow())
+        archived += len(ids)
+    
+    return archived
+
+
+def purge_notification_archive(batch_size=RETENTION_BATCH_SIZE):
+    """
+    Delete archived notifications older than NOTIFICATION_ARCHIVE_RETENTION_DAYS.
+    
+    Args:
+        batch_size: Maximum rows deleted per transaction
+    
+    Returns:
+        int: Number of archived notifications deleted
+    """
+    days = _retention_setting('NOTIFICATION_ARCHIVE_RETENTION_DAYS', DEFAULT_ARCHIVE_RETENTION_DAYS)
+    if days <= 0:
+        return 0
+    
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    expired = select(NotificationArchive.id)\
+        .where(NotificationArchive.archived_at < cutoff)\
+        .limit(batch_size)
+    purged = 0
+    while True:
+        ids = db.session.scalars(expired).all()
+        if not ids:
+            break
+        db.session.execute(delete(NotificationArchive).where(NotificationArchive.id.in_(ids)))
+        db.session.commit()
+        purged += len(ids)
+    return purged
+
+
+def apply_notification_retention():
+    """
+    Archive and purge notifications according to the retention policy.
+    
+    Returns:
+        tuple: (notifications archived, archived notifications purged)
+    """
+    return archive_old_notifications(), purge_notification_archive()
@@ -0,0 +1,100 @@
+"""Keyset (cursor) pagination shared by the browse page and the admin tables.
+
+A page is ordered by (sort key, id) and the cursor holds the sort value and
+id of its last row, so fetching any page costs one indexed range scan no
+matter how deep it is (more when rows are filtered in Python; see `keep`).
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+from sqlalchemy import and_, or_
+
+
+def encode_cursor(sort_value, row_id):
+    """Encode a keyset cursor for the last row of a page."""
+    if isinstance(sort_value, datetime):
+        sort_value = sort_value.isoformat()
+    payload = json.dumps([sort_value, row_id]).encode()
+    return base64.urlsafe_b64encode(payload).decode()
+
+
+def decode_cursor(cursor, value_type):
+    """Decode a keyset cursor into (sort_value, row_id).
+    
+    Args:
+        cursor: Cursor from encode_cursor
+        value_type: Python type of the sort value: datetime, str, int or float
+    
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if value_type is datetime:
+            sort_value = datetime.fromisoformat(sort_value)
+        elif value_type is str:
+            if not isinstance(sort_value, str):
+                raise ValueError('Invalid sort value')
+        elif not isinstance(sort_value, (int, float)) or isinstance(sort_value, bool):
+            raise ValueError('Invalid sort value')
+        return sort_value, int(row_id)
+    except (TypeError, binascii.Error, json.JSONDecodeError) as e:
+        raise ValueError('Invalid cursor') from e
+
+
+def paginate_keyset(query, sort_key, id_column, cursor=None, per_page=25, descending=True, value_type=datetime,
+                    keep=None):
+    """Fetch one page of a query ordered by (sort_key, id).
+    
+    Args:
+        query: Filtered ORM query of a single entity
+        sort_key: Column or expression to order by; must not be NULL
+        id_column: The entity's primary key column, used as the tie-breaker
+        cursor: Cursor returned for the previous page, or None for the first page
+        per_page: Maximum number of rows to return
+        descending: Order from the highest sort value down
+        value_type: Python type of the sort values (see decode_cursor)
+        keep: Optional predicate for conditions that cannot be expressed in SQL.
+            Rows it rejects are skipped and further keyset pages are fetched
+            until the page is full or the query runs out, so a short page
+            always means there are no more rows.
+    
+    Returns:
+        tuple: (list of entities, cursor for the next page or None)
+    
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    position = decode_cursor(cursor, value_type) if cursor else None
+    order_by = (sort_key.desc(), id_column.desc()) if descending else (sort_key.asc(), id_column.asc())
+    ordered = query.add_columns(sort_key.label('sort_value')).order_by(*order_by)
+    
+    page = []
+    while True:
+        batch_query = ordered
+        if position is not None:
+            last_value, last_id = position
+            if descending:
+                batch_query = batch_query.filter(or_(
+                    sort_key < last_value,
+                    and_(sort_key == last_value, id_column < last_id)
+                ))
+            else:
+                batch_query = batch_query.filter(or_(
+                    sort_key > last_value,
+                    and_(sort_key == last_value, id_column > last_id)
+                ))
+        rows = batch_query.limit(per_page + 1).all()
+        
+        for index, (row, sort_value) in enumerate(rows[:per_page]):
+            position = (sort_value, getattr(row, id_column.key))
+            if keep is not None and not keep(row):
+                continue
+            page.append(row)
+            if len(page) == per_page:
+                more = index < len(rows) - 1
+                return page, encode_cursor(*position) if more else None
+        
+        if len(rows) <= per_page:
+            return page, None
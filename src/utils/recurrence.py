@@ -0,0 +1,73 @@
+"""Recurring booking expansion for the Campus Resource Hub."""
+from datetime import timedelta
+
+RECURRENCE_INTERVALS = {
+    'daily': timedelta(days=1),
+    'weekly': timedelta(weeks=1)
+}
+
+MAX_OCCURRENCES = 52
+
+
+def expand_occurrences(start_time, end_time, recurrence='none', until=None, count=None):
+    """
+    Expand a booking into the list of its occurrences.
+    
+    Args:
+        start_time: Start of the first occurrence
+        end_time: End of the first occurrence
+        recurrence: 'none', 'daily' or 'weekly'
+        until: Optional date; occurrences starting after this date are dropped
+        count: Optional maximum number of occurrences
+    
+    Returns:
+        list: (start_time, end_time) tuples in chronological order, capped at
+        MAX_OCCURRENCES
+    
+    Raises:
+        ValueError: If a recurring booking has neither until nor count
+    """
+    interval = RECURRENCE_INTERVALS.get(recurrence)
+    if interval is None:
+        return [(start_time, end_time)]
+    
+    if until is None and not count:
+        raise ValueError('A recurring booking needs an end date or a number of occurrences.')
+    
+    limit = min(count or MAX_OCCURRENCES, MAX_OCCURRENCES)
+    occurrences = []
+    current_start, current_end = start_time, end_time
+    while len(occurrences) < limit:
+        if until is not None and current_start.date() > until:
+            break
+        occurrences.append((current_start, current_end))
+        current_start += interval
+        current_end += interval
+    return occurrences
+
+
+def find_overlaps(occurrences, existing):
+    """
+    Find which occurrences overlap any existing interval, in one sorted sweep.
+    
+    Args:
+        occurrences: Non-overlapping (start, end) tuples sorted by start
+        existing: (start, end) tuples of existing bookings, in any order
+    
+    Returns:
+        list: The occurrences that overlap at least one existing interval
+    """
+    existing = sorted(existing)
+    overlaps = []
+    i = 0
+    for occ_start, occ_end in occurrences:
+        # Existing intervals ending before this occurrence cannot overlap later ones either
+        while i < len(existing) and existing[i][1] <= occ_start:
+            i += 1
+        j = i
+        while j < len(existing) and existing[j][0] < occ_end:
+            if existing[j][1] > occ_start:
+                overlaps.append((occ_start, occ_end))
+                break
+            j += 1
+    return overlaps
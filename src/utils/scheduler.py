@@ -0,0 +1,90 @@
+"""In-process background jobs for the Campus Resource Hub.
+
+Jobs run on a daemon thread inside an app context, one after another on a
+fixed interval. The sweep can also be run on demand (or from cron) with the
+`flask complete-past-bookings` command, notification retention with
+`flask archive-notifications` and the analytics rollups with
+`flask update-booking-rollups`.
+"""
+import functools
+import os
+import threading
+import time
+
+DEFAULT_SWEEP_INTERVAL = 300  # seconds
+DEFAULT_RETENTION_INTERVAL = 3600  # seconds
+
+
+def _run_jobs(app, jobs, interval, stop_event):
+    """Run each job every `interval` seconds until stop_event is set."""
+    from src.database import db
+    
+    while not stop_event.is_set():
+        for job in jobs:
+            with app.app_context():
+                try:
+                    job()
+                except Exception as e:
+                    db.session.rollback()
+                    app.logger.exception(f'Background job {job.__name__} failed: {e}')
+                finally:
+                    db.session.remove()
+        stop_event.wait(interval)
+
+
+def _every(seconds, job):
+    """Wrap a job so it runs at most once every `seconds` seconds."""
+    last_run = [None]
+    
+    @functools.wraps(job)
+    def throttled():
+        now = time.monotonic()
+        if last_run[0] is not None and now - last_run[0] < seconds:
+            return None
+        last_run[0] = now
+        return job()
+    
+    return throttled
+
+
+def start_background_jobs(app):
+    """
+    Start the background job thread for the app if enabled.
+    
+    The interval comes from app.config['BOOKING_SWEEP_INTERVAL'] (or the
+    BOOKING_SWEEP_INTERVAL environment variable); 0 disables the thread. It is
+    never started while testing. Notification retention runs at most every
+    NOTIFICATION_RETENTION_INTERVAL seconds.
+    
+    Args:
+        app: The Flask application
+    
+    Returns:
+        threading.Event: Set it to stop the thread, or None if not started
+    """
+    interval = int(app.config.get('BOOKING_SWEEP_INTERVAL',
+                                  os.environ.get('BOOKING_SWEEP_INTERVAL', DEFAULT_SWEEP_INTERVAL)))
+    if interval <= 0 or app.testing:
+        return None
+    
+    retention_interval = int(app.config.get('NOTIFICATION_RETENTION_INTERVAL',
+                                            os.environ.get('NOTIFICATION_RETENTION_INTERVAL', DEFAULT_RETENTION_INTERVAL)))
+    
+    from src.utils import mark_past_bookings_completed
+    from src.utils.analytics import update_booking_rollups
+    from src.utils.notifications import apply_notification_retention
+    
+    jobs = [
+        mark_past_bookings_completed,
+        update_booking_rollups,
+        _every(retention_interval, apply_notification_retention)
+    ]
+    stop_event = threading.Event()
+    thread = threading.Thread(
+        target=_run_jobs,
+        args=(app, jobs, interval, stop_event),
+        name='background-jobs',
+        daemon=True
+    )
+    thread.start()
+    return stop_event
@@ -0,0 +1,206 @@
+"""Full-text search over resources using SQLite FTS5.
+
+The resources_fts virtual table mirrors the searchable text of each resource
+(title, description, location, category and equipment names) and is kept in
+sync by triggers on the resources and resource_equipment tables. When the
+database is not SQLite, or SQLite was built without FTS5, search falls back to
+ILIKE matching.
+"""
+import re
+import sqlite3
+from flask import current_app
+from markupsafe import Markup, escape
+from sqlalchemy import event, func, literal_column, or_, table, column, text
+from src.database import db
+
+FTS_TABLE = 'resources_fts'
+
+# bm25 column weights: title, description, location, category, equipment
+FTS_WEIGHTS = (10.0, 2.0, 4.0, 1.0, 3.0)
+
+# Control characters used to mark snippet highlights before HTML escaping
+_HIGHLIGHT_START = '\x02'
+_HIGHLIGHT_END = '\x03'
+
+_EQUIPMENT_TEXT = "(SELECT group_concat(equipment_name, ' ') FROM resource_equipment WHERE resource_id = {ref})"
+
+_SEARCH_INDEX_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, description, location, category, equipment,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_resource_insert AFTER INSERT ON resources BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, description, location, category, equipment)
+        VALUES (new.id, new.title, new.description, new.location, new.category,
+                {_EQUIPMENT_TEXT.format(ref='new.id')});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_resource_update
+    AFTER UPDATE OF title, description, location, category ON resources BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+        INSERT INTO {FTS_TABLE}(rowid, title, description, location, category, equipment)
+        VALUES (new.id, new.title, new.description, new.location, new.category,
+                {_EQUIPMENT_TEXT.format(ref='new.id')});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_resource_delete AFTER DELETE ON resources BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_equipment_insert AFTER INSERT ON resource_equipment BEGIN
+        UPDATE {FTS_TABLE} SET equipment = {_EQUIPMENT_TEXT.format(ref='new.resource_id')}
+        WHERE rowid = new.resource_id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_equipment_update AFTER UPDATE ON resource_equipment BEGIN
+        UPDATE {FTS_TABLE} SET equipment = {_EQUIPMENT_TEXT.format(ref='old.resource_id')}
+        WHERE rowid = old.resource_id;
+        UPDATE {FTS_TABLE} SET equipment = {_EQUIPMENT_TEXT.format(ref='new.resource_id')}
+        WHERE rowid = new.resource_id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_equipment_delete AFTER DELETE ON resource_equipment BEGIN
+        UPDATE {FTS_TABLE} SET equipment = {_EQUIPMENT_TEXT.format(ref='old.resource_id')}
+        WHERE rowid = old.resource_id;
+    END""",
+]
+
+fts_table = table(FTS_TABLE, column('rowid'))
+_fts_ref = literal_column(FTS_TABLE)
+
+
+def fts5_available(connection):
+    """Check whether the connection is SQLite with the FTS5 extension."""
+    if connection.dialect.name != 'sqlite':
+        return False
+    probe = sqlite3.connect(':memory:')
+    try:
+        probe.execute('CREATE VIRTUAL TABLE fts5_probe USING fts5(content)')
+        return True
+    except sqlite3.OperationalError:
+        return False
+    finally:
+        probe.close()
+
+
+def create_search_index(connection):
+    """Create the FTS5 table and its sync triggers if they do not exist.
+    
+    Returns:
+        bool: True if the index was newly created and needs to be populated
+    """
+    exists = connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {'name': FTS_TABLE}
+    ).first() is not None
+    
+    for ddl in _SEARCH_INDEX_DDL:
+        connection.execute(text(ddl))
+    return not exists
+
+
+def rebuild_search_index(connection):
+    """Repopulate the FTS5 table from the resources and equipment tables."""
+    connection.execute(text(f'DELETE FROM {FTS_TABLE}'))
+    connection.execute(text(f"""
+        INSERT INTO {FTS_TABLE}(rowid, title, description, location, category, equipment)
+        SELECT id, title, description, location, category, {_EQUIPMENT_TEXT.format(ref='resources.id')}
+        FROM resources
+    """))
+
+
+def init_search_index():
+    """Create and populate the search index for the current app if FTS5 is available.
+    
+    Returns:
+        bool: Whether FTS5 search is enabled
+    """
+    with db.engine.begin() as connection:
+        if not fts5_available(connection):
+            return False
+        if create_search_index(connection):
+            rebuild_search_index(connection)
+    return True
+
+
+@event.listens_for(db.metadata, 'after_create')
+def _create_search_index_with_tables(target, connection, **kw):
+    """Create the search index alongside the tables in db.create_all()."""
+    if fts5_available(connection) and create_search_index(connection):
+        rebuild_search_index(connection)
+
+
+@event.listens_for(db.metadata, 'before_drop')
+def _drop_search_index_with_tables(target, connection, **kw):
+    """Drop the search index in db.drop_all() so it never outlives its rows."""
+    if connection.dialect.name == 'sqlite':
+        connection.execute(text(f'DROP TABLE IF EXISTS {FTS_TABLE}'))
+
+
+def search_enabled():
+    """Whether the current app is using FTS5 for resource search."""
+    return current_app.config.get('SEARCH_FTS_ENABLED', False)
+
+
+def build_match_query(search):
+    """Turn free-text user input into an FTS5 MATCH expression.
+    
+    Every word becomes a quoted prefix term, so FTS5 operators in the input are
+    treated as plain text and partial words still match ("proj" -> projector).
+    
+    Returns:
+        str: MATCH expression, or None if the input has no searchable words
+    """
+    terms = re.findall(r'\w+', search)
+    if not terms:
+        return None
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def apply_search(query, model, search):
+    """Filter a resource query by a search string.
+    
+    Args:
+        query: Resource query to filter
+        model: The Resource model
+        search: Raw search text from the user
+    
+    Returns:
+        tuple: (filtered query, relevance expression where higher is better,
+                or None when falling back to ILIKE matching)
+    """
+    match_query = build_match_query(search) if search_enabled() else None
+    
+    if match_query is None:
+        query = query.filter(
+            or_(
+                model.title.ilike(f'%{search}%'),
+                model.description.ilike(f'%{search}%'),
+                model.location.ilike(f'%{search}%')
+            )
+        )
+        return query, None
+    
+    query = query.join(fts_table, fts_table.c.rowid == model.id)\
+        .filter(_fts_ref.op('MATCH')(match_query))
+    relevance = -func.bm25(_fts_ref, *FTS_WEIGHTS)
+    return query, relevance
+
+
+def get_search_snippets(search, resource_ids):
+    """Get highlighted text snippets for matching resources.
+    
+    Returns:
+        dict: resource_id -> Markup snippet; empty when FTS5 is unavailable
+    """
+    match_query = build_match_query(search) if search_enabled() else None
+    if match_query is None or not resource_ids:
+        return {}
+    
+    snippet = func.snippet(_fts_ref, -1, _HIGHLIGHT_START, _HIGHLIGHT_END, '…', 16)
+    rows = db.session.query(fts_table.c.rowid, snippet)\
+        .filter(_fts_ref.op('MATCH')(match_query))\
+        .filter(fts_table.c.rowid.in_(list(resource_ids))).all()
+    
+    return {resource_id: highlight_snippet(raw) for resource_id, raw in rows if raw}
+
+
+def highlight_snippet(raw):
+    """Escape a raw FTS5 snippet and turn its highlight markers into <mark> tags."""
+    escaped = str(escape(raw))
+    return Markup(escaped.replace(_HIGHLIGHT_START, '<mark>').replace(_HIGHLIGHT_END, '</mark>'))
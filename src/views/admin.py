@@ -1,27 +1,201 @@
 """Admin routes for the Campus Resource Hub."""
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 from flask_login import current_user
-from sqlalchemy import func, desc
+from sqlalchemy import func, desc, or_
 from sqlalchemy.orm import joinedload
 from datetime import datetime
 from src.database import db
 from src.decorators import admin_required
 from src.models import User, Resource, Booking, Review
-from src.views.resources import get_resource_stats
+from src.views.resources import attach_resource_stats, notify_resource_archived
+from src.utils.notifications import create_notification, notify_users
+from src.utils.admin_stats import get_admin_stats
+from src.utils.pagination import paginate_keyset
+from src.utils.analytics import get_busiest_hours, get_category_booking_stats, get_top_resources
+from src.utils.search import apply_search
 
 admin_bp = Blueprint('admin', __name__)
 
 
+def _render_tab(active_tab, stats=None, **context):
+    """Render one tab of the admin dashboard with the overview numbers.
+    
+    Only the data the tab renders needs to be passed; the template ignores the
+    other tabs' variables.
+    """
+    return render_template('admin/dashboard.html',
+                         stats=stats or get_admin_stats(),
+                         active_tab=active_tab,
+                         **context)
+
+
+# Window of the booking analytics on the overview tab
+ANALYTICS_DAYS = 30
+
+ADMIN_PAGE_SIZE = 25
+MAX_ADMIN_PAGE_SIZE = 100
+
+# Sort modes of the admin tables: name -> (sort key, descending, cursor value type).
+# The first mode of each table is its default.
+USER_SORTS = {
+    'newest': (User.created_at, True, datetime),
+    'oldest': (User.created_at, False, datetime),
+    'name': (User.name, False, str),
+    'email': (User.email, False, str)
+}
+RESOURCE_SORTS = {
+    'newest': (Resource.created_at, True, datetime),
+    'title': (Resource.title, False, str),
+    'rating': (Resource.rating, True, float),
+    'popular': (Resource.booking_count, True, int)
+}
+REVIEW_SORTS = {
+    'newest': (Review.created_at, True, datetime),
+    'oldest': (Review.created_at, False, datetime),
+    'lowest': (Review.rating, False, int),
+    'highest': (Review.rating, True, int)
+}
+
+
+def build_user_query(args):
+    """Build the filtered user query for the admin table from request args (search, role)."""
+    query = User.query
+    search = args.get('search', '').strip()
+    if search:
+        query = query.filter(or_(User.name.ilike(f'%{search}%'), User.email.ilike(f'%{search}%')))
+    role = args.get('role')
+    if role in ('student', 'staff', 'admin'):
+        query = query.filter(User.role == role)
+    return query
+
+
+def build_resource_query(args):
+    """Build the filtered resource query for the admin table from request args (search, status, category)."""
+    query = Resource.query.options(joinedload(Resource.owner))
+    search = args.get('search', '').strip()
+    if search:
+        query, _ = apply_search(query, Resource, search)
+    status = args.get('status')
+    if status in ('draft', 'published', 'archived'):
+        query = query.filter(Resource.status == status)
+    category = args.get('category')
+    if category:
+        query = query.filter(Resource.category == category)
+    return query
+
+
+def build_review_query(args):
+    """Build the filtered review query for the admin table from request args (search, rating)."""
+    query = Review.query.options(joinedload(Review.resource), joinedload(Review.user))
+    search = args.get('search', '').strip()
+    if search:
+        query = query.filter(Review.comment.ilike(f'%{search}%'))
+    rating = args.get('rating', type=int)
+    if rating in range(1, 6):
+        query = query.filter(Review.rating == rating)
+    return query
+
+
+def paginate_admin_table(query, sorts, args):
+    """
+    Fetch one page of an admin table.
+    
+    Every page is a single keyset query, however deep it is.
+    
+    Args:
+        query: Filtered query from one of the build_*_query helpers
+        sorts: The table's sort modes
+        args: Request args with optional sort, cursor and per_page
+    
+    Returns:
+        tuple: (rows, cursor for the next page or None, sort mode used)
+    
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    sort_by = args.get('sort')
+    if sort_by not in sorts:
+        sort_by = next(iter(sorts))
+    sort_key, descending, value_type = sorts[sort_by]
+    per_page = max(1, min(args.get('per_page', ADMIN_PAGE_SIZE, type=int), MAX_ADMIN_PAGE_SIZE))
+    
+    model = query.column_descriptions[0]['entity']
+    rows, next_cursor = paginate_keyset(query, sort_key, model.id, args.get('cursor'), per_page, descending, value_type)
+    return rows, next_cursor, sort_by
+
+
+def _render_table_tab(active_tab, query, sorts, rows_name, transform=None):
+    """Render a paginated admin table tab, restarting from the first page on a bad cursor."""
+    args = request.args
+    try:
+        rows, next_cursor, sort_by = paginate_admin_table(query, sorts, args)
+    except ValueError:
+        args = args.copy()
+        args.pop('cursor', None)
+        rows, next_cursor, sort_by = paginate_admin_table(query, sorts, args)
+    
+    filters = {key: value for key, value in args.items() if key != 'cursor' and value}
+    filters['sort'] = sort_by
+    
+    return _render_tab(active_tab,
+                       filters=filters,
+                       sorts=list(sorts),
+                       is_first_page=not args.get('cursor'),
+                       first_page_url=url_for(request.endpoint, **filters),
+                       next_page_url=url_for(request.endpoint, cursor=next_cursor, **filters) if next_cursor else None,
+                       **{rows_name: transform(rows) if transform else rows})
+
+
+def _table_json(rows, next_cursor, serialize, key):
+    """JSON response for one page of an admin table."""
+    return jsonify({key: [serialize(row) for row in rows], 'next_cursor': next_cursor})
+
+
+def _serialize_user(user):
+    """JSON-ready representation of a user row."""
+    return {
+        'id': user.id,
+        'name': user.name,
+        'email': user.email,
+        'role': user.role,
+        'department': user.department,
+        'created_at': user.created_at.isoformat()
+    }
+
+
+def _serialize_resource(item):
+    """JSON-ready representation of a resource row (a resource with its stats)."""
+    resource = item['resource']
+    return {
+        'id': resource.id,
+        'title': resource.title,
+        'category': resource.category,
+        'status': resource.status,
+        'owner': {'id': resource.owner.id, 'name': resource.owner.name},
+        'rating': item['rating'],
+        'review_count': item['review_count'],
+        'booking_count': item['booking_count'],
+        'created_at': resource.created_at.isoformat(),
+        'url': url_for('resources.detail', resource_id=resource.id)
+    }
+
+
+def _serialize_review(review):
+    """JSON-ready representation of a review row."""
+    return {
+        'id': review.id,
+        'resource': {'id': review.resource.id, 'title': review.resource.title},
+        'user': {'id': review.user.id, 'name': review.user.name},
+        'rating': review.rating,
+        'comment': review.comment,
+        'created_at': review.created_at.isoformat()
+    }
+
+
 @admin_bp.route('/dashboard')
 @admin_required
 def dashboard():
     """Admin dashboard with overview statistics."""
-    # Get statistics
-    total_users = User.query.count()
-    active_resources = Resource.query.filter_by(status='published').count()
-    pending_approvals = Booking.query.filter_by(status='pending').count()
-    total_bookings = Booking.query.count()
-    
     # Get category breakdown
     category_counts = db.session.query(
         Resource.category,
@@ -45,55 +219,39 @@ def dashboard():
         })
     
     # Get recent bookings (last 5)
-    recent_bookings = Booking.query.order_by(desc(Booking.created_at)).limit(5).all()
-    
-    # Get top resources by booking count
-    top_resources = db.session.query(
-        Resource.id,
-        Resource.title,
-        func.count(Booking.id).label('booking_count')
-    ).join(Booking, Resource.id == Booking.resource_id, isouter=True)\
-     .group_by(Resource.id, Resource.title)\
-     .order_by(desc('booking_count'))\
-     .limit(5).all()
-    
-    stats = {
-        'total_users': total_users,
-        'active_resources': active_resources,
-        'pending_approvals': pending_approvals,
-        'total_bookings': total_bookings
-    }
-    
-    return render_template('admin/dashboard.html',
-                         stats=stats,
-                         category_data=category_data,
-                         recent_bookings=recent_bookings,
-                         top_resources=top_resources,
-                         active_tab='overview')
+    recent_bookings = Booking.query.options(joinedload(Booking.user), joinedload(Booking.resource))\
+        .order_by(desc(Booking.created_at)).limit(5).all()
+    
+    # Booking metrics come from the rollup tables, never from raw bookings
+    booking_stats = get_category_booking_stats(days=ANALYTICS_DAYS)
+    for item in booking_stats:
+        item['name'] = category_labels.get(item['category'], item['category'])
+    
+    return _render_tab('overview',
+                       category_data=category_data,
+                       recent_bookings=recent_bookings,
+                       top_resources=get_top_resources(days=ANALYTICS_DAYS),
+                       booking_stats=booking_stats,
+                       busiest_hours=get_busiest_hours(days=ANALYTICS_DAYS),
+                       analytics_days=ANALYTICS_DAYS)
 
 
 @admin_bp.route('/users')
 @admin_required
 def users():
     """User management page."""
-    users_list = User.query.order_by(desc(User.created_at)).all()
-    
-    # Get stats for overview
-    total_users = len(users_list)
-    active_resources = Resource.query.filter_by(status='published').count()
-    pending_approvals = Booking.query.filter_by(status='pending').count()
-    total_bookings = Booking.query.count()
-    
-    return render_template('admin/dashboard.html',
-                         users=users_list,
-                         stats={'total_users': total_users, 'active_resources': active_resources, 'pending_approvals': pending_approvals, 'total_bookings': total_bookings},
-                         category_data=[],
-                         recent_bookings=[],
-                         top_resources=[],
-                         resources=[],
-                         reviews=[],
-                         pending_bookings=[],
-                         active_tab='users')
+    return _render_table_tab('users', build_user_query(request.args), USER_SORTS, 'users')
+
+
+@admin_bp.route('/api/users')
+@admin_required
+def users_api():
+    """API endpoint returning pages of the user table, as JSON."""
+    try:
+        rows, next_cursor, _ = paginate_admin_table(build_user_query(request.args), USER_SORTS, request.args)
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor'}), 400
+    return _table_json(rows, next_cursor, _serialize_user, 'users')
 
 
 @admin_bp.route('/users/<int:user_id>/delete', methods=['POST'])
@@ -138,41 +296,50 @@ def update_user_role(user_id):
     return redirect(url_for('admin.users'))
 
 
+@admin_bp.route('/broadcast', methods=['POST'])
+@admin_required
+def broadcast():
+    """Send an announcement notification to all users, or to one role."""
+    title = request.form.get('title', '').strip()
+    message = request.form.get('message', '').strip()
+    role = request.form.get('role') or None
+    
+    if not title or not message:
+        flash('An announcement needs a title and a message.', 'danger')
+        return redirect(url_for('admin.users'))
+    
+    if role is not None and role not in ['student', 'staff', 'admin']:
+        flash('Invalid role.', 'danger')
+        return redirect(url_for('admin.users'))
+    
+    query = db.select(User.id)
+    if role is not None:
+        query = query.where(User.role == role)
+    
+    sent = notify_users(db.session.scalars(query).all(), 'announcement', title, message)
+    db.session.commit()
+    
+    flash(f'Announcement sent to {sent} user(s).', 'success')
+    return redirect(url_for('admin.users'))
+
+
 @admin_bp.route('/resources')
 @admin_required
 def resources():
     """Resource management page."""
-    resources_list = Resource.query.options(
-        joinedload(Resource.owner)
-    ).order_by(desc(Resource.created_at)).all()
-    
-    # Add stats to each resource
-    resources_with_stats = []
-    for resource in resources_list:
-        stats = get_resource_stats(resource.id)
-        resources_with_stats.append({
-            'resource': resource,
-            'rating': stats['rating'],
-            'review_count': stats['review_count'],
-            'booking_count': stats['booking_count']
-        })
-    
-    # Get stats for overview
-    total_users = User.query.count()
-    active_resources = Resource.query.filter_by(status='published').count()
-    pending_approvals = Booking.query.filter_by(status='pending').count()
-    total_bookings = Booking.query.count()
-    
-    return render_template('admin/dashboard.html',
-                         resources=resources_with_stats,
-                         users=User.query.all(),
-                         stats={'total_users': total_users, 'active_resources': active_resources, 'pending_approvals': pending_approvals, 'total_bookings': total_bookings},
-                         category_data=[],
-                         recent_bookings=[],
-                         top_resources=[],
-                         reviews=[],
-                         pending_bookings=[],
-                         active_tab='resources')
+    return _render_table_tab('resources', build_resource_query(request.args), RESOURCE_SORTS, 'resources',
+                             transform=attach_resource_stats)
+
+
+@admin_bp.route('/api/resources')
+@admin_required
+def resources_api():
+    """API endpoint returning pages of the resource table, as JSON."""
+    try:
+        rows, next_cursor, _ = paginate_admin_table(build_resource_query(request.args), RESOURCE_SORTS, request.args)
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor'}), 400
+    return _table_json(attach_resource_stats(rows), next_cursor, _serialize_resource, 'resources')
 
 
 @admin_bp.route('/resources/<int:resource_id>/archive', methods=['POST'])
@@ -180,6 +347,8 @@ def resources():
 def archive_resource(resource_id):
     """Archive a resource."""
     resource = Resource.query.get_or_404(resource_id)
+    if resource.status != 'archived':
+        notify_resource_archived(resource)
     resource.status = 'archived'
     resource.updated_at = datetime.utcnow()
     db.session.commit()
@@ -209,21 +378,10 @@ def approvals():
         .options(joinedload(Booking.resource), joinedload(Booking.user))\
         .order_by(Booking.created_at).all()
     
-    # Get stats for overview
-    total_users = User.query.count()
-    active_resources = Resource.query.filter_by(status='published').count()
-    total_bookings = Booking.query.count()
+    # The list itself is the exact pending count
+    stats = {**get_admin_stats(), 'pending_approvals': len(pending_bookings)}
     
-    return render_template('admin/dashboard.html',
-                         pending_bookings=pending_bookings,
-                         users=User.query.all(),
-                         resources=[],
-                         stats={'total_users': total_users, 'active_resources': active_resources, 'pending_approvals': len(pending_bookings), 'total_bookings': total_bookings},
-                         category_data=[],
-                         recent_bookings=[],
-                         top_resources=[],
-                         reviews=[],
-                         active_tab='approvals')
+    return _render_tab('approvals', stats=stats, pending_bookings=pending_bookings)
 
 
 @admin_bp.route('/approvals/<int:booking_id>/approve', methods=['POST'])
@@ -240,7 +398,6 @@ def approve_booking(booking_id):
     booking.updated_at = datetime.utcnow()
     
     # Create notification
-    from src.views.bookings import create_notification
     create_notification(
         booking.user_id,
         'booking_confirmed',
@@ -269,7 +426,6 @@ def reject_booking(booking_id):
     booking.updated_at = datetime.utcnow()
     
     # Create notification
-    from src.views.bookings import create_notification
     create_notification(
         booking.user_id,
         'booking_rejected',
@@ -288,27 +444,18 @@ def reject_booking(booking_id):
 @admin_required
 def reviews():
     """Review moderation page."""
-    reviews_list = Review.query.options(
-        joinedload(Review.resource),
-        joinedload(Review.user)
-    ).order_by(desc(Review.created_at)).all()
-    
-    # Get stats for overview
-    total_users = User.query.count()
-    active_resources = Resource.query.filter_by(status='published').count()
-    pending_approvals = Booking.query.filter_by(status='pending').count()
-    total_bookings = Booking.query.count()
-    
-    return render_template('admin/dashboard.html',
-                         reviews=reviews_list,
-                         users=User.query.all(),
-                         resources=[],
-                         stats={'total_users': total_users, 'active_resources': active_resources, 'pending_approvals': pending_approvals, 'total_bookings': total_bookings},
-                         category_data=[],
-                         recent_bookings=[],
-                         top_resources=[],
-                         pending_bookings=[],
-                         active_tab='reviews')
+    return _render_table_tab('reviews', build_review_query(request.args), REVIEW_SORTS, 'reviews')
+
+
+@admin_bp.route('/api/reviews')
+@admin_required
+def reviews_api():
+    """API endpoint returning pages of the review table, as JSON."""
+    try:
+        rows, next_cursor, _ = paginate_admin_table(build_review_query(request.args), REVIEW_SORTS, request.args)
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor'}), 400
+    return _table_json(rows, next_cursor, _serialize_review, 'reviews')
 
 
 @admin_bp.route('/chatbot/query', methods=['POST'])
@@ -356,7 +503,7 @@ User Question: {user_question}
 
 Please generate a SQL SELECT query to answer this question. Return ONLY the SQL query, nothing else.
 Make sure the query is safe (SELECT only) and follows SQLite syntax. Use proper table and column names as described in the schema above."""
-        
+
         # Helper function to make API call with retry logic
         def make_api_call_with_retry(model_name, prompt, max_retries=3):
             """Make API call with exponential backoff retry for rate limits."""
@@ -444,7 +591,7 @@ Results ({query_result['row_count']} rows):
 {result_data}
 
 Please provide a clear, natural language answer to the user's question based on these results. Be concise and informative."""
-        
+
         # Use the same model that worked for SQL generation, with retry logic
         summary_response = make_api_call_with_retry(model, summary_prompt)
         result_text = summary_response.text
@@ -458,7 +605,7 @@ Please provide a clear, natural language answer to the user's question based on
             'sql': generated_sql,
             'row_count': query_result['row_count']
         })
-        
+    
     except Exception as e:
         # Log the error for debugging
         import traceback
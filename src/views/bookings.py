@@ -1,17 +1,41 @@
 """Booking routes for the Campus Resource Hub."""
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, abort, Response
 from flask_login import login_required, current_user
-from sqlalchemy import and_, or_
+from sqlalchemy import and_, or_, insert, update
+from sqlalchemy.orm import selectinload
 from datetime import datetime, timedelta
-from src.database import db
-from src.models import Booking, Resource, Notification
+import hashlib
+import uuid
+from src.database import db, acquire_resource_lock
+from src.models import Booking, Resource
+from src.views.resources import adjust_resource_counters
+from src.utils.recurrence import RECURRENCE_INTERVALS, expand_occurrences, find_overlaps
+from src.utils.notifications import create_notification, notify_many
+from src.utils.admin_stats import invalidate_admin_stats
+from src.utils.pagination import paginate_keyset
+from src.utils.availability import get_resource_schedule, subtract_intervals
+from src.utils.calendar_feed import (
+    bump_calendar_version, build_ical, calendar_token, get_occupancy, user_id_from_calendar_token
+)
 
 bookings_bp = Blueprint('bookings', __name__)
 
+# Longest date range the free-slot API searches in one request
+MAX_FREE_SLOT_DAYS = 31
 
-def check_booking_conflict(resource_id, start_time, end_time, exclude_booking_id=None):
-    """Check if a booking conflicts with existing approved/pending bookings."""
-    # Query for overlapping bookings
+# Bookings shown in the upcoming and pending tabs, and per page of the past tab
+BOOKINGS_SECTION_LIMIT = 50
+PAST_BOOKINGS_PAGE_SIZE = 20
+
+# Calendar API window, and how far back and ahead the iCalendar feeds reach
+DEFAULT_CALENDAR_DAYS = 7
+MAX_CALENDAR_DAYS = 42
+ICAL_PAST_DAYS = 30
+ICAL_FUTURE_DAYS = 365
+
+
+def _resource_conflict_query(resource_id, start_time, end_time, exclude_booking_id=None):
+    """Query for approved/pending bookings of a resource overlapping a time range."""
     # A booking conflicts if:
     # - It starts before another booking ends AND
     # - It ends after another booking starts
@@ -25,13 +49,11 @@ def check_booking_conflict(resource_id, start_time, end_time, exclude_booking_id
     if exclude_booking_id:
         conflict_query = conflict_query.filter(Booking.id != exclude_booking_id)
     
-    conflicting_bookings = conflict_query.all()
-    return len(conflicting_bookings) > 0, conflicting_bookings
+    return conflict_query
 
 
-def check_user_booking_conflict(user_id, start_time, end_time, exclude_booking_id=None):
-    """Check if a booking conflicts with user's own existing bookings."""
-    # Query for overlapping bookings by the same user
+def _user_conflict_query(user_id, start_time, end_time, exclude_booking_id=None):
+    """Query for a user's approved/pending bookings overlapping a time range."""
     conflict_query = Booking.query.filter(
         Booking.user_id == user_id,
         Booking.status.in_(['approved', 'pending']),
@@ -42,54 +64,215 @@ def check_user_booking_conflict(user_id, start_time, end_time, exclude_booking_i
     if exclude_booking_id:
         conflict_query = conflict_query.filter(Booking.id != exclude_booking_id)
     
-    conflicting_bookings = conflict_query.all()
+    return conflict_query
+
+
+def has_booking_conflict(resource_id, start_time, end_time, exclude_booking_id=None):
+    """Check whether any approved/pending booking overlaps, stopping at the first match."""
+    conflict_query = _resource_conflict_query(resource_id, start_time, end_time, exclude_booking_id)
+    return db.session.query(conflict_query.exists()).scalar()
+
+
+def has_user_booking_conflict(user_id, start_time, end_time, exclude_booking_id=None):
+    """Check whether any of the user's bookings overlap, stopping at the first match."""
+    conflict_query = _user_conflict_query(user_id, start_time, end_time, exclude_booking_id)
+    return db.session.query(conflict_query.exists()).scalar()
+
+
+def check_booking_conflict(resource_id, start_time, end_time, exclude_booking_id=None):
+    """Check if a booking conflicts with existing approved/pending bookings."""
+    conflicting_bookings = _resource_conflict_query(
+        resource_id, start_time, end_time, exclude_booking_id
+    ).all()
+    return len(conflicting_bookings) > 0, conflicting_bookings
+
+
+def check_user_booking_conflict(user_id, start_time, end_time, exclude_booking_id=None):
+    """Check if a booking conflicts with user's own existing bookings."""
+    conflicting_bookings = _user_conflict_query(
+        user_id, start_time, end_time, exclude_booking_id
+    ).all()
     return len(conflicting_bookings) > 0, conflicting_bookings
 
 
-def create_notification(user_id, notification_type, title, message, link=None):
-    """Helper function to create notifications."""
-    notification = Notification(
-        user_id=user_id,
-        type=notification_type,
-        title=title,
-        message=message,
-        link=link,
-        read=False
+def find_series_conflicts(resource_id, occurrences, exclude_series_id=None):
+    """
+    Find which occurrences of a series conflict with existing bookings.
+    
+    Fetches every approved/pending booking in the span of the whole series with
+    one range query, then sweeps it against the occurrences.
+    
+    Args:
+        resource_id: Resource being booked
+        occurrences: (start_time, end_time) tuples sorted by start_time
+        exclude_series_id: Ignore bookings belonging to this series (for edits)
+    
+    Returns:
+        list: The conflicting (start_time, end_time) occurrences
+    """
+    if not occurrences:
+        return []
+    
+    existing_query = db.session.query(Booking.start_time, Booking.end_time).filter(
+        Booking.resource_id == resource_id,
+        Booking.status.in_(['approved', 'pending']),
+        Booking.start_time < occurrences[-1][1],
+        Booking.end_time > occurrences[0][0]
     )
-    db.session.add(notification)
-    return notification
+    
+    if exclude_series_id:
+        existing_query = existing_query.filter(
+            or_(Booking.series_id.is_(None), Booking.series_id != exclude_series_id)
+        )
+    
+    return find_overlaps(occurrences, existing_query.all())
 
 
-@bookings_bp.route('/')
-@login_required
-def list_bookings():
-    """List all bookings for the current user."""
-    # Mark past bookings as completed
-    from src.utils import mark_past_bookings_completed
-    mark_past_bookings_completed()
+def create_booking_series(resource_id, user_id, occurrences, status, notes, recurrence):
+    """Insert all occurrences of a recurring booking with one bulk INSERT.
+    
+    Returns:
+        str: The series_id linking the inserted bookings
     
+    Raises:
+        ValueError: If there are no occurrences to insert
+    """
+    if not occurrences:
+        raise ValueError('A booking series needs at least one occurrence.')
+    
+    series_id = uuid.uuid4().hex
     now = datetime.utcnow()
     
-    # Get all bookings for current user
-    all_bookings = Booking.query.filter_by(user_id=current_user.id).order_by(Booking.start_time.desc()).all()
+    db.session.execute(insert(Booking), [{
+        'resource_id': resource_id,
+        'user_id': user_id,
+        'start_time': start_time,
+        'end_time': end_time,
+        'status': status,
+        'notes': notes,
+        'recurrence': recurrence,
+        'series_id': series_id,
+        'created_at': now,
+        'updated_at': now
+    } for start_time, end_time in occurrences])
+    invalidate_admin_stats()
+    bump_calendar_version([resource_id])
+    
+    adjust_resource_counters(resource_id, booking_delta=len(occurrences))
+    return series_id
+
+
+def find_free_slots(resource, range_start, range_end, duration):
+    """
+    Find the free times of a resource that can fit a booking of a given length.
+    
+    Busy times come from one range query over the resource's approved and
+    pending bookings, already sorted, and are swept out of the resource's
+    open hours in a single pass.
+    
+    Args:
+        resource: The Resource to search
+        range_start: Start of the search range
+        range_end: End of the search range
+        duration: timedelta the booking needs
+    
+    Returns:
+        list: Maximal free (start, end) intervals at least duration long, in order
+    
+    Raises:
+        ValueError: If the duration breaks the resource's duration limits
+    """
+    schedule = get_resource_schedule(resource)
+    if schedule is None:
+        open_times = [(range_start, range_end)]
+    else:
+        schedule.check_duration(int(duration.total_seconds() // 60))
+        open_times = schedule.open_intervals(range_start, range_end)
+    
+    if not open_times:
+        return []
     
-    # Categorize bookings
-    upcoming = []
-    pending = []
-    past = []
+    busy = _resource_conflict_query(resource.id, open_times[0][0], open_times[-1][1])\
+        .with_entities(Booking.start_time, Booking.end_time)\
+        .order_by(Booking.start_time).all()
+    
+    return [(start, end) for start, end in subtract_intervals(open_times, busy) if end - start >= duration]
+
+
+def availability_error(resource, occurrences):
+    """
+    Check occurrences against the resource's availability rules.
+    
+    Returns:
+        str: Why the first occurrence that does not fit is unavailable, or None
+    """
+    schedule = get_resource_schedule(resource)
+    if schedule is None:
+        return None
+    for start_time, end_time in occurrences:
+        try:
+            schedule.validate(start_time, end_time)
+        except ValueError as e:
+            if len(occurrences) > 1:
+                return f'{start_time.strftime("%B %d")}: {e}'
+            return str(e)
+    return None
+
+
+def _format_conflicts(conflicts, limit=3):
+    """Format conflicting occurrences for a flash message."""
+    dates = ', '.join(start.strftime('%B %d') for start, _ in conflicts[:limit])
+    if len(conflicts) > limit:
+        dates += f' and {len(conflicts) - limit} more'
+    return dates
+
+
+@bookings_bp.route('/')
+@login_required
+def list_bookings():
+    """
+    List the current user's bookings.
     
-    for booking in all_bookings:
-        if booking.status in ['pending']:
-            pending.append(booking)
-        elif booking.status in ['approved'] and booking.start_time > now:
-            upcoming.append(booking)
-        elif booking.status in ['approved', 'completed', 'cancelled', 'rejected'] or booking.end_time < now:
-            past.append(booking)
+    Each tab comes from its own query on the user's booking indexes, and the
+    past tab is paginated by cursor, so the page costs the same however many
+    bookings the user has made.
+    """
+    now = datetime.utcnow()
+    user_bookings = Booking.query.filter(Booking.user_id == current_user.id)
+    
+    upcoming_query = user_bookings.filter(Booking.status == 'approved', Booking.start_time > now)
+    upcoming = upcoming_query.options(selectinload(Booking.resource))\
+        .order_by(Booking.start_time, Booking.id)\
+        .limit(BOOKINGS_SECTION_LIMIT).all()
+    
+    pending_query = user_bookings.filter(Booking.status == 'pending')
+    pending = pending_query.options(selectinload(Booking.resource).joinedload(Resource.owner))\
+        .order_by(Booking.start_time, Booking.id)\
+        .limit(BOOKINGS_SECTION_LIMIT).all()
+    
+    past_query = user_bookings.options(selectinload(Booking.resource)).filter(or_(
+        Booking.status.in_(['completed', 'cancelled', 'rejected']),
+        and_(Booking.status == 'approved', Booking.start_time <= now)
+    ))
+    cursor = request.args.get('cursor')
+    try:
+        past, next_cursor = paginate_keyset(past_query, Booking.start_time, Booking.id, cursor,
+                                            PAST_BOOKINGS_PAGE_SIZE)
+    except ValueError:
+        cursor = None
+        past, next_cursor = paginate_keyset(past_query, Booking.start_time, Booking.id, None,
+                                            PAST_BOOKINGS_PAGE_SIZE)
     
     return render_template('bookings/list.html',
                          upcoming_bookings=upcoming,
+                         upcoming_count=upcoming_query.order_by(None).count(),
                          pending_bookings=pending,
-                         past_bookings=past)
+                         pending_count=pending_query.order_by(None).count(),
+                         past_bookings=past,
+                         is_first_past_page=not cursor,
+                         next_past_url=url_for('bookings.list_bookings', cursor=next_cursor) if next_cursor else None,
+                         calendar_url=url_for('bookings.user_ical', token=calendar_token(current_user.id),
+                                              _external=True))
 
 
 @bookings_bp.route('/create/<int:resource_id>', methods=['GET', 'POST'])
@@ -111,6 +294,11 @@ def create(resource_id):
         end_time_str = request.form.get('end_time')
         notes = request.form.get('notes', '').strip()
         recurrence = request.form.get('recurrence', 'none')
+        recurrence_until_str = request.form.get('recurrence_until', '').strip()
+        recurrence_count = request.form.get('recurrence_count', type=int)
+        
+        if recurrence not in RECURRENCE_INTERVALS:
+            recurrence = 'none'
         
         if not all([date_str, start_time_str, end_time_str]):
             flash('Please fill in all required fields.', 'danger')
@@ -133,13 +321,53 @@ def create(resource_id):
             flash('Cannot book in the past.', 'danger')
             return render_template('bookings/create.html', resource=resource)
         
-        # Check for resource conflicts (other users' bookings)
-        has_resource_conflict, resource_conflicting_bookings = check_booking_conflict(resource_id, start_datetime, end_datetime)
+        # Expand recurring bookings into their occurrences
+        try:
+            recurrence_until = None
+            if recurrence_until_str:
+                recurrence_until = datetime.strptime(recurrence_until_str, "%Y-%m-%d").date()
+        except ValueError:
+            flash('Invalid repeat-until date.', 'danger')
+            return render_template('bookings/create.html', resource=resource)
+        
+        if recurrence != 'none' and recurrence_count is not None and recurrence_count < 1:
+            flash('The number of occurrences must be at least 1.', 'danger')
+            return render_template('bookings/create.html', resource=resource)
+        
+        try:
+            occurrences = expand_occurrences(start_datetime, end_datetime, recurrence,
+                                             until=recurrence_until, count=recurrence_count)
+        except ValueError as e:
+            flash(str(e), 'danger')
+            return render_template('bookings/create.html', resource=resource)
         
-        if has_resource_conflict:
-            flash('This time slot conflicts with an existing booking. Please choose another time.', 'danger')
+        if not occurrences:
+            flash('The repeat-until date must not be before the booking date.', 'danger')
             return render_template('bookings/create.html', resource=resource)
         
+        unavailable = availability_error(resource, occurrences)
+        if unavailable:
+            flash(unavailable, 'danger')
+            return render_template('bookings/create.html', resource=resource)
+        
+        # Lock the resource so the conflict check and insert below are atomic
+        # with respect to concurrent requests for the same slot
+        acquire_resource_lock(resource_id)
+        
+        # Check for resource conflicts (other users' bookings)
+        if len(occurrences) == 1:
+            if has_booking_conflict(resource_id, start_datetime, end_datetime):
+                db.session.rollback()
+                flash('This time slot conflicts with an existing booking. Please choose another time.', 'danger')
+                return render_template('bookings/create.html', resource=resource)
+        else:
+            conflicts = find_series_conflicts(resource_id, occurrences)
+            if conflicts:
+                db.session.rollback()
+                flash(f'This recurring booking conflicts with existing bookings on {_format_conflicts(conflicts)}. '
+                      'Please choose another time.', 'danger')
+                return render_template('bookings/create.html', resource=resource)
+        
         # Check for user's own booking conflicts
         # This will be handled via JavaScript modal on the frontend
         # For now, we'll proceed with the booking and let the frontend handle the conflict warning
@@ -150,19 +378,27 @@ def create(resource_id):
         else:
             booking_status = 'approved'
         
-        # Create booking
-        booking = Booking(
-            resource_id=resource_id,
-            user_id=current_user.id,
-            start_time=start_datetime,
-            end_time=end_datetime,
-            status=booking_status,
-            notes=notes,
-            recurrence=recurrence
-        )
-        
-        db.session.add(booking)
-        db.session.flush()  # Get booking ID
+        # Create booking (or the whole series in one bulk insert)
+        if len(occurrences) == 1:
+            booking = Booking(
+                resource_id=resource_id,
+                user_id=current_user.id,
+                start_time=start_datetime,
+                end_time=end_datetime,
+                status=booking_status,
+                notes=notes,
+                recurrence=recurrence
+            )
+            
+            db.session.add(booking)
+            db.session.flush()  # Get booking ID
+            adjust_resource_counters(resource_id, booking_delta=1)
+            when = f'on {start_datetime.strftime("%B %d, %Y")}'
+        else:
+            create_booking_series(resource_id, current_user.id, occurrences,
+                                  booking_status, notes, recurrence)
+            when = (f'{recurrence} from {start_datetime.strftime("%B %d, %Y")} '
+                    f'({len(occurrences)} occurrences)')
         
         # Create notifications
         if booking_status == 'approved':
@@ -171,7 +407,7 @@ def create(resource_id):
                 current_user.id,
                 'booking_confirmed',
                 'Booking Confirmed',
-                f'Your booking for {resource.title} on {start_datetime.strftime("%B %d, %Y")} has been confirmed.',
+                f'Your booking for {resource.title} {when} has been confirmed.',
                 url_for('bookings.list_bookings')
             )
             # Notify resource owner
@@ -179,7 +415,7 @@ def create(resource_id):
                 resource.owner_id,
                 'booking_confirmed',
                 'New Booking',
-                f'{current_user.name} has booked {resource.title} on {start_datetime.strftime("%B %d, %Y")}.',
+                f'{current_user.name} has booked {resource.title} {when}.',
                 url_for('bookings.list_bookings')
             )
             flash('Booking confirmed!', 'success')
@@ -197,7 +433,7 @@ def create(resource_id):
                 resource.owner_id,
                 'booking_pending',
                 'Booking Request Pending',
-                f'{current_user.name} has requested to book {resource.title} on {start_datetime.strftime("%B %d, %Y")}.',
+                f'{current_user.name} has requested to book {resource.title} {when}.',
                 url_for('bookings.manage')
             )
             flash('Booking request submitted. You will be notified once it\'s approved.', 'info')
@@ -206,16 +442,8 @@ def create(resource_id):
         
         return redirect(url_for('bookings.list_bookings'))
     
-    # Get existing bookings for this resource to show on calendar
-    existing_bookings = Booking.query.filter(
-        Booking.resource_id == resource_id,
-        Booking.status.in_(['approved', 'pending']),
-        Booking.start_time >= datetime.utcnow()
-    ).all()
-    
-    return render_template('bookings/create.html',
-                         resource=resource,
-                         existing_bookings=existing_bookings)
+    # Existing bookings are loaded a week at a time from the calendar API
+    return render_template('bookings/create.html', resource=resource)
 
 
 @bookings_bp.route('/<int:booking_id>/cancel', methods=['POST'])
@@ -269,6 +497,143 @@ def cancel(booking_id):
     return redirect(url_for('bookings.list_bookings'))
 
 
+@bookings_bp.route('/series/<series_id>/cancel', methods=['POST'])
+@login_required
+def cancel_series(series_id):
+    """Cancel all upcoming occurrences of a recurring booking."""
+    wants_json = request.is_json or request.headers.get('Content-Type') == 'application/json'
+    booking = Booking.query.filter_by(series_id=series_id).first_or_404()
+    
+    # Check ownership
+    if booking.user_id != current_user.id and not current_user.is_admin():
+        if wants_json:
+            return jsonify({'error': 'Unauthorized'}), 403
+        flash('You do not have permission to cancel this booking series.', 'danger')
+        return redirect(url_for('bookings.list_bookings'))
+    
+    now = datetime.utcnow()
+    cancelled_count = Booking.query.filter(
+        Booking.series_id == series_id,
+        Booking.status.in_(['pending', 'approved']),
+        Booking.start_time > now
+    ).update({Booking.status: 'cancelled', Booking.updated_at: now}, synchronize_session=False)
+    
+    if cancelled_count == 0:
+        if wants_json:
+            return jsonify({'error': 'No upcoming bookings in this series'}), 400
+        flash('This booking series has no upcoming bookings to cancel.', 'danger')
+        return redirect(url_for('bookings.list_bookings'))
+    
+    invalidate_admin_stats()
+    bump_calendar_version([booking.resource_id])
+    resource = Resource.query.get(booking.resource_id)
+    
+    # Notify resource owner and user
+    notify_many([
+        {
+            'user_id': resource.owner_id,
+            'type': 'booking_cancelled',
+            'title': 'Booking Series Cancelled',
+            'message': f'{current_user.name} has cancelled {cancelled_count} upcoming bookings for {resource.title}.',
+            'link': url_for('bookings.manage')
+        },
+        {
+            'user_id': booking.user_id,
+            'type': 'booking_cancelled',
+            'title': 'Booking Series Cancelled',
+            'message': f'{cancelled_count} upcoming bookings for {resource.title} have been cancelled.',
+            'link': url_for('bookings.list_bookings')
+        }
+    ])
+    
+    db.session.commit()
+    
+    if wants_json:
+        return jsonify({'success': True, 'cancelled_count': cancelled_count})
+    
+    flash(f'Cancelled {cancelled_count} upcoming bookings in this series.', 'success')
+    return redirect(url_for('bookings.list_bookings'))
+
+
+@bookings_bp.route('/api/series/<series_id>', methods=['POST'])
+@login_required
+def update_series_api(series_id):
+    """API endpoint to move all upcoming occurrences of a series to new times of day."""
+    data = request.get_json() or {}
+    start_time_str = data.get('start_time')
+    end_time_str = data.get('end_time')
+    
+    if not all([start_time_str, end_time_str]):
+        return jsonify({'error': 'Missing required fields'}), 400
+    
+    try:
+        new_start = datetime.strptime(start_time_str, "%H:%M").time()
+        new_end = datetime.strptime(end_time_str, "%H:%M").time()
+    except ValueError:
+        return jsonify({'error': 'Invalid time format'}), 400
+    
+    if new_start >= new_end:
+        return jsonify({'error': 'End time must be after start time'}), 400
+    
+    first = Booking.query.filter_by(series_id=series_id).first_or_404()
+    if first.user_id != current_user.id and not current_user.is_admin():
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    resource = Resource.query.get(first.resource_id)
+    now = datetime.utcnow()
+    
+    acquire_resource_lock(resource.id)
+    
+    upcoming = db.session.query(Booking.id, Booking.start_time).filter(
+        Booking.series_id == series_id,
+        Booking.status.in_(['pending', 'approved']),
+        Booking.start_time > now
+    ).order_by(Booking.start_time).all()
+    
+    if not upcoming:
+        db.session.rollback()
+        return jsonify({'error': 'No upcoming bookings in this series'}), 400
+    
+    occurrences = [(datetime.combine(start.date(), new_start), datetime.combine(start.date(), new_end))
+                   for _, start in upcoming]
+    
+    # Moving today's occurrence to an earlier time of day could put it in the past
+    if occurrences[0][0] <= now:
+        db.session.rollback()
+        return jsonify({'error': 'Cannot book in the past.'}), 400
+    
+    unavailable = availability_error(resource, occurrences)
+    if unavailable:
+        db.session.rollback()
+        return jsonify({'error': unavailable}), 400
+    
+    conflicts = find_series_conflicts(resource.id, occurrences, exclude_series_id=series_id)
+    if conflicts:
+        db.session.rollback()
+        return jsonify({
+            'error': 'The new times conflict with existing bookings',
+            'conflicts': [{'start_time': s.isoformat(), 'end_time': e.isoformat()} for s, e in conflicts]
+        }), 409
+    
+    changes = {'updated_at': now}
+    if 'notes' in data:
+        changes['notes'] = (data.get('notes') or '').strip()
+    # Moved bookings need to be approved again when the resource requires approval
+    if resource.requires_approval and resource.owner_id != current_user.id:
+        changes['status'] = 'pending'
+    
+    db.session.execute(update(Booking), [
+        dict(changes, id=booking_id, start_time=start, end_time=end)
+        for (booking_id, _), (start, end) in zip(upcoming, occurrences)
+    ])
+    if 'status' in changes:
+        invalidate_admin_stats()
+    bump_calendar_version([resource.id])
+    db.session.commit()
+    
+    return jsonify({'success': True, 'updated_count': len(upcoming)})
+
+
 @bookings_bp.route('/manage')
 @login_required
 def manage():
@@ -311,8 +676,9 @@ def approve(booking_id):
         flash('This booking is not pending approval.', 'danger')
         return redirect(url_for('bookings.manage'))
     
-    # Check for conflicts before approving
-    has_conflict, conflicting_bookings = check_booking_conflict(
+    # Check for conflicts before approving, holding the resource lock
+    acquire_resource_lock(booking.resource_id)
+    has_conflict = has_booking_conflict(
         booking.resource_id,
         booking.start_time,
         booking.end_time,
@@ -320,6 +686,7 @@ def approve(booking_id):
     )
     
     if has_conflict:
+        db.session.rollback()
         flash('Cannot approve: This booking conflicts with an existing approved booking.', 'danger')
         return redirect(url_for('bookings.manage'))
     
@@ -375,6 +742,168 @@ def reject(booking_id):
     return redirect(url_for('bookings.manage'))
 
 
+@bookings_bp.route('/api/free-slots/<int:resource_id>')
+@login_required
+def free_slots_api(resource_id):
+    """API endpoint listing the free times of a resource over a date range."""
+    resource = Resource.query.get_or_404(resource_id)
+    if resource.status != 'published':
+        return jsonify({'error': 'This resource is not available for booking'}), 400
+    
+    duration = request.args.get('duration', 60, type=int)
+    if duration is None or duration <= 0:
+        return jsonify({'error': 'Duration must be a positive number of minutes'}), 400
+    
+    try:
+        date_from = datetime.strptime(request.args.get('start', ''), '%Y-%m-%d')
+        date_to = datetime.strptime(request.args.get('end') or request.args.get('start', ''), '%Y-%m-%d')
+    except ValueError:
+        return jsonify({'error': 'Invalid date format'}), 400
+    
+    range_end = date_to + timedelta(days=1)
+    if date_to < date_from or (range_end - date_from).days > MAX_FREE_SLOT_DAYS:
+        return jsonify({'error': f'The date range must cover 1 to {MAX_FREE_SLOT_DAYS} days'}), 400
+    
+    # Free times start no earlier than the next whole minute
+    now = datetime.utcnow().replace(second=0, microsecond=0) + timedelta(minutes=1)
+    range_start = max(date_from, now)
+    
+    slots = []
+    if range_start < range_end:
+        try:
+            slots = find_free_slots(resource, range_start, range_end, timedelta(minutes=duration))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+    
+    return jsonify({
+        'resource_id': resource.id,
+        'duration': duration,
+        'slots': [{'start_time': start.isoformat(), 'end_time': end.isoformat()} for start, end in slots]
+    })
+
+
+def _not_modified(etag):
+    """304 response for a request whose If-None-Match already holds etag, else None."""
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+    return None
+
+
+def _viewable_resource(resource_id):
+    """Load a resource whose calendar the current visitor may see, or abort with 404."""
+    resource = Resource.query.get_or_404(resource_id)
+    if resource.status != 'published' and not (
+            current_user.is_authenticated and (resource.owner_id == current_user.id or current_user.is_admin())):
+        abort(404)
+    return resource
+
+
+@bookings_bp.route('/api/calendar/<int:resource_id>')
+@login_required
+def calendar_api(resource_id):
+    """API endpoint returning a resource's occupied intervals over a window of days.
+    
+    The response carries an ETag built from the resource's calendar version,
+    so a client revalidating an unchanged window gets a 304 without any
+    bookings being read.
+    """
+    resource = _viewable_resource(resource_id)
+    
+    days = request.args.get('days', DEFAULT_CALENDAR_DAYS, type=int)
+    if days is None or not 1 <= days <= MAX_CALENDAR_DAYS:
+        return jsonify({'error': f'days must be between 1 and {MAX_CALENDAR_DAYS}'}), 400
+    try:
+        start = datetime.strptime(request.args.get('start') or datetime.utcnow().strftime('%Y-%m-%d'), '%Y-%m-%d')
+    except ValueError:
+        return jsonify({'error': 'Invalid date format'}), 400
+    end = start + timedelta(days=days)
+    
+    etag = f'r{resource.id}-v{resource.calendar_version}-{start:%Y%m%d}-{days}'
+    not_modified = _not_modified(etag)
+    if not_modified:
+        return not_modified
+    
+    response = jsonify({
+        'resource_id': resource.id,
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'version': resource.calendar_version,
+        'intervals': [[s.isoformat(), e.isoformat(), label] for s, e, label in get_occupancy(resource.id, start, end)]
+    })
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def _ical_response(text, etag):
+    response = Response(text, mimetype='text/calendar')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+@bookings_bp.route('/calendar/resource/<int:resource_id>.ics')
+def resource_ical(resource_id):
+    """iCalendar feed of a resource's occupied times, without any details of who booked them."""
+    resource = _viewable_resource(resource_id)
+    
+    today = datetime.combine(datetime.utcnow().date(), datetime.min.time())
+    etag = f'r{resource.id}-v{resource.calendar_version}-{today:%Y%m%d}-ics'
+    not_modified = _not_modified(etag)
+    if not_modified:
+        return not_modified
+    
+    occupancy = get_occupancy(resource.id, today - timedelta(days=ICAL_PAST_DAYS),
+                              today + timedelta(days=ICAL_FUTURE_DAYS))
+    events = [{
+        'uid': f'resource-{resource.id}-{start:%Y%m%dT%H%M%S}@campus-resource-hub',
+        'start': start,
+        'end': end,
+        'summary': f'{resource.title}: {"Booked" if label == "booked" else "Pending request"}',
+        'location': resource.location,
+        'status': 'CONFIRMED' if label == 'booked' else 'TENTATIVE'
+    } for start, end, label in occupancy]
+    return _ical_response(build_ical(resource.title, events), etag)
+
+
+@bookings_bp.route('/calendar/user/<token>.ics')
+def user_ical(token):
+    """iCalendar feed of a user's bookings, authenticated by the signed token in its URL."""
+    user_id = user_id_from_calendar_token(token)
+    if user_id is None:
+        abort(404)
+    
+    today = datetime.combine(datetime.utcnow().date(), datetime.min.time())
+    bookings = db.session.query(
+        Booking.id, Booking.start_time, Booking.end_time, Booking.status, Booking.notes,
+        Resource.title, Resource.location
+    ).join(Resource, Resource.id == Booking.resource_id).filter(
+        Booking.user_id == user_id,
+        Booking.status.in_(['pending', 'approved', 'completed']),
+        Booking.start_time >= today - timedelta(days=ICAL_PAST_DAYS),
+        Booking.start_time < today + timedelta(days=ICAL_FUTURE_DAYS)
+    ).order_by(Booking.start_time).all()
+    
+    events = [{
+        'uid': f'booking-{booking_id}@campus-resource-hub',
+        'start': start,
+        'end': end,
+        'summary': title if status != 'pending' else f'{title} (pending approval)',
+        'location': location,
+        'description': notes,
+        'status': 'TENTATIVE' if status == 'pending' else 'CONFIRMED'
+    } for booking_id, start, end, status, notes, title, location in bookings]
+    
+    # A user's bookings span many resources, so the tag is a hash of the rows in the feed
+    etag = hashlib.sha1(repr(bookings).encode()).hexdigest()
+    not_modified = _not_modified(etag)
+    if not_modified:
+        return not_modified
+    return _ical_response(build_ical('My Campus Bookings', events), etag)
+
+
 @bookings_bp.route('/api/check-conflict', methods=['POST'])
 @login_required
 def check_conflict_api():
@@ -394,20 +923,29 @@ def check_conflict_api():
     except ValueError:
         return jsonify({'error': 'Invalid date/time format'}), 400
     
-    # Check resource conflicts
-    has_resource_conflict, resource_conflicting_bookings = check_booking_conflict(resource_id, start_datetime, end_datetime)
+    resource = Resource.query.get_or_404(resource_id)
+    unavailable = availability_error(resource, [(start_datetime, end_datetime)])
+    
+    # Check resource conflicts (count only when there is at least one)
+    has_resource_conflict = has_booking_conflict(resource_id, start_datetime, end_datetime)
+    resource_conflicting_count = 0
+    if has_resource_conflict:
+        resource_conflicting_count = _resource_conflict_query(resource_id, start_datetime, end_datetime).count()
     
-    # Check user's own booking conflicts
-    has_user_conflict, user_conflicting_bookings = check_user_booking_conflict(current_user.id, start_datetime, end_datetime)
+    # Check user's own booking conflicts; details are only loaded when needed
+    has_user_conflict = has_user_booking_conflict(current_user.id, start_datetime, end_datetime)
     
     response = {
+        'available': unavailable is None,
+        'availability_error': unavailable,
         'has_resource_conflict': has_resource_conflict,
-        'resource_conflicting_count': len(resource_conflicting_bookings),
+        'resource_conflicting_count': resource_conflicting_count,
         'has_user_conflict': has_user_conflict,
         'user_conflicting_bookings': []
     }
     
     if has_user_conflict:
+        _, user_conflicting_bookings = check_user_booking_conflict(current_user.id, start_datetime, end_datetime)
         response['user_conflicting_bookings'] = [{
             'id': b.id,
             'resource_title': b.resource.title,
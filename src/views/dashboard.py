@@ -1,11 +1,8 @@
 """Dashboard routes for the Campus Resource Hub."""
 from flask import Blueprint, render_template
 from flask_login import login_required, current_user
-from sqlalchemy import func, desc
 from datetime import datetime
-from src.database import db
-from src.models import User, Resource, Booking, Review
-from src.views.resources import get_resource_stats
+from src.models import Resource, Booking
 
 dashboard_bp = Blueprint('dashboard', __name__)
 
@@ -25,30 +22,20 @@ def index():
     published_resources = Resource.query.filter_by(status='published').all()
     
     # Get popular resources (top 4 by booking count)
-    popular_resources = db.session.query(
-        Resource.id,
-        Resource.title,
-        Resource.description,
-        Resource.category,
-        func.count(Booking.id).label('booking_count')
-    ).join(Booking, Resource.id == Booking.resource_id, isouter=True)\
-     .filter(Resource.status == 'published')\
-     .group_by(Resource.id, Resource.title, Resource.description, Resource.category)\
-     .order_by(desc('booking_count'))\
-     .limit(4).all()
+    popular_resources = Resource.query.filter_by(status='published')\
+        .order_by(Resource.booking_count.desc(), Resource.id.desc())\
+        .limit(4).all()
     
-    # Add ratings to popular resources
     popular_with_stats = []
-    for resource_id, title, description, category, booking_count in popular_resources:
-        stats = get_resource_stats(resource_id)
+    for resource in popular_resources:
         popular_with_stats.append({
-            'id': resource_id,
-            'title': title,
-            'description': description,
-            'category': category,
-            'booking_count': booking_count,
-            'rating': stats['rating'],
-            'review_count': stats['review_count']
+            'id': resource.id,
+            'title': resource.title,
+            'description': resource.description,
+            'category': resource.category,
+            'booking_count': resource.booking_count,
+            'rating': resource.rating,
+            'review_count': resource.review_count
         })
     
     # Calculate stats
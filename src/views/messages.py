@@ -1,93 +1,340 @@
 """Message routes for the Campus Resource Hub."""
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 from flask_login import login_required, current_user
-from sqlalchemy import or_, and_
+from sqlalchemy import or_, and_, case, cast, func, literal, select, update, String
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import aliased, joinedload
 from datetime import datetime
-from src.database import db
-from src.models import Message, Resource, Booking, Notification
+from src.database import db, begin_transaction
+from src.models import Message, Resource, Booking, User, Conversation, ConversationParticipant
+from src.utils.notifications import create_notification
 
 messages_bp = Blueprint('messages', __name__)
 
+THREAD_PAGE_SIZE = 50
 
-def create_notification(user_id, notification_type, title, message, link=None):
-    """Helper function to create notifications."""
-    notification = Notification(
-        user_id=user_id,
-        type=notification_type,
-        title=title,
-        message=message,
-        link=link,
-        read=False
+
+def parse_thread_ref(thread_id):
+    """
+    Parse the resource or booking a thread id refers to.
+    
+    Args:
+        thread_id: Thread id such as 'resource_12' or 'booking_34'
+    
+    Returns:
+        tuple: ('resource' | 'booking', id), or (None, None) if it refers to neither
+    """
+    kind, _, ref_id = (thread_id or '').partition('_')
+    if kind in ('resource', 'booking') and ref_id.isdigit():
+        return kind, int(ref_id)
+    return None, None
+
+
+def get_message_threads(user_id):
+    """
+    Get the conversations of a user, most recently active first.
+    
+    One query walks the user's participant rows on the (user_id,
+    last_message_at) index and joins in the conversation, the other
+    participant and the linked resource and booking. Should a conversation
+    have more than one other participant, the one with the lowest id is
+    shown, so every conversation is listed once.
+    
+    Args:
+        user_id: ID of the user
+    
+    Returns:
+        list: Dicts with thread_id, last_message_at, last_message_preview,
+        last_sender_id, unread_count, other_user, resource and booking
+    """
+    mine = aliased(ConversationParticipant)
+    other = aliased(ConversationParticipant)
+    other_user_id = select(func.min(other.user_id))\
+        .where(other.conversation_id == mine.conversation_id, other.user_id != user_id)\
+        .correlate(mine).scalar_subquery()
+    
+    rows = db.session.query(mine.unread_count, Conversation, User)\
+        .select_from(mine)\
+        .join(Conversation, Conversation.id == mine.conversation_id)\
+        .outerjoin(User, User.id == other_user_id)\
+        .options(joinedload(Conversation.resource), joinedload(Conversation.booking))\
+        .filter(mine.user_id == user_id)\
+        .order_by(mine.last_message_at.desc()).all()
+    
+    return [{
+        'thread_id': conversation.thread_id,
+        'last_message_at': conversation.last_message_at,
+        'last_message_preview': conversation.last_message_preview,
+        'last_sender_id': conversation.last_sender_id,
+        'unread_count': unread_count,
+        'other_user': other_user,
+        'resource': conversation.resource,
+        'booking': conversation.booking
+    } for unread_count, conversation, other_user in rows]
+
+
+def _participant_ids(conversation_id):
+    """IDs of the users taking part in a conversation."""
+    return {user_id for user_id, in db.session.query(ConversationParticipant.user_id)
+            .filter(ConversationParticipant.conversation_id == conversation_id)}
+
+
+def get_or_create_conversation(thread_id, user_ids):
+    """
+    Get the conversation for a thread, creating it (and missing participants) if needed.
+    
+    Args:
+        thread_id: Thread id of the conversation
+        user_ids: IDs of the users taking part
+    
+    Returns:
+        Conversation: The conversation, added to the current session
+    """
+    conversation = Conversation.query.filter_by(thread_id=thread_id).first()
+    
+    if conversation is None:
+        kind, ref_id = parse_thread_ref(thread_id)
+        resource_id = booking_id = None
+        if kind == 'resource':
+            resource_id = ref_id
+        elif kind == 'booking':
+            booking_id = ref_id
+            resource_id = db.session.query(Booking.resource_id).filter(Booking.id == ref_id).scalar()
+        
+        # The savepoint must nest inside the message's transaction, not replace it
+        begin_transaction()
+        try:
+            with db.session.begin_nested():
+                conversation = Conversation(thread_id=thread_id, resource_id=resource_id, booking_id=booking_id)
+                db.session.add(conversation)
+                db.session.flush()
+        except IntegrityError:
+            # Another request created it first
+            conversation = Conversation.query.filter_by(thread_id=thread_id).one()
+    
+    missing_ids = set(user_ids) - _participant_ids(conversation.id)
+    if missing_ids:
+        begin_transaction()
+    for user_id in missing_ids:
+        try:
+            with db.session.begin_nested():
+                db.session.add(ConversationParticipant(conversation_id=conversation.id, user_id=user_id))
+                db.session.flush()
+        except IntegrityError:
+            # Another request added them first
+            pass
+    return conversation
+
+
+def record_message(conversation, message):
+    """
+    Update a conversation's materialized state for a new message.
+    
+    Both updates are single set-based statements, so concurrent senders
+    increment the unread counters without losing updates.
+    
+    Args:
+        conversation: The message's Conversation
+        message: The new Message, with created_at set
+    """
+    db.session.execute(
+        update(Conversation)
+        .where(Conversation.id == conversation.id)
+        .values(last_message_at=message.created_at,
+                last_message_preview=message.content[:Conversation.PREVIEW_LENGTH],
+                last_sender_id=message.sender_id)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.execute(
+        update(ConversationParticipant)
+        .where(ConversationParticipant.conversation_id == conversation.id)
+        .values(last_message_at=message.created_at,
+                unread_count=ConversationParticipant.unread_count
+                + case((ConversationParticipant.user_id == message.receiver_id, 1), else_=0))
+        .execution_options(synchronize_session=False)
     )
-    db.session.add(notification)
-    return notification
+
+
+def backfill_conversations():
+    """
+    Create conversations for message threads that do not have one yet.
+    
+    Messages without a thread id are first moved to a direct_<user>_<user>
+    thread per pair of users. Each new conversation's participants are the
+    users of its first message; its last message and unread counts are
+    computed from the message log.
+    
+    Returns:
+        int: Number of conversations created
+    """
+    low_id = case((Message.sender_id < Message.receiver_id, Message.sender_id), else_=Message.receiver_id)
+    high_id = case((Message.sender_id < Message.receiver_id, Message.receiver_id), else_=Message.sender_id)
+    db.session.execute(
+        update(Message)
+        .where(Message.thread_id.is_(None))
+        .values(thread_id=literal('direct_') + cast(low_id, String) + literal('_') + cast(high_id, String))
+        .execution_options(synchronize_session=False)
+    )
+    
+    missing = Message.thread_id.not_in(select(Conversation.thread_id))
+    ranked = db.session.query(
+        Message.id.label('message_id'),
+        func.row_number().over(partition_by=Message.thread_id,
+                               order_by=(Message.created_at, Message.id)).label('first_position'),
+        func.row_number().over(partition_by=Message.thread_id,
+                               order_by=(Message.created_at.desc(), Message.id.desc())).label('last_position')
+    ).filter(missing).subquery()
+    
+    first_messages = {}
+    last_messages = {}
+    for message, first_position, last_position in db.session.query(
+            Message, ranked.c.first_position, ranked.c.last_position)\
+            .join(ranked, Message.id == ranked.c.message_id)\
+            .filter(or_(ranked.c.first_position == 1, ranked.c.last_position == 1)):
+        if first_position == 1:
+            first_messages[message.thread_id] = message
+        if last_position == 1:
+            last_messages[message.thread_id] = message
+    
+    if not first_messages:
+        return 0
+    
+    unread = {
+        (thread_id, receiver_id): count for thread_id, receiver_id, count in db.session.query(
+            Message.thread_id, Message.receiver_id, func.count(Message.id)
+        ).filter(missing, Message.read == False).group_by(Message.thread_id, Message.receiver_id)
+    }
+    
+    refs = {thread_id: parse_thread_ref(thread_id) for thread_id in first_messages}
+    resource_ids = {ref_id for kind, ref_id in refs.values() if kind == 'resource'}
+    booking_ids = {ref_id for kind, ref_id in refs.values() if kind == 'booking'}
+    existing_resources = {resource_id for resource_id, in db.session.query(Resource.id)
+                          .filter(Resource.id.in_(resource_ids))} if resource_ids else set()
+    booking_resources = dict(db.session.query(Booking.id, Booking.resource_id)
+                             .filter(Booking.id.in_(booking_ids)).all()) if booking_ids else {}
+    
+    conversations = []
+    for thread_id, first in first_messages.items():
+        last = last_messages[thread_id]
+        kind, ref_id = refs[thread_id]
+        resource_id = booking_id = None
+        if kind == 'resource' and ref_id in existing_resources:
+            resource_id = ref_id
+        elif kind == 'booking' and ref_id in booking_resources:
+            booking_id = ref_id
+            resource_id = booking_resources[ref_id]
+        
+        conversation = Conversation(
+            thread_id=thread_id,
+            resource_id=resource_id,
+            booking_id=booking_id,
+            last_message_at=last.created_at,
+            last_message_preview=last.content[:Conversation.PREVIEW_LENGTH],
+            last_sender_id=last.sender_id,
+            created_at=first.created_at
+        )
+        for user_id in {first.sender_id, first.receiver_id}:
+            conversation.participants.append(ConversationParticipant(
+                user_id=user_id,
+                unread_count=unread.get((thread_id, user_id), 0),
+                last_message_at=last.created_at
+            ))
+        conversations.append(conversation)
+    
+    db.session.add_all(conversations)
+    db.session.flush()
+    
+    db.session.execute(
+        update(Message)
+        .where(Message.conversation_id.is_(None))
+        .values(conversation_id=select(Conversation.id)
+                .where(Conversation.thread_id == Message.thread_id)
+                .scalar_subquery())
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return len(conversations)
+
+
+def get_thread_page(thread_id, before=None, per_page=THREAD_PAGE_SIZE):
+    """
+    Get one page of a thread's messages, newest page first.
+    
+    Pages walk backwards through the (thread_id, created_at) index: the first
+    page is the most recent messages, and each older page starts before the
+    oldest message of the page after it.
+    
+    Args:
+        thread_id: Thread to read
+        before: Optional message id; only messages older than it are returned
+        per_page: Maximum number of messages
+    
+    Returns:
+        tuple: (messages in chronological order, id to pass as `before` for the
+                next older page or None if there are no older messages)
+    
+    Raises:
+        ValueError: If `before` is not a message in this thread
+    """
+    query = Message.query.options(joinedload(Message.sender)).filter(Message.thread_id == thread_id)
+    
+    if before is not None:
+        anchor_time = db.session.query(Message.created_at)\
+            .filter(Message.id == before, Message.thread_id == thread_id).scalar()
+        if anchor_time is None:
+            raise ValueError('Invalid cursor')
+        query = query.filter(or_(
+            Message.created_at < anchor_time,
+            and_(Message.created_at == anchor_time, Message.id < before)
+        ))
+    
+    messages = query.order_by(Message.created_at.desc(), Message.id.desc()).limit(per_page + 1).all()
+    
+    older_cursor = None
+    if len(messages) > per_page:
+        messages = messages[:per_page]
+        older_cursor = messages[-1].id
+    messages.reverse()
+    return messages, older_cursor
+
+
+def mark_thread_read(thread_id, user_id):
+    """
+    Mark every unread message a user received in a thread as read.
+    
+    Issues a single UPDATE and only resets the user's conversation unread
+    count when something was actually unread, so reading an up-to-date
+    thread does not write.
+    
+    Returns:
+        int: Number of messages marked read
+    """
+    result = db.session.execute(
+        update(Message)
+        .where(Message.thread_id == thread_id,
+               Message.receiver_id == user_id,
+               Message.read == False)
+        .values(read=True)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount:
+        conversation_ids = select(Conversation.id).where(Conversation.thread_id == thread_id)
+        db.session.execute(
+            update(ConversationParticipant)
+            .where(ConversationParticipant.conversation_id.in_(conversation_ids),
+                   ConversationParticipant.user_id == user_id)
+            .values(unread_count=0)
+            .execution_options(synchronize_session=False)
+        )
+    db.session.commit()
+    return result.rowcount
 
 
 @messages_bp.route('/')
 @login_required
 def list_messages():
     """List all message threads for the current user."""
-    # Get all threads where user is sender or receiver
-    # Group by thread_id and get the most recent message for each thread
-    threads = {}
-    
-    # Get all messages involving current user
-    all_messages = Message.query.filter(
-        or_(
-            Message.sender_id == current_user.id,
-            Message.receiver_id == current_user.id
-        )
-    ).order_by(Message.created_at.desc()).all()
-    
-    # Group by thread_id
-    for message in all_messages:
-        thread_id = message.thread_id or f"resource_{message.receiver_id if message.sender_id == current_user.id else message.sender_id}"
-        
-        if thread_id not in threads:
-            threads[thread_id] = {
-                'thread_id': thread_id,
-                'last_message': message,
-                'unread_count': 0,
-                'other_user': None,
-                'resource': None,
-                'booking': None
-            }
-        
-        # Count unread messages
-        if not message.read and message.receiver_id == current_user.id:
-            threads[thread_id]['unread_count'] += 1
-        
-        # Get other user info
-        if message.sender_id == current_user.id:
-            other_user_id = message.receiver_id
-        else:
-            other_user_id = message.sender_id
-        
-        if not threads[thread_id]['other_user']:
-            from src.models import User
-            other_user = User.query.get(other_user_id)
-            threads[thread_id]['other_user'] = other_user
-        
-        # Try to get resource/booking info from thread_id
-        if thread_id.startswith('resource_'):
-            try:
-                resource_id = int(thread_id.split('_')[1])
-                resource = Resource.query.get(resource_id)
-                threads[thread_id]['resource'] = resource
-            except (ValueError, IndexError):
-                pass
-        elif thread_id.startswith('booking_'):
-            try:
-                booking_id = int(thread_id.split('_')[1])
-                booking = Booking.query.get(booking_id)
-                threads[thread_id]['booking'] = booking
-                if booking:
-                    threads[thread_id]['resource'] = booking.resource
-            except (ValueError, IndexError):
-                pass
-    
-    # Sort by last message time
-    thread_list = sorted(threads.values(), key=lambda x: x['last_message'].created_at, reverse=True)
+    thread_list = get_message_threads(current_user.id)
     
     return render_template('messages/list.html', threads=thread_list)
 
@@ -96,34 +343,40 @@ def list_messages():
 @login_required
 def view_thread(thread_id):
     """View messages in a specific thread."""
-    # Get all messages in this thread
-    messages = Message.query.filter_by(thread_id=thread_id).order_by(Message.created_at.asc()).all()
+    # The first message decides who the thread is between
+    first_message = Message.query.filter_by(thread_id=thread_id)\
+        .order_by(Message.created_at.asc(), Message.id.asc()).first()
     
     # Get resource/booking info from thread_id
     resource = None
     booking = None
     other_user = None
+    messages = []
+    older_cursor = None
+    before = None
     
     # If we have messages, verify user is part of thread and get other user from messages
-    if messages:
-        first_message = messages[0]
+    if first_message:
         if first_message.sender_id != current_user.id and first_message.receiver_id != current_user.id:
             flash('You do not have permission to view this thread.', 'danger')
             return redirect(url_for('messages.list_messages'))
         
-        # Mark messages as read
-        for message in messages:
-            if message.receiver_id == current_user.id and not message.read:
-                message.read = True
-        db.session.commit()
+        mark_thread_read(thread_id, current_user.id)
+        
+        # Latest page, or an older one when paging back; a bad cursor shows the latest
+        before = request.args.get('before', type=int)
+        try:
+            messages, older_cursor = get_thread_page(thread_id, before=before)
+        except ValueError:
+            messages, older_cursor = get_thread_page(thread_id)
+            before = None
         
         # Get other user from messages
-        if messages[0].sender_id == current_user.id:
-            other_user_id = messages[0].receiver_id
+        if first_message.sender_id == current_user.id:
+            other_user_id = first_message.receiver_id
         else:
-            other_user_id = messages[0].sender_id
+            other_user_id = first_message.sender_id
         
-        from src.models import User
         other_user = User.query.get(other_user_id)
         
         # Get resource/booking info for context
@@ -149,7 +402,6 @@ def view_thread(thread_id):
                 resource_id = int(thread_id.split('_')[1])
                 resource = Resource.query.get(resource_id)
                 if resource:
-                    from src.models import User
                     # If current user is the owner, they can't start a conversation with themselves
                     if resource.owner_id == current_user.id:
                         flash('You cannot message yourself.', 'danger')
@@ -163,7 +415,6 @@ def view_thread(thread_id):
                 booking = Booking.query.get(booking_id)
                 if booking:
                     resource = booking.resource
-                    from src.models import User
                     # Other user is the opposite party
                     if booking.user_id == current_user.id:
                         other_user = User.query.get(booking.resource.owner_id)
@@ -178,6 +429,8 @@ def view_thread(thread_id):
     
     return render_template('messages/thread.html',
                          messages=messages,
+                         older_cursor=older_cursor,
+                         is_latest_page=before is None,
                          thread_id=thread_id,
                          other_user=other_user,
                          resource=resource,
@@ -221,9 +474,15 @@ def send_message(thread_id):
     # Determine receiver based on thread
     receiver_id = None
     
-    # First, check if there are existing messages - use those to determine receiver
-    existing_message = Message.query.filter_by(thread_id=thread_id).first()
+    # First, check if there are existing messages - the first one decides who the thread is between
+    existing_message = Message.query.filter_by(thread_id=thread_id)\
+        .order_by(Message.created_at.asc(), Message.id.asc()).first()
     if existing_message:
+        # Only the two people in the thread may post to it
+        if current_user.id not in (existing_message.sender_id, existing_message.receiver_id):
+            flash('You do not have permission to post in this thread.', 'danger')
+            return redirect(url_for('messages.list_messages'))
+        
         # Use existing messages to determine receiver (the opposite party)
         if existing_message.sender_id == current_user.id:
             receiver_id = existing_message.receiver_id
@@ -253,6 +512,11 @@ def send_message(thread_id):
                 flash('Booking not found.', 'danger')
                 return redirect(url_for('messages.list_messages'))
             
+            # Only the requester and the resource owner may discuss a booking
+            if current_user.id not in (booking.user_id, booking.resource.owner_id):
+                flash('You do not have permission to post in this thread.', 'danger')
+                return redirect(url_for('messages.list_messages'))
+            
             # Receiver is the other party (owner if user is requester, requester if user is owner)
             if booking.user_id == current_user.id:
                 receiver_id = booking.resource.owner_id
@@ -262,16 +526,21 @@ def send_message(thread_id):
             flash('Invalid thread.', 'danger')
             return redirect(url_for('messages.list_messages'))
     
+    conversation = get_or_create_conversation(thread_id, [current_user.id, receiver_id])
+    
     # Create message
     message = Message(
         thread_id=thread_id,
+        conversation_id=conversation.id,
         sender_id=current_user.id,
         receiver_id=receiver_id,
         content=content,
-        read=False
+        read=False,
+        created_at=datetime.utcnow()
     )
     
     db.session.add(message)
+    record_message(conversation, message)
     
     # Create notification for receiver
     create_notification(
@@ -1,66 +1,285 @@
 """Notification routes for the Campus Resource Hub."""
-from flask import Blueprint, render_template, request, jsonify
+import os
+import queue
+import time
+from flask import Blueprint, Response, current_app, render_template, request, jsonify, stream_with_context
 from flask_login import login_required, current_user
+from sqlalchemy import and_, or_
 from src.database import db
 from src.models import Notification
+from src.utils.cache import get_cache
+from src.utils.notification_stream import (
+    broker, format_sse, get_unread_count, notify_unread_changed, serialize_notification, unread_cache_key
+)
 
 notifications_bp = Blueprint('notifications', __name__)
 
+# Seconds between keep-alive comments on an idle stream
+STREAM_HEARTBEAT = 20
+# Streams are closed after this many seconds; EventSource reconnects by itself
+STREAM_MAX_AGE = 600
+# Milliseconds between notification polls in the browser, without a stream and
+# while one is open. Streams are only used when the app runs in a single
+# process (see NOTIFICATION_STREAM_SINGLE_PROCESS)
+POLL_INTERVAL = 30000
+STREAM_POLL_INTERVAL = 300000
+
+NOTIFICATIONS_PAGE_SIZE = 20
+MAX_API_LIST_LIMIT = 50
+MAX_BULK_IDS = 1000
+
+
+def get_notification_page(user_id, before=None, per_page=NOTIFICATIONS_PAGE_SIZE):
+    """
+    Get one page of a user's notifications, newest first.
+    
+    Pages walk backwards through the (user_id, created_at) index, so every
+    page costs the same no matter how many notifications the user has.
+    
+    Args:
+        user_id: Owner of the notifications
+        before: Optional notification id; only notifications older than it are returned
+        per_page: Maximum number of notifications
+    
+    Returns:
+        tuple: (notifications newest first, id to pass as `before` for the next
+                older page or None if there are no older notifications)
+    
+    Raises:
+        ValueError: If `before` is not one of the user's notifications
+    """
+    query = Notification.query.filter(Notification.user_id == user_id)
+    
+    if before is not None:
+        anchor_time = db.session.query(Notification.created_at)\
+            .filter(Notification.id == before, Notification.user_id == user_id).scalar()
+        if anchor_time is None:
+            raise ValueError('Invalid cursor')
+        query = query.filter(or_(
+            Notification.created_at < anchor_time,
+            and_(Notification.created_at == anchor_time, Notification.id < before)
+        ))
+    
+    notifications = query.order_by(Notification.created_at.desc(), Notification.id.desc())\
+        .limit(per_page + 1).all()
+    
+    older_cursor = None
+    if len(notifications) > per_page:
+        notifications = notifications[:per_page]
+        older_cursor = notifications[-1].id
+    return notifications, older_cursor
+
 
 @notifications_bp.route('/')
 @login_required
 def list_notifications():
-    """List all notifications for the current user."""
-    notifications = Notification.query.filter_by(user_id=current_user.id).order_by(Notification.created_at.desc()).all()
+    """List the current user's notifications one page at a time."""
+    before = request.args.get('before', type=int)
+    try:
+        notifications, older_cursor = get_notification_page(current_user.id, before=before)
+    except ValueError:
+        notifications, older_cursor = get_notification_page(current_user.id)
+        before = None
     
-    # Mark all as read when viewing
-    unread_count = sum(1 for n in notifications if not n.read)
+    # Remember what was new before marking everything read when viewing; the
+    # page is detached first so the commit does not expire and reload each row
+    unread_ids = {n.id for n in notifications if not n.read}
     for notification in notifications:
-        if not notification.read:
-            notification.read = True
+        db.session.expunge(notification)
+    _mark_all_read(current_user.id)
+    
+    return render_template('notifications/list.html',
+                         notifications=notifications,
+                         unread_ids=unread_ids,
+                         older_cursor=older_cursor,
+                         is_latest_page=before is None)
+
+
+def _mark_all_read(user_id):
+    """Mark all of a user's notifications read in one UPDATE and reset their cached count.
+    
+    The UPDATE always runs: the cached count may be stale in a per-process
+    cache, so it cannot be trusted to skip the write.
+    
+    Returns:
+        int: Number of notifications marked read
+    """
+    updated = Notification.query.filter_by(user_id=user_id, read=False)\
+        .update({Notification.read: True}, synchronize_session=False)
+    if updated:
+        notify_unread_changed(user_id, count=0)
     db.session.commit()
+    if not updated:
+        # Nothing changed, so there is nothing to publish; just correct a stale count
+        get_cache().set(unread_cache_key(user_id), 0)
+    return updated
+
+
+def _mark_read(user_id, *criteria):
+    """
+    Mark a user's unread notifications matching criteria read in one UPDATE.
+    
+    Args:
+        user_id: Owner of the notifications
+        *criteria: Extra filter expressions on Notification
     
-    return render_template('notifications/list.html', notifications=notifications)
+    Returns:
+        int: Number of notifications marked read
+    """
+    updated = Notification.query.filter(Notification.user_id == user_id, Notification.read == False, *criteria)\
+        .update({Notification.read: True}, synchronize_session=False)
+    if updated:
+        notify_unread_changed(user_id, delta=-updated)
+    db.session.commit()
+    return updated
 
 
 @notifications_bp.route('/api/unread-count')
 @login_required
 def unread_count():
     """API endpoint to get unread notification count."""
-    count = Notification.query.filter_by(user_id=current_user.id, read=False).count()
-    return jsonify({'count': count})
+    return jsonify({'count': get_unread_count(current_user.id)})
 
 
 @notifications_bp.route('/api/list')
 @login_required
 def list_notifications_api():
     """API endpoint to get recent notifications."""
-    limit = request.args.get('limit', 5, type=int)
+    limit = min(max(request.args.get('limit', 5, type=int), 1), MAX_API_LIST_LIMIT)
     notifications = Notification.query.filter_by(user_id=current_user.id).order_by(Notification.created_at.desc()).limit(limit).all()
     
     return jsonify({
-        'notifications': [{
-            'id': n.id,
-            'type': n.type,
-            'title': n.title,
-            'message': n.message,
-            'read': n.read,
-            'link': n.link,
-            'created_at': n.created_at.isoformat()
-        } for n in notifications]
+        'notifications': [serialize_notification(n) for n in notifications]
     })
 
 
+def _unread_count(user_id):
+    """Get a user's unread count, releasing any connection the lookup used right away."""
+    count = get_unread_count(user_id)
+    db.session.close()
+    return count
+
+
+@notifications_bp.app_context_processor
+def notification_poll_intervals():
+    """
+    Stream flag and poll intervals for the notification script in base.html.
+    
+    Subscribers are tracked per process, so a stream only sees notifications
+    committed by the process serving it, and each open stream holds a worker
+    for up to STREAM_MAX_AGE. Pages therefore only open a stream when
+    NOTIFICATION_STREAM_SINGLE_PROCESS is set and poll otherwise.
+    """
+    single_process = current_app.config.get('NOTIFICATION_STREAM_SINGLE_PROCESS',
+                                            os.environ.get('NOTIFICATION_STREAM_SINGLE_PROCESS', 'false'))
+    if isinstance(single_process, str):
+        single_process = single_process.lower() in ('1', 'true', 'yes')
+    return {
+        'notification_stream_enabled': single_process,
+        'notification_poll_interval': POLL_INTERVAL,
+        'notification_stream_poll_interval': STREAM_POLL_INTERVAL if single_process else POLL_INTERVAL
+    }
+
+
+@notifications_bp.route('/stream')
+@login_required
+def stream():
+    """
+    Server-Sent Events stream of a user's notification changes.
+    
+    Emits 'notification' with each new notification, 'unread_count' whenever
+    the count may have changed, and 'resync' when the client fell too far
+    behind and should reload. The connection is idle between events apart
+    from periodic keep-alive comments.
+    """
+    user_id = current_user.id
+    heartbeat = current_app.config.get('NOTIFICATION_STREAM_HEARTBEAT', STREAM_HEARTBEAT)
+    max_age = current_app.config.get('NOTIFICATION_STREAM_MAX_AGE', STREAM_MAX_AGE)
+    subscriber = broker.subscribe(user_id)
+    
+    def generate():
+        try:
+            yield 'retry: 5000\n\n'
+            yield format_sse('unread_count', {'count': _unread_count(user_id)})
+            
+            deadline = time.monotonic() + max_age
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                try:
+                    events = [subscriber.get(timeout=min(heartbeat, remaining))]
+                except queue.Empty:
+                    yield ': keep-alive\n\n'
+                    continue
+                
+                # Coalesce a burst into one unread-count query
+                while True:
+                    try:
+                        events.append(subscriber.get_nowait())
+                    except queue.Empty:
+                        break
+                
+                for event_type, data in events:
+                    if event_type == 'notification':
+                        yield format_sse('notification', data)
+                    elif event_type == 'resync':
+                        yield format_sse('resync', {})
+                yield format_sse('unread_count', {'count': _unread_count(user_id)})
+        finally:
+            broker.unsubscribe(user_id, subscriber)
+    
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # Don't let nginx buffer the stream
+    return response
+
+
 @notifications_bp.route('/mark-all-read', methods=['POST'])
 @login_required
 def mark_all_read():
     """Mark all notifications as read for the current user."""
-    notifications = Notification.query.filter_by(user_id=current_user.id, read=False).all()
-    for notification in notifications:
-        notification.read = True
+    updated = _mark_all_read(current_user.id)
+    
+    return jsonify({'success': True, 'count': updated})
+
+
+@notifications_bp.route('/mark-read', methods=['POST'])
+@login_required
+def mark_read_bulk():
+    """
+    Mark a set of the current user's notifications as read.
+    
+    Expects JSON with either `ids`, a list of notification ids, or `type`, a
+    notification type. Ids of other users' notifications are ignored.
+    """
+    data = request.get_json(silent=True) or {}
+    ids = data.get('ids')
+    notification_type = data.get('type')
+    
+    if ids is not None:
+        if not isinstance(ids, list) or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+            return jsonify({'error': 'ids must be a list of notification ids'}), 400
+        if len(ids) > MAX_BULK_IDS:
+            return jsonify({'error': f'At most {MAX_BULK_IDS} ids can be marked at once'}), 400
+        updated = _mark_read(current_user.id, Notification.id.in_(ids)) if ids else 0
+    elif isinstance(notification_type, str) and notification_type:
+        updated = _mark_read(current_user.id, Notification.type == notification_type)
+    else:
+        return jsonify({'error': 'Provide ids or type'}), 400
+    
+    return jsonify({'success': True, 'count': updated})
+
+
+@notifications_bp.route('/delete-read', methods=['POST'])
+@login_required
+def delete_read():
+    """Delete all of the current user's read notifications."""
+    deleted = Notification.query.filter_by(user_id=current_user.id, read=True)\
+        .delete(synchronize_session=False)
     db.session.commit()
     
-    return jsonify({'success': True})
+    return jsonify({'success': True, 'count': deleted})
 
 
 @notifications_bp.route('/<int:notification_id>/mark-read', methods=['POST'])
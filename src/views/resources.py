@@ -6,23 +6,38 @@ from datetime import datetime
 from src.database import db
 from src.models import Resource, ResourceImage, ResourceEquipment, Review, Booking
 from src.decorators import staff_required
+from src.utils.search import apply_search, get_search_snippets
+from src.utils.pagination import paginate_keyset
+from src.utils.availability import get_resource_schedule, invalidate_resource_schedule, parse_availability
+from src.utils.notifications import notify_users
 
 resources_bp = Blueprint('resources', __name__)
 
 
-def get_resource_stats(resource_id):
-    """Get statistics for a resource (rating, review count, booking count)."""
-    reviews = Review.query.filter_by(resource_id=resource_id).all()
-    bookings = Booking.query.filter_by(resource_id=resource_id).all()
+def get_resources_stats(resource_ids):
+    """Get statistics for many resources in a single query.
     
-    review_count = len(reviews)
-    booking_count = len(bookings)
+    Returns a dict mapping resource_id to the same stats dict returned by
+    get_resource_stats. Reads the denormalized counters on Resource.
+    """
+    resource_ids = set(resource_ids)
+    if not resource_ids:
+        return {}
     
-    if review_count > 0:
-        rating = sum(r.rating for r in reviews) / review_count
-    else:
-        rating = 0.0
+    rows = db.session.query(
+        Resource.id,
+        Resource.rating_sum,
+        Resource.review_count,
+        Resource.booking_count
+    ).filter(Resource.id.in_(resource_ids)).all()
     
+    return {resource_id: _stats_from_counters(rating_sum, review_count, booking_count)
+            for resource_id, rating_sum, review_count, booking_count in rows}
+
+
+def _stats_from_counters(rating_sum, review_count, booking_count):
+    """Build a stats dict from the denormalized resource counters."""
+    rating = rating_sum / review_count if review_count else 0.0
     return {
         'rating': round(rating, 1),
         'review_count': review_count,
@@ -30,15 +45,215 @@ def get_resource_stats(resource_id):
     }
 
 
-@resources_bp.route('/')
-@resources_bp.route('/browse')
-def browse():
-    """Browse all published resources."""
-    # Get query parameters
-    search = request.args.get('search', '').strip()
-    category = request.args.get('category', 'all')
-    sort_by = request.args.get('sort', 'recent')
-    status_filter = request.args.get('status', 'published')  # For owners/admins
+def adjust_resource_counters(resource_id, rating_delta=0, review_delta=0, booking_delta=0):
+    """Atomically adjust a resource's denormalized counters.
+    
+    Issues a single UPDATE in the current transaction, so the change commits or
+    rolls back together with the review/booking write that caused it. updated_at
+    is left as it is: counter maintenance is not an edit of the resource.
+    """
+    Resource.query.filter_by(id=resource_id).update({
+        Resource.rating_sum: Resource.rating_sum + rating_delta,
+        Resource.review_count: Resource.review_count + review_delta,
+        Resource.booking_count: Resource.booking_count + booking_delta,
+        Resource.updated_at: Resource.updated_at
+    }, synchronize_session=False)
+
+
+def recompute_resource_stats(resource_ids=None):
+    """Recompute denormalized counters from the reviews and bookings tables.
+    
+    Args:
+        resource_ids: Optional iterable of resource ids; defaults to all resources
+    
+    Returns:
+        int: Number of resources whose counters had drifted and were repaired
+    """
+    review_stats = db.session.query(
+        Review.resource_id.label('resource_id'),
+        func.sum(Review.rating).label('rating_sum'),
+        func.count(Review.id).label('review_count')
+    ).group_by(Review.resource_id).subquery()
+    
+    booking_stats = db.session.query(
+        Booking.resource_id.label('resource_id'),
+        func.count(Booking.id).label('booking_count')
+    ).group_by(Booking.resource_id).subquery()
+    
+    query = db.session.query(
+        Resource.id,
+        Resource.rating_sum,
+        Resource.review_count,
+        Resource.booking_count,
+        func.coalesce(review_stats.c.rating_sum, 0),
+        func.coalesce(review_stats.c.review_count, 0),
+        func.coalesce(booking_stats.c.booking_count, 0),
+        Resource.updated_at
+    ).outerjoin(review_stats, review_stats.c.resource_id == Resource.id)\
+     .outerjoin(booking_stats, booking_stats.c.resource_id == Resource.id)
+    
+    if resource_ids is not None:
+        query = query.filter(Resource.id.in_(set(resource_ids)))
+    
+    repairs = []
+    for row in query.all():
+        resource_id, current, actual = row[0], tuple(row[1:4]), tuple(row[4:7])
+        if current != actual:
+            repairs.append({
+                'id': resource_id,
+                'rating_sum': actual[0],
+                'review_count': actual[1],
+                'booking_count': actual[2],
+                'updated_at': row[7]  # Keep the edit date; repairs are not edits
+            })
+    
+    if repairs:
+        db.session.execute(db.update(Resource), repairs)
+        db.session.commit()
+    
+    return len(repairs)
+
+
+def get_resource_stats(resource_id):
+    """Get statistics for a resource (rating, review count, booking count)."""
+    return get_resources_stats([resource_id]).get(resource_id, {
+        'rating': 0.0,
+        'review_count': 0,
+        'booking_count': 0
+    })
+
+
+def attach_resource_stats(resources):
+    """Pair each resource with its stats, as expected by the listing templates."""
+    return [{
+        'resource': resource,
+        **_stats_from_counters(resource.rating_sum, resource.review_count, resource.booking_count)
+    } for resource in resources]
+
+
+def notify_resource_archived(resource):
+    """
+    Notify every user with an upcoming booking of a resource that it was archived.
+    
+    Args:
+        resource: The archived resource
+    
+    Returns:
+        int: Number of users notified
+    """
+    user_ids = db.session.scalars(
+        db.select(Booking.user_id).distinct().where(
+            Booking.resource_id == resource.id,
+            Booking.status.in_(['pending', 'approved']),
+            Booking.start_time > datetime.utcnow()
+        )
+    ).all()
+    return notify_users(
+        user_ids,
+        'resource_archived',
+        'Resource Archived',
+        f'{resource.title} has been archived. Please check your upcoming bookings for it.',
+        url_for('bookings.list_bookings')
+    )
+
+
+BROWSE_PAGE_SIZE = 12
+MAX_BROWSE_PAGE_SIZE = 100
+
+# Sort modes for browse; every mode orders by (sort key DESC, id DESC)
+BROWSE_SORT_KEYS = {
+    'recent': Resource.created_at,
+    'rating': Resource.rating,
+    'popular': Resource.booking_count
+}
+
+
+def paginate_resources(query, sort_by, cursor=None, per_page=BROWSE_PAGE_SIZE, relevance=None, free_window=None):
+    """Fetch one page of resources ordered in SQL, using a keyset cursor.
+    
+    Args:
+        query: Filtered Resource query
+        sort_by: One of BROWSE_SORT_KEYS, or 'relevance' for search results;
+            unknown values sort by 'recent'
+        cursor: Cursor returned for the previous page, or None for the first page
+        per_page: Maximum number of resources to return
+        relevance: Search relevance expression (higher is better), if any
+        free_window: Optional (start, end) the resources' availability rules
+            must allow; closed resources are skipped and the page topped up
+    
+    Returns:
+        tuple: (list of resources, cursor for the next page or None)
+    
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    if sort_by == 'relevance' and relevance is not None:
+        sort_key = relevance
+    else:
+        if sort_by not in BROWSE_SORT_KEYS:
+            sort_by = 'recent'
+        sort_key = BROWSE_SORT_KEYS[sort_by]
+    
+    value_type = datetime if sort_by == 'recent' else float
+    keep = (lambda resource: is_open(resource, *free_window)) if free_window else None
+    return paginate_keyset(query, sort_key, Resource.id, cursor, per_page, value_type=value_type, keep=keep)
+
+
+def parse_free_window(args):
+    """Read the requested free-between window (free_date, free_start, free_end) from request args.
+    
+    Returns:
+        tuple: (start, end) datetimes, or None when no window was requested
+    
+    Raises:
+        ValueError: If the date or times are malformed or the window is empty
+    """
+    free_date = args.get('free_date', '').strip()
+    if not free_date:
+        return None
+    start = datetime.strptime(f"{free_date} {args.get('free_start', '')}", '%Y-%m-%d %H:%M')
+    end = datetime.strptime(f"{free_date} {args.get('free_end', '')}", '%Y-%m-%d %H:%M')
+    if start >= end:
+        raise ValueError('The end time must be after the start time')
+    return start, end
+
+
+def filter_free_between(query, start_time, end_time):
+    """Keep resources with no approved or pending booking overlapping a time range.
+    
+    A single NOT EXISTS anti-join, so SQL stops walking resources once the
+    page is full; each resource is probed through the same covering
+    (resource_id, status, start_time, end_time) index as the conflict checks.
+    """
+    busy = db.select(Booking.id).where(
+        Booking.resource_id == Resource.id,
+        Booking.status.in_(['approved', 'pending']),
+        Booking.end_time > start_time,
+        Booking.start_time < end_time
+    )
+    return query.filter(~busy.exists())
+
+
+def is_open(resource, start_time, end_time):
+    """Whether a resource's availability rules allow a booking in a time range."""
+    schedule = get_resource_schedule(resource)
+    return schedule is None or schedule.is_available(start_time, end_time)
+
+
+def build_browse_query(args, free_window=None):
+    """Build the filtered (unsorted) resource query for browse from request args.
+    
+    Args:
+        args: Request args
+        free_window: Optional (start, end) the resources must have no bookings in
+    
+    Returns:
+        tuple: (query, relevance expression for search results or None)
+    """
+    search = args.get('search', '').strip()
+    category = args.get('category', 'all')
+    min_capacity = args.get('capacity', type=int)
+    status_filter = args.get('status', 'published')  # For owners/admins
     
     # Base query - only published resources for non-owners
     query = Resource.query
@@ -53,42 +268,76 @@ def browse():
     else:
         query = query.filter_by(status='published')
     
-    # Search filter
+    # Search filter (full-text when available, ILIKE otherwise)
+    relevance = None
     if search:
-        query = query.filter(
-            or_(
-                Resource.title.ilike(f'%{search}%'),
-                Resource.description.ilike(f'%{search}%'),
-                Resource.location.ilike(f'%{search}%')
-            )
-        )
+        query, relevance = apply_search(query, Resource, search)
     
     # Category filter
     if category != 'all':
-        query = query.filter_by(category=category)
+        query = query.filter(Resource.category == category)
+    
+    if min_capacity:
+        query = query.filter(Resource.capacity >= min_capacity)
+    
+    if free_window:
+        query = filter_free_between(query, *free_window)
+    
+    return query, relevance
+
+
+def _browse_sort(relevance):
+    """Read the requested sort mode; searches rank by relevance unless told otherwise."""
+    default = 'relevance' if relevance is not None else 'recent'
+    return request.args.get('sort', default)
+
+
+def _browse_page_size():
+    """Read the requested page size, clamped to a sane range."""
+    per_page = request.args.get('per_page', BROWSE_PAGE_SIZE, type=int)
+    return max(1, min(per_page, MAX_BROWSE_PAGE_SIZE))
+
+
+@resources_bp.route('/')
+@resources_bp.route('/browse')
+def browse():
+    """Browse all published resources."""
+    # Get query parameters
+    search = request.args.get('search', '').strip()
+    category = request.args.get('category', 'all')
+    cursor = request.args.get('cursor')
+    per_page = _browse_page_size()
+    
+    try:
+        free_window = parse_free_window(request.args)
+    except ValueError:
+        flash('Invalid free time range; showing all resources.', 'warning')
+        free_window = None
+    
+    query, relevance = build_browse_query(request.args, free_window)
+    sort_by = _browse_sort(relevance)
     
-    # Get all resources
-    resources = query.all()
+    try:
+        resources, next_cursor = paginate_resources(query, sort_by, cursor, per_page, relevance, free_window)
+    except ValueError:
+        # Stale or tampered cursor - start over from the first page
+        cursor = None
+        resources, next_cursor = paginate_resources(query, sort_by, None, per_page, relevance, free_window)
+    
+    filter_args = {}
+    if free_window:
+        filter_args.update(free_date=free_window[0].strftime('%Y-%m-%d'),
+                           free_start=free_window[0].strftime('%H:%M'),
+                           free_end=free_window[1].strftime('%H:%M'))
+    capacity = request.args.get('capacity', type=int)
+    if capacity:
+        filter_args['capacity'] = capacity
     
     # Add stats to each resource
-    resources_with_stats = []
-    for resource in resources:
-        stats = get_resource_stats(resource.id)
-        resource_dict = {
-            'resource': resource,
-            'rating': stats['rating'],
-            'review_count': stats['review_count'],
-            'booking_count': stats['booking_count']
-        }
-        resources_with_stats.append(resource_dict)
-    
-    # Sort resources
-    if sort_by == 'recent':
-        resources_with_stats.sort(key=lambda x: x['resource'].created_at, reverse=True)
-    elif sort_by == 'rating':
-        resources_with_stats.sort(key=lambda x: x['rating'], reverse=True)
-    elif sort_by == 'popular':
-        resources_with_stats.sort(key=lambda x: x['booking_count'], reverse=True)
+    resources_with_stats = attach_resource_stats(resources)
+    snippets = get_search_snippets(search, [r.id for r in resources]) if relevance is not None else {}
+    for item in resources_with_stats:
+        item['snippet'] = snippets.get(item['resource'].id)
     
     categories = [
         {'value': 'all', 'label': 'All Categories'},
@@ -104,8 +353,56 @@ def browse():
                          resources=resources_with_stats,
                          search=search,
                          category=category,
+                         capacity=capacity,
+                         free_window=free_window,
+                         filter_args=filter_args,
                          sort_by=sort_by,
-                         categories=categories)
+                         categories=categories,
+                         search_ranked=relevance is not None,
+                         per_page=per_page,
+                         cursor=cursor,
+                         next_cursor=next_cursor)
+
+
+@resources_bp.route('/api/browse')
+def browse_api():
+    """API endpoint returning the same pages as browse, as JSON."""
+    search = request.args.get('search', '').strip()
+    try:
+        free_window = parse_free_window(request.args)
+    except ValueError:
+        return jsonify({'error': 'Invalid free time range'}), 400
+    
+    query, relevance = build_browse_query(request.args, free_window)
+    sort_by = _browse_sort(relevance)
+    
+    try:
+        resources, next_cursor = paginate_resources(
+            query, sort_by, request.args.get('cursor'), _browse_page_size(), relevance, free_window
+        )
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor'}), 400
+    
+    snippets = get_search_snippets(search, [r.id for r in resources]) if relevance is not None else {}
+    
+    return jsonify({
+        'resources': [{
+            'id': item['resource'].id,
+            'title': item['resource'].title,
+            'description': item['resource'].description,
+            'category': item['resource'].category,
+            'location': item['resource'].location,
+            'capacity': item['resource'].capacity,
+            'status': item['resource'].status,
+            'rating': item['rating'],
+            'review_count': item['review_count'],
+            'booking_count': item['booking_count'],
+            'created_at': item['resource'].created_at.isoformat(),
+            'snippet': str(snippets[item['resource'].id]) if item['resource'].id in snippets else None,
+            'url': url_for('resources.detail', resource_id=item['resource'].id)
+        } for item in attach_resource_stats(resources)],
+        'next_cursor': next_cursor
+    })
 
 
 @resources_bp.route('/<int:resource_id>')
@@ -176,6 +473,13 @@ def create():
             flash('Please fill in all required fields.', 'danger')
             return render_template('resources/create.html')
         
+        availability_rules = (availability_rules or '').strip()
+        try:
+            parse_availability(availability_rules)
+        except ValueError as e:
+            flash(f'Invalid availability rules: {e}', 'danger')
+            return render_template('resources/create.html')
+        
         # Create resource
         resource = Resource(
             title=title,
@@ -183,7 +487,7 @@ def create():
             category=category,
             location=location,
             capacity=capacity,
-            availability_rules=availability_rules,
+            availability_rules=availability_rules or None,
             requires_approval=requires_approval,
             status=status,
             owner_id=current_user.id
@@ -234,13 +538,23 @@ def edit(resource_id):
         return redirect(url_for('resources.detail', resource_id=resource_id))
     
     if request.method == 'POST':
+        # Free-text rules saved before rules were structured may be resubmitted unchanged
+        availability_rules = (request.form.get('availability_rules') or '').strip()
+        if availability_rules != (resource.availability_rules or '').strip():
+            try:
+                parse_availability(availability_rules)
+            except ValueError as e:
+                flash(f'Invalid availability rules: {e}', 'danger')
+                return redirect(url_for('resources.edit', resource_id=resource.id))
+        
         resource.title = request.form.get('title')
         resource.description = request.form.get('description')
         resource.category = request.form.get('category')
         resource.location = request.form.get('location')
         resource.capacity = request.form.get('capacity', type=int)
-        resource.availability_rules = request.form.get('availability_rules')
+        resource.availability_rules = availability_rules or None
         resource.requires_approval = request.form.get('requires_approval') == 'on'
+        previous_status = resource.status
         resource.status = request.form.get('status', 'draft')
         resource.updated_at = datetime.utcnow()
         
@@ -261,7 +575,11 @@ def edit(resource_id):
                 equipment = ResourceEquipment(resource_id=resource.id, equipment_name=eq_name)
                 db.session.add(equipment)
         
+        if resource.status == 'archived' and previous_status != 'archived':
+            notify_resource_archived(resource)
+        
         db.session.commit()
+        invalidate_resource_schedule(resource.id)
         
         flash('Resource updated successfully!', 'success')
         return redirect(url_for('resources.detail', resource_id=resource.id))
@@ -309,16 +627,7 @@ def my_resources():
     """View resources owned by the current user (staff and admins only)."""
     resources = Resource.query.filter_by(owner_id=current_user.id).all()
     
-    resources_with_stats = []
-    for resource in resources:
-        stats = get_resource_stats(resource.id)
-        resource_dict = {
-            'resource': resource,
-            'rating': stats['rating'],
-            'review_count': stats['review_count'],
-            'booking_count': stats['booking_count']
-        }
-        resources_with_stats.append(resource_dict)
+    resources_with_stats = attach_resource_stats(resources)
     
     return render_template('resources/my_resources.html', resources=resources_with_stats)
 
@@ -3,25 +3,13 @@ from flask import Blueprint, render_template, request, redirect, url_for, flash
 from flask_login import login_required, current_user
 from datetime import datetime
 from src.database import db
-from src.models import Review, Resource, Booking, Notification
+from src.models import Review, Resource, Booking
+from src.views.resources import adjust_resource_counters
+from src.utils.notifications import create_notification
 
 reviews_bp = Blueprint('reviews', __name__)
 
 
-def create_notification(user_id, notification_type, title, message, link=None):
-    """Helper function to create notifications."""
-    notification = Notification(
-        user_id=user_id,
-        type=notification_type,
-        title=title,
-        message=message,
-        link=link,
-        read=False
-    )
-    db.session.add(notification)
-    return notification
-
-
 @reviews_bp.route('/create/<int:resource_id>', methods=['GET', 'POST'])
 @login_required
 def create(resource_id):
@@ -81,6 +69,7 @@ def create(resource_id):
         )
         
         db.session.add(review)
+        adjust_resource_counters(resource_id, rating_delta=rating, review_delta=1)
         
         # Notify resource owner
         create_notification(
@@ -122,6 +111,7 @@ def edit(review_id):
             flash('Please provide a comment.', 'danger')
             return render_template('reviews/edit.html', review=review)
         
+        adjust_resource_counters(review.resource_id, rating_delta=rating - review.rating)
         review.rating = rating
         review.comment = comment
         
@@ -145,6 +135,7 @@ def delete(review_id):
         flash('You do not have permission to delete this review.', 'danger')
         return redirect(url_for('resources.detail', resource_id=resource_id))
     
+    adjust_resource_counters(resource_id, rating_delta=-review.rating, review_delta=-1)
     db.session.delete(review)
     db.session.commit()
     
@@ -0,0 +1,147 @@
+"""
+Database Throughput Benchmark
+
+Compares mixed read/write throughput on a SQLite file with the driver defaults
+(rollback journal, synchronous=FULL) against the tuned PRAGMAs applied by
+src.database.configure_engine (WAL, synchronous=NORMAL, busy_timeout, ...).
+
+Each run starts reader and writer threads against a fresh temporary database
+for a fixed duration and reports operations per second and lock errors.
+
+Usage:
+    python tests/benchmark_database.py [--seconds 5] [--readers 8] [--writers 2]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from src.database import configure_engine, get_engine_options, get_sqlite_pragmas
+
+SEED_ROWS = 20000
+RESOURCES = 50
+
+SCHEMA = [
+    """CREATE TABLE bookings (
+        id INTEGER PRIMARY KEY,
+        resource_id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        start_time DATETIME NOT NULL,
+        end_time DATETIME NOT NULL,
+        status VARCHAR(20) NOT NULL
+    )""",
+    "CREATE INDEX ix_bookings_resource_status_time ON bookings (resource_id, status, start_time, end_time)",
+]
+
+READ_QUERY = text("""
+    SELECT count(*) FROM bookings
+    WHERE resource_id = :resource_id AND status IN ('pending', 'approved')
+      AND start_time < :end AND end_time > :start
+""")
+
+WRITE_QUERY = text("""
+    INSERT INTO bookings (resource_id, user_id, start_time, end_time, status)
+    VALUES (:resource_id, :user_id, :start, :end, 'pending')
+""")
+
+
+def make_engine(path, tuned):
+    """Create an engine for the benchmark database, optionally with tuned PRAGMAs."""
+    url = f'sqlite:///{path}'
+    if not tuned:
+        return create_engine(url, connect_args={'check_same_thread': False})
+    engine = create_engine(url, **get_engine_options(url))
+    configure_engine(engine, get_sqlite_pragmas())
+    return engine
+
+
+def seed(engine):
+    """Create the schema and seed bookings spread over a year."""
+    base = datetime(2030, 1, 1)
+    with engine.begin() as conn:
+        for ddl in SCHEMA:
+            conn.execute(text(ddl))
+        conn.execute(WRITE_QUERY, [
+            {'resource_id': i % RESOURCES, 'user_id': i % 500,
+             'start': base + timedelta(hours=i), 'end': base + timedelta(hours=i + 1)}
+            for i in range(SEED_ROWS)
+        ])
+
+
+def worker(engine, write, deadline, counts, index):
+    """Run reads or single-row write transactions until the deadline."""
+    base = datetime(2030, 1, 1)
+    ops = errors = 0
+    i = index
+    while time.perf_counter() < deadline:
+        i += 1
+        start = base + timedelta(hours=(i * 37) % SEED_ROWS)
+        params = {'resource_id': i % RESOURCES, 'user_id': i % 500,
+                  'start': start, 'end': start + timedelta(hours=2)}
+        try:
+            if write:
+                with engine.begin() as conn:
+                    conn.execute(WRITE_QUERY, params)
+            else:
+                with engine.connect() as conn:
+                    conn.execute(READ_QUERY, params).scalar()
+            ops += 1
+        except OperationalError:
+            errors += 1
+    counts.append((write, ops, errors))
+
+
+def run(tuned, seconds, readers, writers):
+    """Run one benchmark configuration and return (reads/s, writes/s, errors)."""
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    engine = make_engine(path, tuned)
+    try:
+        seed(engine)
+        counts = []
+        deadline = time.perf_counter() + seconds
+        threads = [
+            threading.Thread(target=worker, args=(engine, n < writers, deadline, counts, n))
+            for n in range(readers + writers)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        reads = sum(ops for write, ops, _ in counts if not write)
+        writes = sum(ops for write, ops, _ in counts if write)
+        errors = sum(err for _, _, err in counts)
+        return reads / seconds, writes / seconds, errors
+    finally:
+        engine.dispose()
+        for suffix in ('', '-wal', '-shm', '-journal'):
+            if os.path.exists(path + suffix):
+                os.unlink(path + suffix)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare default and tuned SQLite throughput.')
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=2)
+    args = parser.parse_args()
+    
+    print(f"{args.readers} readers, {args.writers} writers, {args.seconds:g}s per run")
+    print(f"{'configuration':<14}{'reads/s':>12}{'writes/s':>12}{'lock errors':>14}")
+    for label, tuned in (('default', False), ('tuned', True)):
+        reads, writes, errors = run(tuned, args.seconds, args.readers, args.writers)
+        print(f"{label:<14}{reads:>12.0f}{writes:>12.0f}{errors:>14}")
+
+
+if __name__ == '__main__':
+    main()
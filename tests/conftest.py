@@ -2,10 +2,20 @@
 import pytest
 import os
 import tempfile
+from contextlib import contextmanager
+from datetime import timedelta
+from sqlalchemy import event
 from app import create_app
 from src.database import db
 from src.models import User, Resource, Booking, Review, Message, Notification
 
+# Passwords of the users created by the fixtures below, by email
+TEST_PASSWORDS = {
+    'test@example.com': 'testpass123',
+    'staff@example.com': 'staffpass123',
+    'admin@example.com': 'adminpass123',
+}
+
 
 @pytest.fixture
 def app():
@@ -13,22 +23,27 @@ def app():
     # Create a temporary database file
     db_fd, db_path = tempfile.mkstemp(suffix='.db')
     
-    # Create app with test configuration
-    app = create_app()
-    app.config['TESTING'] = True
-    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
-    app.config['SECRET_KEY'] = 'test-secret-key'
-    app.config['WTF_CSRF_ENABLED'] = False  # Disable CSRF for testing
+    # Create app with test configuration; the database URI must be set before
+    # init_db binds the engine
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{db_path}',
+        'SECRET_KEY': 'test-secret-key',
+        'WTF_CSRF_ENABLED': False,  # Disable CSRF for testing
+    })
     
     with app.app_context():
         db.create_all()
         yield app
         db.drop_all()
         db.session.remove()
+        db.engine.dispose()
     
-    # Clean up
+    # Clean up (including WAL side files)
     os.close(db_fd)
-    os.unlink(db_path)
+    for path in (db_path, f'{db_path}-wal', f'{db_path}-shm'):
+        if os.path.exists(path):
+            os.unlink(path)
 
 
 @pytest.fixture
@@ -127,3 +142,50 @@ def authenticated_client(client, app, test_user):
         }, follow_redirects=True)
     return client
 
+
+
+@pytest.fixture
+def login():
+    """Log a client in as one of the fixture users. Returns a function taking (client, email)."""
+    def _login(client, email='test@example.com'):
+        return client.post('/auth/login', data={'email': email, 'password': TEST_PASSWORDS[email]})
+    return _login
+
+
+@pytest.fixture
+def make_booking(app):
+    """
+    Create and commit a booking. Returns a function returning the Booking.
+    
+    The booking lasts `hours` from `start` unless end_time is given; any other
+    keyword arguments are set on the booking as passed.
+    """
+    def _make_booking(user_id, resource_id, start, hours=1, status='approved', **fields):
+        fields.setdefault('end_time', start + timedelta(hours=hours))
+        booking = Booking(user_id=user_id, resource_id=resource_id, status=status, start_time=start, **fields)
+        db.session.add(booking)
+        db.session.commit()
+        return booking
+    return _make_booking
+
+
+@pytest.fixture
+def record_statements(app):
+    """
+    Record the SQL statements sent to the test database.
+    
+    Returns a context manager yielding a list that collects every statement
+    executed inside the block, as (statement, parameters) tuples when called
+    with parameters=True.
+    """
+    @contextmanager
+    def _record(parameters=False):
+        statements = []
+        def before_cursor_execute(conn, cursor, statement, params, context, executemany):
+            statements.append((statement, params) if parameters else statement)
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+    return _record
@@ -0,0 +1,97 @@
+"""Tests for the cached admin overview statistics."""
+import pytest
+from datetime import datetime, timedelta
+from src.database import db
+from src.models import Booking, User
+from src.utils.admin_stats import get_admin_stats, invalidate_admin_stats
+
+
+def _tomorrow():
+    return datetime.utcnow() + timedelta(days=1)
+
+
+class TestAdminStats:
+    """Test the single-query, cached overview numbers."""
+    
+    def test_one_query_then_cached(self, app, test_user, test_resource, make_booking, record_statements):
+        """Test that all numbers come from one statement and are then served from the cache."""
+        make_booking(test_user, test_resource, _tomorrow(), status='pending')
+        
+        with record_statements() as statements:
+            get_admin_stats()
+        assert len(statements) == 1
+        with record_statements() as statements:
+            get_admin_stats()
+        assert statements == []
+        assert get_admin_stats() == {
+            'total_users': 2,
+            'active_resources': 1,
+            'pending_approvals': 1,
+            'total_bookings': 1
+        }
+    
+    def test_committed_changes_invalidate(self, app, test_user, test_resource, make_booking, record_statements):
+        """Test that commits touching counted rows drop the cache and rollbacks do not."""
+        assert get_admin_stats()['pending_approvals'] == 0
+        
+        start = _tomorrow()
+        db.session.add(Booking(user_id=test_user, resource_id=test_resource, status='pending',
+                               start_time=start, end_time=start + timedelta(hours=1)))
+        db.session.flush()
+        db.session.rollback()
+        with record_statements() as statements:
+            get_admin_stats()
+        assert statements == []
+        
+        booking = make_booking(test_user, test_resource, start, status='pending')
+        assert get_admin_stats()['pending_approvals'] == 1
+        
+        booking.status = 'approved'
+        db.session.commit()
+        assert get_admin_stats()['pending_approvals'] == 0
+    
+    def test_unrelated_changes_keep_cache(self, app, test_user, record_statements):
+        """Test that editing fields the stats do not count keeps the cached numbers."""
+        get_admin_stats()
+        User.query.get(test_user).department = 'Physics'
+        db.session.commit()
+        with record_statements() as statements:
+            get_admin_stats()
+        assert statements == []
+    
+    def test_explicit_invalidation_for_bulk_writes(self, app, test_user, test_resource):
+        """Test invalidate_admin_stats for changes made with bulk statements."""
+        assert get_admin_stats()['total_bookings'] == 0
+        db.session.execute(Booking.__table__.insert(), [{
+            'user_id': test_user, 'resource_id': test_resource, 'status': 'pending',
+            'start_time': datetime.utcnow(), 'end_time': datetime.utcnow() + timedelta(hours=1),
+            'created_at': datetime.utcnow(), 'updated_at': datetime.utcnow()
+        }])
+        invalidate_admin_stats()
+        db.session.commit()
+        assert get_admin_stats()['total_bookings'] == 1
+    
+    def test_tabs_use_cached_stats(self, client, app, test_admin, login, record_statements):
+        """Test that a warm admin tab issues no count queries."""
+        login(client, 'admin@example.com')
+        client.get('/admin/reviews')
+        
+        for path in ('/admin/reviews', '/admin/resources', '/admin/users'):
+            with record_statements() as statements:
+                client.get(path)
+            assert not [s for s in statements if 'count(' in s], path
+    
+    def test_moving_series_back_to_pending_invalidates(self, client, app, test_user, test_resource,
+                                                       login, make_booking):
+        """Test that the bulk series move refreshes the pending count when it resets approvals."""
+        from src.models import Resource
+        Resource.query.get(test_resource).requires_approval = True
+        start = (datetime.utcnow() + timedelta(days=2)).replace(hour=10, minute=0, second=0, microsecond=0)
+        for week in range(2):
+            make_booking(test_user, test_resource, start + timedelta(weeks=week), series_id='series')
+        assert get_admin_stats()['pending_approvals'] == 0
+        
+        login(client)
+        response = client.post('/bookings/api/series/series', json={'start_time': '11:00', 'end_time': '12:00'})
+        assert response.get_json() == {'success': True, 'updated_count': 2}
+        assert get_admin_stats()['pending_approvals'] == 2
@@ -0,0 +1,131 @@
+"""Tests for the paginated, filterable admin tables."""
+import pytest
+from datetime import datetime, timedelta
+from src.database import db
+from src.models import Resource, Review, User
+
+
+def _add_users(count, role='student', start=None):
+    start = start or datetime(2030, 1, 1)
+    users = []
+    for i in range(count):
+        user = User(email=f'{role}{i}@example.com', name=f'{role.title()} {i:02d}', role=role,
+                    created_at=start + timedelta(minutes=i))
+        user.set_password('password123')
+        users.append(user)
+    db.session.add_all(users)
+    db.session.commit()
+    return [user.id for user in users]
+
+
+def _select_count(record_statements, client, path):
+    """Request path and return how many SELECT statements it issued."""
+    with record_statements() as statements:
+        response = client.get(path)
+    assert response.status_code == 200
+    return len([s for s in statements if s.lstrip().upper().startswith('SELECT')])
+
+
+class TestAdminUserTable:
+    """Test paging, sorting and filtering of the user table."""
+    
+    def test_api_pages_follow_cursor(self, client, app, test_admin, login):
+        """Test that following next_cursor walks every user exactly once."""
+        _add_users(7)
+        login(client, 'admin@example.com')
+        
+        seen, cursor = [], None
+        while True:
+            path = '/admin/api/users?role=student&per_page=3' + (f'&cursor={cursor}' if cursor else '')
+            data = client.get(path).get_json()
+            seen.extend(user['email'] for user in data['users'])
+            cursor = data['next_cursor']
+            if cursor is None:
+                break
+        
+        assert seen == [f'student{i}@example.com' for i in reversed(range(7))]
+    
+    def test_sort_and_search(self, client, app, test_admin, login):
+        """Test name sorting and search by email or name."""
+        _add_users(3)
+        _add_users(2, role='staff')
+        login(client, 'admin@example.com')
+        
+        data = client.get('/admin/api/users?sort=name&role=staff').get_json()
+        assert [user['name'] for user in data['users']] == ['Staff 00', 'Staff 01']
+        
+        data = client.get('/admin/api/users?search=student1@').get_json()
+        assert [user['email'] for user in data['users']] == ['student1@example.com']
+    
+    def test_invalid_cursor(self, client, app, test_admin, login):
+        """Test that the API rejects a bad cursor and the page starts over."""
+        login(client, 'admin@example.com')
+        assert client.get('/admin/api/users?cursor=garbage').status_code == 400
+        assert client.get('/admin/users?cursor=garbage').status_code == 200
+    
+    def test_page_links_keep_filters(self, client, app, test_admin, login):
+        """Test that the HTML table links to the next page with the same filters."""
+        _add_users(4)
+        login(client, 'admin@example.com')
+        
+        response = client.get('/admin/users?role=student&per_page=3')
+        assert b'Next page' in response.data
+        assert b'role=student' in response.data
+        assert response.data.count(b'@example.com</td>') == 3
+    
+    def test_query_count_is_constant(self, client, app, test_admin, login, record_statements):
+        """Test that a page issues the same number of queries however many rows exist."""
+        login(client, 'admin@example.com')
+        _add_users(3)
+        client.get('/admin/users')
+        few = _select_count(record_statements, client, '/admin/users?per_page=25')
+        _add_users(30, role='staff')
+        client.get('/admin/users')
+        many = _select_count(record_statements, client, '/admin/users?per_page=25')
+        assert few == many
+
+
+class TestAdminResourceAndReviewTables:
+    """Test the resource and review tables."""
+    
+    def _add_resource(self, owner_id, title, status='published', category='study-room', days=0):
+        resource = Resource(title=title, description='Room', category=category, location='Building B',
+                            capacity=2, status=status, owner_id=owner_id,
+                            created_at=datetime(2030, 1, 1) + timedelta(days=days))
+        db.session.add(resource)
+        db.session.commit()
+        return resource.id
+    
+    def test_resource_filters(self, client, app, test_admin, test_staff, login):
+        """Test status and category filters and title sorting."""
+        self._add_resource(test_staff, 'Zeta Lab', category='lab-equipment', days=1)
+        self._add_resource(test_staff, 'Alpha Room', days=2)
+        self._add_resource(test_staff, 'Old Room', status='archived', days=3)
+        login(client, 'admin@example.com')
+        
+        data = client.get('/admin/api/resources?status=published&sort=title').get_json()
+        assert [r['title'] for r in data['resources']] == ['Alpha Room', 'Zeta Lab']
+        assert data['resources'][0]['owner']['name'] == 'Staff Member'
+        
+        data = client.get('/admin/api/resources?category=lab-equipment').get_json()
+        assert [r['title'] for r in data['resources']] == ['Zeta Lab']
+    
+    def test_review_filters(self, client, app, test_admin, test_user, test_resource, login):
+        """Test rating filter and lowest-first sort on the review table."""
+        other_resource = self._add_resource(User.query.filter_by(role='staff').first().id, 'Second Room')
+        db.session.add_all([
+            Review(resource_id=test_resource, user_id=test_user, rating=5, comment='Great space'),
+            Review(resource_id=other_resource, user_id=test_user, rating=2, comment='Too noisy')
+        ])
+        db.session.commit()
+        login(client, 'admin@example.com')
+        
+        data = client.get('/admin/api/reviews?sort=lowest').get_json()
+        assert [r['rating'] for r in data['reviews']] == [2, 5]
+        
+        data = client.get('/admin/api/reviews?rating=5').get_json()
+        assert [r['comment'] for r in data['reviews']] == ['Great space']
+        
+        response = client.get('/admin/reviews?search=noisy')
+        assert b'Too noisy' in response.data
+        assert b'Great space' not in response.data
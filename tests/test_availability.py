@@ -0,0 +1,134 @@
+"""Tests for resource availability rules."""
+import pytest
+from datetime import date, datetime, timedelta
+from src.database import db
+from src.models import Booking, Resource
+from src.utils.availability import get_resource_schedule, parse_availability
+
+
+def _next(weekday, hour):
+    """The next given weekday (0 = Monday) at least two days from now, at hour:00."""
+    day = datetime.utcnow().date() + timedelta(days=2)
+    day += timedelta(days=(weekday - day.weekday()) % 7)
+    return datetime(day.year, day.month, day.day, hour)
+
+
+class TestParseAvailability:
+    """Test compiling rules text into a schedule."""
+    
+    def test_weekly_windows(self):
+        """Test day ranges, lists, split windows and overnight windows."""
+        schedule = parse_availability('Mon-Fri 9AM-12PM, 1PM-5PM; Tuesdays & Thursdays 6pm-8pm; Sat 10PM-2AM')
+        monday = datetime(2030, 1, 7)
+        
+        assert schedule.is_available(monday + timedelta(hours=9), monday + timedelta(hours=12))
+        assert not schedule.is_available(monday + timedelta(hours=11), monday + timedelta(hours=13))
+        assert schedule.is_available(monday + timedelta(days=1, hours=18), monday + timedelta(days=1, hours=20))
+        assert not schedule.is_available(monday + timedelta(hours=18), monday + timedelta(hours=20))
+        assert schedule.is_available(monday + timedelta(days=5, hours=23), monday + timedelta(days=6, hours=1))
+        assert not schedule.is_available(monday + timedelta(days=6, hours=3), monday + timedelta(days=6, hours=4))
+    
+    def test_windows_wrap_into_next_week(self):
+        """Test a booking running from Sunday night into Monday morning."""
+        schedule = parse_availability('Sun 8PM-midnight, Mon midnight-6AM')
+        assert schedule.windows == ((0, 360), (9840, 10080))
+        assert schedule.is_available(datetime(2030, 1, 13, 22), datetime(2030, 1, 14, 2))
+        assert not schedule.is_available(datetime(2030, 1, 13, 22), datetime(2030, 1, 14, 7))
+    
+    def test_blackouts_and_duration_limits(self):
+        """Test closed dates and minimum and maximum durations."""
+        schedule = parse_availability('Closed 2030-12-24 to 2030-12-26, Closed 2030-12-31, Min 30m, Max 2h')
+        assert schedule.windows is None
+        
+        with pytest.raises(ValueError, match='closed from December 24, 2030'):
+            schedule.validate(datetime(2030, 12, 25, 10), datetime(2030, 12, 25, 11))
+        with pytest.raises(ValueError, match='at least 30 minutes'):
+            schedule.validate(datetime(2030, 12, 27, 10), datetime(2030, 12, 27, 10, 15))
+        with pytest.raises(ValueError, match='at most 2 hours'):
+            schedule.validate(datetime(2030, 12, 27, 10), datetime(2030, 12, 27, 13))
+        schedule.validate(datetime(2030, 12, 27, 10), datetime(2030, 12, 27, 12))
+        assert schedule.blackouts[-1] == (date(2030, 12, 31), date(2030, 12, 31))
+    
+    @pytest.mark.parametrize('rules', [
+        'Mon-Fri 9AM-6PM (Staff supervision required)',
+        '9AM-5PM',
+        'Funday 9AM-5PM',
+        'Mon 13PM-2PM',
+        'Max 3 days',
+        'Min 2h, Max 1h'
+    ])
+    def test_invalid_rules(self, rules):
+        """Test that text the parser does not understand is rejected."""
+        with pytest.raises(ValueError):
+            parse_availability(rules)
+
+
+class TestAvailabilityEnforcement:
+    """Test that bookings and the conflict API honour the rules."""
+    
+    def _set_rules(self, resource_id, rules):
+        resource = db.session.get(Resource, resource_id)
+        resource.availability_rules = rules
+        db.session.commit()
+        return resource
+    
+    def _book(self, client, resource_id, start, hours=1):
+        return client.post(f'/bookings/create/{resource_id}', data={
+            'date': start.strftime('%Y-%m-%d'),
+            'start_time': start.strftime('%H:%M'),
+            'end_time': (start + timedelta(hours=hours)).strftime('%H:%M')
+        }, follow_redirects=True)
+    
+    def test_booking_outside_hours_is_rejected(self, client, app, test_user, test_resource, login):
+        """Test that a booking outside the opening windows is not created."""
+        self._set_rules(test_resource, 'Mon-Fri 9AM-5PM')
+        login(client)
+        
+        response = self._book(client, test_resource, _next(5, 10))
+        assert b'outside the hours this resource is available' in response.data
+        assert Booking.query.count() == 0
+        
+        self._book(client, test_resource, _next(0, 10))
+        assert Booking.query.count() == 1
+    
+    def test_conflict_api_reports_availability(self, client, app, test_user, test_resource, login):
+        """Test the availability fields of the conflict check API."""
+        self._set_rules(test_resource, 'Daily 8AM-6PM, Max 2h')
+        login(client)
+        start = _next(2, 9)
+        
+        def check(start_time, end_time):
+            return client.post('/bookings/api/check-conflict', json={
+                'resource_id': test_resource, 'date': start.strftime('%Y-%m-%d'),
+                'start_time': start_time, 'end_time': end_time
+            }).get_json()
+        
+        assert check('09:00', '10:00')['available'] is True
+        data = check('09:00', '12:00')
+        assert data['available'] is False
+        assert 'at most 2 hours' in data['availability_error']
+    
+    def test_legacy_free_text_is_not_enforced(self, app, test_resource):
+        """Test that rules written before the structured format do not block bookings."""
+        resource = self._set_rules(test_resource, 'Check-out for up to 3 days, training required')
+        assert get_resource_schedule(resource) is None
+    
+    def test_edit_validates_and_invalidates(self, client, app, test_staff, test_resource, login):
+        """Test that editing rejects bad rules and replaces the cached schedule."""
+        resource = self._set_rules(test_resource, 'Mon-Fri 9AM-5PM')
+        assert not get_resource_schedule(resource).is_available(_next(5, 10), _next(5, 11))
+        login(client, 'staff@example.com')
+        
+        form = {
+            'title': resource.title, 'description': resource.description, 'category': resource.category,
+            'location': resource.location, 'capacity': resource.capacity, 'status': 'published'
+        }
+        response = client.post(f'/resources/{test_resource}/edit', follow_redirects=True,
+                               data=dict(form, availability_rules='Whenever'))
+        assert b'Invalid availability rules' in response.data
+        assert db.session.get(Resource, test_resource).availability_rules == 'Mon-Fri 9AM-5PM'
+        
+        client.post(f'/resources/{test_resource}/edit', data=dict(form, availability_rules='Daily 8AM-8PM'))
+        resource = db.session.get(Resource, test_resource)
+        assert resource.availability_rules == 'Daily 8AM-8PM'
+        assert get_resource_schedule(resource).is_available(_next(5, 10), _next(5, 11))
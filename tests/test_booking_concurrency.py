@@ -0,0 +1,58 @@
+"""Stress test for atomic booking reservation under concurrent requests."""
+import pytest
+import threading
+import time
+from datetime import datetime, timedelta
+from src.database import db
+from src.models import Booking
+
+
+class TestConcurrentBooking:
+    """Test that concurrent overlapping requests never double-book a resource."""
+    
+    THREADS = 16
+    REQUESTS_PER_THREAD = 16
+    
+    def test_concurrent_overlapping_requests_book_once(self, app, test_user, test_resource, login):
+        """Fire hundreds of overlapping booking requests in parallel; exactly one may succeed."""
+        date_str = (datetime.utcnow() + timedelta(days=1)).strftime('%Y-%m-%d')
+        # Every candidate slot overlaps every other one (latest start < earliest end)
+        slots = [(f'10:{minute:02d}', f'11:{minute:02d}') for minute in range(0, 46, 5)]
+        
+        errors = []
+        start_barrier = threading.Barrier(self.THREADS)
+        
+        def worker(worker_index):
+            # Log in from the worker thread so each client gets its own app context
+            client = app.test_client()
+            login(client)
+            start_barrier.wait()
+            for i in range(self.REQUESTS_PER_THREAD):
+                start_time, end_time = slots[(worker_index + i) % len(slots)]
+                response = client.post(f'/bookings/create/{test_resource}', data={
+                    'date': date_str,
+                    'start_time': start_time,
+                    'end_time': end_time
+                })
+                if response.status_code >= 500:
+                    errors.append(response.status_code)
+        
+        threads = [threading.Thread(target=worker, args=(index,))
+                   for index in range(self.THREADS)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        
+        total_requests = self.THREADS * self.REQUESTS_PER_THREAD
+        print(f'\n{total_requests} concurrent booking requests in {elapsed:.2f}s '
+              f'({total_requests / elapsed:.0f} req/s)')
+        
+        with app.app_context():
+            db.session.expire_all()
+            bookings = Booking.query.filter_by(resource_id=test_resource).all()
+        
+        assert errors == []
+        assert len(bookings) == 1
@@ -0,0 +1,77 @@
+"""Tests for the My Bookings page."""
+import re
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import insert
+from src.database import db
+from src.models import Booking
+from src.views import bookings as bookings_view
+
+
+def _card_count(html, tab):
+    """Number of booking cards in one tab pane."""
+    pane = html.split(f'id="{tab}" role="tabpanel"')[1].split('role="tabpanel"')[0]
+    return pane.count('class="card h-100"')
+
+
+class TestBookingList:
+    """Test the tabs and pagination of the booking list."""
+    
+    def test_tabs_are_split_by_status_and_time(self, client, app, test_user, test_resource, login, make_booking):
+        """Test which tab each booking lands in."""
+        now = datetime.utcnow()
+        make_booking(test_user, test_resource, now + timedelta(days=1), status='approved')
+        make_booking(test_user, test_resource, now + timedelta(days=2), status='pending')
+        make_booking(test_user, test_resource, now - timedelta(days=1), status='approved')
+        make_booking(test_user, test_resource, now - timedelta(days=2), status='completed')
+        make_booking(test_user, test_resource, now + timedelta(days=3), status='cancelled')
+        login(client)
+        
+        html = client.get('/bookings/').get_data(as_text=True)
+        assert 'Upcoming (1)' in html and 'Pending (1)' in html
+        assert _card_count(html, 'upcoming') == 1
+        assert _card_count(html, 'pending') == 1
+        assert _card_count(html, 'past') == 3
+    
+    def test_past_bookings_are_paginated(self, client, app, test_user, test_resource, monkeypatch, login,
+                                         make_booking):
+        """Test that following the cursor walks every past booking exactly once, newest first."""
+        monkeypatch.setattr(bookings_view, 'PAST_BOOKINGS_PAGE_SIZE', 2)
+        start = datetime.utcnow() - timedelta(days=1)
+        for days in range(5):
+            make_booking(test_user, test_resource, start - timedelta(days=days), status='completed')
+        login(client)
+        
+        dates, url = [], '/bookings/'
+        while url:
+            html = client.get(url).get_data(as_text=True)
+            past = html.split('id="past" role="tabpanel"')[1]
+            dates += re.findall(r'<strong>(\w+ \d\d, \d{4})</strong>', past)
+            match = re.search(r'href="([^"]*cursor=[^"]*)"', past)
+            url = match.group(1).replace('&amp;', '&') if match else None
+        
+        expected = [(start - timedelta(days=days)).strftime('%B %d, %Y') for days in range(5)]
+        assert dates == expected
+        
+        response = client.get('/bookings/?cursor=not-a-cursor')
+        assert response.status_code == 200
+    
+    def test_queries_do_not_grow_with_history(self, client, app, test_user, test_resource, login,
+                                              record_statements):
+        """Test that a long booking history costs a fixed number of queries."""
+        now = datetime.utcnow()
+        db.session.execute(insert(Booking.__table__), [
+            dict(user_id=test_user, resource_id=test_resource, status='completed',
+                 start_time=now - timedelta(days=days + 1), end_time=now - timedelta(days=days + 1, hours=-1),
+                 created_at=now, updated_at=now)
+            for days in range(200)
+        ])
+        db.session.commit()
+        login(client)
+        
+        with record_statements() as statements:
+            html = client.get('/bookings/').get_data(as_text=True)
+        
+        assert _card_count(html, 'past') == bookings_view.PAST_BOOKINGS_PAGE_SIZE
+        assert len([s for s in statements if 'FROM bookings' in s]) <= 5
+        assert len([s for s in statements if 'FROM resources' in s]) <= 2
@@ -3,7 +3,10 @@ import pytest
 from datetime import datetime, timedelta, UTC
 from src.database import db
 from src.models import Booking, Resource, User
-from src.views.bookings import check_booking_conflict, check_user_booking_conflict
+from src.views.bookings import (
+    check_booking_conflict, check_user_booking_conflict,
+    has_booking_conflict, has_user_booking_conflict
+)
 
 
 class TestBookingConflictDetection:
@@ -246,6 +249,52 @@ class TestUserBookingConflictDetection:
             assert has_conflict is False
 
 
+class TestConflictFastPath:
+    """Test the EXISTS-based conflict checks and their indexes."""
+    
+    def test_fast_path_agrees_with_full_check(self, app, test_user, test_resource):
+        """Test that has_*_conflict returns the same answer as the full checks."""
+        with app.app_context():
+            start_time = datetime.now(UTC) + timedelta(hours=1)
+            end_time = start_time + timedelta(hours=2)
+            booking = Booking(
+                resource_id=test_resource,
+                user_id=test_user,
+                start_time=start_time,
+                end_time=end_time,
+                status='approved'
+            )
+            db.session.add(booking)
+            db.session.commit()
+            
+            overlapping = (start_time + timedelta(minutes=30), end_time + timedelta(minutes=30))
+            adjacent = (end_time, end_time + timedelta(hours=1))
+            
+            assert has_booking_conflict(test_resource, *overlapping) is True
+            assert has_booking_conflict(test_resource, *adjacent) is False
+            assert has_booking_conflict(test_resource, start_time, end_time, exclude_booking_id=booking.id) is False
+            assert has_user_booking_conflict(test_user, *overlapping) is True
+            assert has_user_booking_conflict(test_user, *adjacent) is False
+    
+    def test_conflict_queries_use_composite_indexes(self, app, test_user, test_resource, record_statements):
+        """Test that SQLite plans the conflict checks as index range scans."""
+        with app.app_context():
+            start_time = datetime.now(UTC)
+            end_time = start_time + timedelta(hours=1)
+            for fn, owner_id, index_name in [
+                (has_booking_conflict, test_resource, 'ix_bookings_resource_status_time'),
+                (has_user_booking_conflict, test_user, 'ix_bookings_user_status_start'),
+            ]:
+                with record_statements(parameters=True) as statements:
+                    fn(owner_id, start_time, end_time)
+                
+                statement, parameters = statements[-1]
+                plan = db.session.connection().exec_driver_sql(
+                    f'EXPLAIN QUERY PLAN {statement}', parameters
+                ).fetchall()
+                assert any(index_name in row[-1] for row in plan)
+
+
 class TestBookingStatusTransitions:
     """Test booking status transitions."""
     
@@ -402,3 +451,97 @@ class TestBookingStatusTransitions:
             
             assert booking.status == 'completed'
 
+
+
+class TestCompletedBookingSweep:
+    """Test the background sweep that persists completed bookings."""
+    
+    def _add_booking(self, resource_id, user_id, start, end, status='approved'):
+        booking = Booking(resource_id=resource_id, user_id=user_id,
+                          start_time=start, end_time=end, status=status)
+        db.session.add(booking)
+        db.session.commit()
+        return booking
+    
+    def test_sweep_updates_only_ended_approved_bookings(self, app, test_user, test_resource, record_statements):
+        """Test that the sweep is one UPDATE touching only ended approved bookings."""
+        from src.utils import mark_past_bookings_completed
+        with app.app_context():
+            now = datetime.utcnow()
+            ended = self._add_booking(test_resource, test_user, now - timedelta(hours=3), now - timedelta(hours=2))
+            ended_pending = self._add_booking(test_resource, test_user, now - timedelta(hours=5), now - timedelta(hours=4),
+                                              status='pending')
+            upcoming = self._add_booking(test_resource, test_user, now + timedelta(hours=1), now + timedelta(hours=2))
+            
+            with record_statements() as statements:
+                assert mark_past_bookings_completed() == 1
+            
+            assert len(statements) == 1
+            assert statements[0].lstrip().upper().startswith('UPDATE')
+            
+            db.session.expire_all()
+            assert db.session.get(Booking, ended.id).status == 'completed'
+            assert db.session.get(Booking, ended_pending.id).status == 'pending'
+            assert db.session.get(Booking, upcoming.id).status == 'approved'
+    
+    def test_effective_status_derives_completed(self, app, test_user, test_resource):
+        """Test that ended approved bookings read as completed before the sweep runs."""
+        with app.app_context():
+            now = datetime.utcnow()
+            ended = self._add_booking(test_resource, test_user, now - timedelta(hours=3), now - timedelta(hours=2))
+            upcoming = self._add_booking(test_resource, test_user, now + timedelta(hours=1), now + timedelta(hours=2))
+            
+            assert ended.status == 'approved'
+            assert ended.effective_status == 'completed'
+            assert upcoming.effective_status == 'approved'
+    
+    def test_listing_bookings_does_not_write(self, client, app, test_user, test_resource, login):
+        """Test that GET /bookings/ leaves the stored status alone and shows it as completed."""
+        with app.app_context():
+            now = datetime.utcnow()
+            ended = self._add_booking(test_resource, test_user, now - timedelta(hours=3), now - timedelta(hours=2))
+            
+            login(client)
+            response = client.get('/bookings/')
+            assert response.status_code == 200
+            assert b'Completed' in response.data
+            
+            db.session.expire_all()
+            assert db.session.get(Booking, ended.id).status == 'approved'
+    
+    def test_background_jobs_not_started_when_testing_or_disabled(self, app):
+        """Test that the job thread respects TESTING and a zero interval."""
+        from src.utils.scheduler import start_background_jobs
+        assert start_background_jobs(app) is None
+        
+        app.config['TESTING'] = False
+        app.config['BOOKING_SWEEP_INTERVAL'] = 0
+        try:
+            assert start_background_jobs(app) is None
+        finally:
+            app.config['TESTING'] = True
+    
+    def test_job_runner_sweeps_until_stopped(self, app, test_user, test_resource):
+        """Test that the job runner runs its jobs and exits once stopped."""
+        import threading
+        from src.utils import mark_past_bookings_completed
+        from src.utils.scheduler import _run_jobs
+        
+        with app.app_context():
+            now = datetime.utcnow()
+            ended = self._add_booking(test_resource, test_user, now - timedelta(hours=3), now - timedelta(hours=2))
+            ended_id = ended.id
+        
+        stop_event = threading.Event()
+        def sweep_once():
+            mark_past_bookings_completed()
+            stop_event.set()
+        
+        thread = threading.Thread(target=_run_jobs, args=(app, [sweep_once], 60, stop_event))
+        thread.start()
+        thread.join(timeout=10)
+        assert not thread.is_alive()
+        
+        with app.app_context():
+            db.session.expire_all()
+            assert db.session.get(Booking, ended_id).status == 'completed'
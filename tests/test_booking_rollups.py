@@ -0,0 +1,117 @@
+"""Tests for the booking analytics rollups."""
+import pytest
+from datetime import datetime, time, timedelta
+from src.database import db
+from src.models import Booking, DailyBookingRollup, HourlyBookingRollup, JobWatermark, Resource
+from src.utils.analytics import (
+    WATERMARK_NAME, WATERMARK_OVERLAP, get_busiest_hours, get_category_booking_stats, get_top_resources, update_booking_rollups
+)
+
+
+def _day(days_ago=1):
+    return datetime.combine(datetime.utcnow().date() - timedelta(days=days_ago), time.min)
+
+
+def _hourly(resource_id):
+    return {(row.period_start.hour, row.bookings, row.approved, row.booked_minutes)
+            for row in HourlyBookingRollup.query.filter_by(resource_id=resource_id)}
+
+
+class TestRollupUpdates:
+    """Test building and incrementally maintaining the rollups."""
+    
+    def test_minutes_are_split_across_hours(self, app, test_user, test_resource, make_booking):
+        """Test that a booking counts in its start hour and its minutes land in every hour it overlaps."""
+        make_booking(test_user, test_resource, _day() + timedelta(hours=9, minutes=30), hours=2)
+        make_booking(test_user, test_resource, _day() + timedelta(hours=10), status='pending')
+        
+        assert update_booking_rollups() == 1
+        assert _hourly(test_resource) == {(9, 1, 1, 30), (10, 1, 0, 60), (11, 0, 0, 30)}
+        
+        daily = DailyBookingRollup.query.filter_by(resource_id=test_resource).one()
+        assert (daily.period_start, daily.bookings, daily.approved, daily.booked_minutes) == \
+            (_day(), 2, 1, 120)
+        assert daily.utilization == 120 / (24 * 60)
+    
+    def test_incremental_run_touches_changed_days(self, app, test_user, test_resource, make_booking):
+        """Test that later runs only recompute days of bookings changed since the watermark."""
+        make_booking(test_user, test_resource, _day(3) + timedelta(hours=9))
+        update_booking_rollups()
+        assert db.session.get(JobWatermark, WATERMARK_NAME) is not None
+        
+        booking = make_booking(test_user, test_resource, _day(1) + timedelta(hours=14))
+        db.session.get(JobWatermark, WATERMARK_NAME).value = datetime.utcnow() + timedelta(minutes=10)
+        db.session.commit()
+        assert update_booking_rollups() == 0
+        
+        db.session.get(JobWatermark, WATERMARK_NAME).value = booking.updated_at + WATERMARK_OVERLAP
+        db.session.commit()
+        assert update_booking_rollups() == 1
+        assert DailyBookingRollup.query.filter_by(resource_id=test_resource).count() == 2
+    
+    def test_status_change_is_reflected(self, app, test_user, test_resource, make_booking):
+        """Test that cancelling a booking moves it out of the approved counts and minutes."""
+        booking = make_booking(test_user, test_resource, _day() + timedelta(hours=9))
+        update_booking_rollups()
+        
+        booking.status = 'cancelled'
+        db.session.commit()
+        update_booking_rollups()
+        
+        daily = DailyBookingRollup.query.filter_by(resource_id=test_resource).one()
+        assert (daily.bookings, daily.approved, daily.cancelled, daily.booked_minutes) == (1, 0, 1, 0)
+    
+    def test_full_rebuild(self, app, runner, test_user, test_resource, make_booking):
+        """Test that --full rebuilds rollups after direct database edits."""
+        make_booking(test_user, test_resource, _day() + timedelta(hours=9))
+        update_booking_rollups()
+        
+        Booking.query.delete()
+        db.session.commit()
+        assert DailyBookingRollup.query.count() == 1
+        
+        result = runner.invoke(args=['update-booking-rollups', '--full'])
+        assert 'Recomputed rollups for 0 resource-day(s).' in result.output
+        assert DailyBookingRollup.query.count() == 0
+        assert HourlyBookingRollup.query.count() == 0
+
+
+class TestRollupReaders:
+    """Test the dashboard queries over the rollups."""
+    
+    def _add_resource(self, owner_id, title, category):
+        resource = Resource(title=title, description='Room', category=category, location='Building B',
+                            capacity=2, status='published', owner_id=owner_id)
+        db.session.add(resource)
+        db.session.commit()
+        return resource.id
+    
+    def test_readers(self, app, test_user, test_staff, test_resource, make_booking):
+        """Test top resources, category stats and busiest hours, ignoring old and future bookings."""
+        lab = self._add_resource(test_staff, 'Chemistry Lab', 'lab-equipment')
+        make_booking(test_user, test_resource, _day(2) + timedelta(hours=9))
+        make_booking(test_user, test_resource, _day(1) + timedelta(hours=9), status='rejected')
+        make_booking(test_user, lab, _day(1) + timedelta(hours=15), hours=3)
+        make_booking(test_user, lab, _day(60) + timedelta(hours=9))
+        make_booking(test_user, lab, _day(-3) + timedelta(hours=9), hours=8)
+        update_booking_rollups()
+        
+        assert get_top_resources(days=30) == [(test_resource, 'Test Study Room', 2), (lab, 'Chemistry Lab', 1)]
+        assert get_busiest_hours(days=30) == [(9, 2), (15, 1)]
+        
+        stats = {item['category']: item for item in get_category_booking_stats(days=30)}
+        assert stats['study-room']['approval_rate'] == 0.5
+        assert stats['lab-equipment']['booked_minutes'] == 180
+        assert stats['lab-equipment']['utilization'] == 180 / (30 * 24 * 60)
+    
+    def test_dashboard_shows_rollups(self, client, app, test_admin, test_user, test_resource, make_booking, login):
+        """Test that the overview renders the rollup cards."""
+        make_booking(test_user, test_resource, _day() + timedelta(hours=9))
+        update_booking_rollups()
+        login(client, 'admin@example.com')
+        
+        response = client.get('/admin/dashboard')
+        assert response.status_code == 200
+        assert b'Bookings by Category' in response.data
+        assert b'Busiest Hours' in response.data
+        assert b'09:00' in response.data
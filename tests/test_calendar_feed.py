@@ -0,0 +1,164 @@
+"""Tests for the calendar API and iCalendar feeds."""
+import pytest
+from datetime import datetime, timedelta
+from src.database import db
+from src.models import Booking, Resource
+from src.utils.calendar_feed import build_ical, calendar_token
+
+
+def _day(days_ahead=2):
+    day = datetime.utcnow().date() + timedelta(days=days_ahead)
+    return datetime(day.year, day.month, day.day)
+
+
+def _version(resource_id):
+    return db.session.query(Resource.calendar_version).filter_by(id=resource_id).scalar()
+
+
+class TestCalendarVersion:
+    """Test that booking writes bump the resource's calendar version."""
+    
+    def test_orm_writes_bump_version(self, app, test_user, test_resource, make_booking):
+        """Test inserts, relevant updates and deletes, but not unrelated edits."""
+        assert _version(test_resource) == 0
+        booking = make_booking(test_user, test_resource, _day() + timedelta(hours=9))
+        assert _version(test_resource) == 1
+        
+        booking.notes = 'Bring a laptop'
+        db.session.commit()
+        assert _version(test_resource) == 1
+        
+        booking.status = 'cancelled'
+        db.session.commit()
+        assert _version(test_resource) == 2
+        
+        db.session.delete(booking)
+        db.session.commit()
+        assert _version(test_resource) == 3
+    
+    def test_bump_keeps_updated_at(self, app, test_user, test_resource, make_booking):
+        """Test that booking writes bump the version without changing the resource's edit date."""
+        edited = datetime(2025, 1, 1, 12, 0)
+        Resource.query.filter_by(id=test_resource).update({Resource.updated_at: edited})
+        db.session.commit()
+        
+        make_booking(test_user, test_resource, _day() + timedelta(hours=9))
+        db.session.expire_all()
+        resource = db.session.get(Resource, test_resource)
+        assert resource.calendar_version == 1
+        assert resource.updated_at == edited
+    
+    def test_rollback_keeps_version(self, app, test_user, test_resource):
+        """Test that a rolled back booking leaves the version unchanged."""
+        db.session.add(Booking(user_id=test_user, resource_id=test_resource, status='approved',
+                               start_time=_day(), end_time=_day() + timedelta(hours=1)))
+        db.session.flush()
+        db.session.rollback()
+        assert _version(test_resource) == 0
+    
+    def test_series_cancel_bumps_version(self, client, app, test_user, test_resource, login, make_booking):
+        """Test that the bulk series cancel bumps the version."""
+        for week in range(3):
+            make_booking(test_user, test_resource, _day() + timedelta(weeks=week, hours=9), series_id='abc')
+        version = _version(test_resource)
+        login(client)
+        client.post('/bookings/series/abc/cancel', json={})
+        assert _version(test_resource) == version + 1
+
+
+class TestCalendarApi:
+    """Test the JSON occupancy endpoint."""
+    
+    def test_intervals_are_merged_and_windowed(self, client, app, test_user, test_resource, login, make_booking):
+        """Test that touching bookings merge and bookings outside the window are left out."""
+        day = _day()
+        make_booking(test_user, test_resource, day + timedelta(hours=9))
+        make_booking(test_user, test_resource, day + timedelta(hours=10))
+        make_booking(test_user, test_resource, day + timedelta(hours=11), status='pending')
+        make_booking(test_user, test_resource, day + timedelta(hours=13), status='cancelled')
+        make_booking(test_user, test_resource, day + timedelta(days=8, hours=9))
+        login(client)
+        
+        data = client.get(f'/bookings/api/calendar/{test_resource}',
+                          query_string={'start': day.strftime('%Y-%m-%d')}).get_json()
+        assert data['intervals'] == [
+            [(day + timedelta(hours=9)).isoformat(), (day + timedelta(hours=11)).isoformat(), 'booked'],
+            [(day + timedelta(hours=11)).isoformat(), (day + timedelta(hours=12)).isoformat(), 'pending']
+        ]
+    
+    def test_etag_revalidation(self, client, app, test_user, test_resource, login, make_booking,
+                               record_statements):
+        """Test that an unchanged window is a 304 without a bookings query and a change is not."""
+        login(client)
+        path = f'/bookings/api/calendar/{test_resource}?start={_day().strftime("%Y-%m-%d")}'
+        response = client.get(path)
+        etag = response.headers['ETag']
+        
+        with record_statements() as statements:
+            response = client.get(path, headers={'If-None-Match': etag})
+        assert response.status_code == 304
+        assert not [s for s in statements if 'FROM bookings' in s]
+        
+        make_booking(test_user, test_resource, _day() + timedelta(hours=9))
+        response = client.get(path, headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert len(response.get_json()['intervals']) == 1
+    
+    def test_invalid_requests(self, client, app, test_user, test_resource, login):
+        """Test validation of the window."""
+        login(client)
+        assert client.get(f'/bookings/api/calendar/{test_resource}?days=100').status_code == 400
+        assert client.get(f'/bookings/api/calendar/{test_resource}?start=soon').status_code == 400
+        assert client.get('/bookings/api/calendar/9999').status_code == 404
+
+
+class TestIcalFeeds:
+    """Test the iCalendar exports."""
+    
+    def test_resource_feed_hides_bookers(self, client, app, test_user, test_resource, make_booking):
+        """Test that the resource feed lists occupied times without personal details."""
+        make_booking(test_user, test_resource, _day() + timedelta(hours=9), notes='Private notes')
+        
+        response = client.get(f'/bookings/calendar/resource/{test_resource}.ics')
+        assert response.status_code == 200
+        assert response.mimetype == 'text/calendar'
+        body = response.get_data(as_text=True)
+        assert body.count('BEGIN:VEVENT') == 1
+        assert f'DTSTART:{(_day() + timedelta(hours=9)).strftime("%Y%m%dT%H%M%S")}' in body
+        assert 'Private notes' not in body and 'Test User' not in body
+        
+        response = client.get(f'/bookings/calendar/resource/{test_resource}.ics',
+                              headers={'If-None-Match': response.headers['ETag']})
+        assert response.status_code == 304
+    
+    def test_user_feed_requires_valid_token(self, client, app, test_user, test_resource, make_booking):
+        """Test the signed per-user feed and its revalidation."""
+        make_booking(test_user, test_resource, _day() + timedelta(hours=9), status='pending', notes='Group study')
+        
+        assert client.get('/bookings/calendar/user/not-a-token.ics').status_code == 404
+        
+        path = f'/bookings/calendar/user/{calendar_token(test_user)}.ics'
+        response = client.get(path)
+        body = response.get_data(as_text=True)
+        assert 'SUMMARY:Test Study Room (pending approval)' in body
+        assert 'DESCRIPTION:Group study' in body
+        assert 'STATUS:TENTATIVE' in body
+        
+        assert client.get(path, headers={'If-None-Match': response.headers['ETag']}).status_code == 304
+    
+    def test_list_page_links_feed(self, client, app, test_user, login):
+        """Test that My Bookings links to the user's feed."""
+        login(client)
+        response = client.get('/bookings/')
+        assert calendar_token(test_user).encode() in response.data
+    
+    def test_text_is_escaped_and_folded(self):
+        """Test escaping of special characters and folding of long lines."""
+        start = datetime(2030, 1, 1, 9)
+        text = build_ical('Rooms', [{
+            'uid': 'x@test', 'start': start, 'end': start + timedelta(hours=1),
+            'summary': 'Room A, B; C\\D', 'description': 'Line one\nLine two ' + 'x' * 100
+        }])
+        assert 'SUMMARY:Room A\\, B\\; C\\\\D' in text
+        assert all(len(line.encode()) <= 75 for line in text.split('\r\n'))
+        assert '\r\n x' in text
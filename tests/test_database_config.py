@@ -0,0 +1,52 @@
+"""Tests for database URL, engine option and SQLite PRAGMA configuration."""
+from sqlalchemy import text
+from src.database import db, get_database_url, get_engine_options, get_sqlite_pragmas
+
+
+class TestDatabaseConfig:
+    """Test the environment-driven database configuration layer."""
+    
+    def test_sqlite_pragmas_applied_on_connect(self, app):
+        """Test that every pooled connection gets the tuned PRAGMAs."""
+        with app.app_context():
+            with db.engine.connect() as conn:
+                assert conn.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+                assert conn.execute(text('PRAGMA synchronous')).scalar() == 1  # NORMAL
+                assert conn.execute(text('PRAGMA busy_timeout')).scalar() == 5000
+                assert conn.execute(text('PRAGMA cache_size')).scalar() == -64000
+                assert conn.execute(text('PRAGMA temp_store')).scalar() == 2  # MEMORY
+    
+    def test_test_config_database_uri_is_used(self, app):
+        """Test that a URI passed to create_app is the one the engine binds to."""
+        with app.app_context():
+            assert str(db.engine.url) == app.config['SQLALCHEMY_DATABASE_URI']
+            assert 'campus_resource_hub.db' not in str(db.engine.url)
+    
+    def test_database_url_from_environment(self, monkeypatch):
+        """Test DATABASE_URL handling, including the legacy postgres:// scheme."""
+        monkeypatch.setenv('DATABASE_URL', 'postgres://user:pw@db.example.com/hub')
+        assert get_database_url() == 'postgresql://user:pw@db.example.com/hub'
+        
+        monkeypatch.delenv('DATABASE_URL')
+        assert get_database_url().endswith('campus_resource_hub.db')
+    
+    def test_engine_options_from_environment(self, monkeypatch):
+        """Test that pool options are read from the environment."""
+        monkeypatch.setenv('DB_POOL_SIZE', '20')
+        monkeypatch.setenv('DB_POOL_RECYCLE', '600')
+        monkeypatch.setenv('DB_POOL_PRE_PING', 'false')
+        
+        options = get_engine_options('postgresql://user:pw@db.example.com/hub')
+        assert options['pool_size'] == 20
+        assert options['pool_recycle'] == 600
+        assert options['pool_pre_ping'] is False
+        assert 'connect_args' not in options
+        
+        assert get_engine_options('sqlite:///hub.db')['connect_args'] == {'check_same_thread': False}
+    
+    def test_pragma_overrides_from_environment(self, monkeypatch):
+        """Test SQLITE_<NAME> overrides for individual PRAGMAs."""
+        monkeypatch.setenv('SQLITE_BUSY_TIMEOUT', '15000')
+        pragmas = get_sqlite_pragmas()
+        assert pragmas['busy_timeout'] == '15000'
+        assert pragmas['journal_mode'] == 'WAL'
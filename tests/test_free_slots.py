@@ -0,0 +1,94 @@
+"""Tests for the free-slot finder."""
+import pytest
+from datetime import datetime, timedelta
+from src.database import db
+from src.models import Resource
+from src.utils.availability import subtract_intervals
+
+
+def _day(days_ahead=3):
+    day = datetime.utcnow().date() + timedelta(days=days_ahead)
+    return datetime(day.year, day.month, day.day)
+
+
+def _slots(client, resource_id, **params):
+    response = client.get(f'/bookings/api/free-slots/{resource_id}', query_string=params)
+    return response.status_code, response.get_json()
+
+
+class TestSubtractIntervals:
+    """Test the sweep that removes busy times from open times."""
+    
+    def test_overlapping_removals(self):
+        """Test removals that overlap each other and span interval boundaries."""
+        intervals = [(0, 10), (20, 30), (40, 50)]
+        removals = [(2, 4), (3, 6), (8, 22), (25, 26), (45, 60)]
+        assert subtract_intervals(intervals, removals) == [(0, 2), (6, 8), (22, 25), (26, 30), (40, 45)]
+    
+    def test_no_removals(self):
+        """Test that intervals come back unchanged without removals."""
+        assert subtract_intervals([(0, 10)], []) == [(0, 10)]
+
+
+class TestFreeSlotsApi:
+    """Test the free-slot API."""
+    
+    def test_gaps_between_bookings(self, client, app, test_user, test_resource, login, make_booking):
+        """Test that approved and pending bookings are carved out and short gaps dropped."""
+        day = _day()
+        make_booking(test_user, test_resource, day + timedelta(hours=9))
+        make_booking(test_user, test_resource, day + timedelta(hours=10, minutes=30), hours=1.5, status='pending')
+        make_booking(test_user, test_resource, day + timedelta(hours=14), status='cancelled')
+        login(client)
+        
+        status, data = _slots(client, test_resource, start=day.strftime('%Y-%m-%d'), duration=60)
+        assert status == 200
+        assert [(s['start_time'], s['end_time']) for s in data['slots']] == [
+            (day.isoformat(), (day + timedelta(hours=9)).isoformat()),
+            ((day + timedelta(hours=12)).isoformat(), (day + timedelta(days=1)).isoformat())
+        ]
+    
+    def test_availability_windows_and_limits(self, client, app, test_user, test_resource, login, make_booking):
+        """Test that slots stay inside opening hours and honour duration limits."""
+        resource = db.session.get(Resource, test_resource)
+        resource.availability_rules = 'Daily 9AM-5PM, Max 3h'
+        db.session.commit()
+        day = _day()
+        make_booking(test_user, test_resource, day + timedelta(hours=11), hours=2)
+        login(client)
+        
+        end = (day + timedelta(days=1)).strftime('%Y-%m-%d')
+        status, data = _slots(client, test_resource, start=day.strftime('%Y-%m-%d'), end=end, duration=120)
+        assert status == 200
+        assert [(s['start_time'][11:16], s['end_time'][11:16]) for s in data['slots']] == [
+            ('09:00', '11:00'), ('13:00', '17:00'), ('09:00', '17:00')
+        ]
+        
+        status, data = _slots(client, test_resource, start=day.strftime('%Y-%m-%d'), duration=240)
+        assert status == 400
+        assert 'at most 3 hours' in data['error']
+    
+    def test_one_booking_query(self, client, app, test_user, test_resource, login, make_booking,
+                               record_statements):
+        """Test that a month of free slots comes from a single bookings query."""
+        for days_ahead in range(1, 20):
+            start = _day(days_ahead) + timedelta(hours=10)
+            make_booking(test_user, test_resource, start)
+        login(client)
+        
+        with record_statements() as statements:
+            status, data = _slots(client, test_resource, start=_day(1).strftime('%Y-%m-%d'),
+                                  end=_day(30).strftime('%Y-%m-%d'), duration=30)
+        
+        assert status == 200
+        assert len(data['slots']) == 20
+        assert len([s for s in statements if 'FROM bookings' in s]) == 1
+    
+    def test_invalid_requests(self, client, app, test_user, test_resource, login):
+        """Test validation of dates, range length and duration."""
+        login(client)
+        day = _day().strftime('%Y-%m-%d')
+        assert _slots(client, test_resource, start='tomorrow')[0] == 400
+        assert _slots(client, test_resource, start=day, duration=0)[0] == 400
+        assert _slots(client, test_resource, start=day, end=_day(60).strftime('%Y-%m-%d'))[0] == 400
+        assert _slots(client, 9999, start=day)[0] == 404
@@ -0,0 +1,324 @@
+"""Tests for conversations and message thread listing."""
+import pytest
+from datetime import datetime, timedelta
+from src.database import db
+from src.models import Message, Booking, Conversation, ConversationParticipant, User
+from src.views.messages import (
+    backfill_conversations, get_message_threads, get_or_create_conversation, get_thread_page,
+    mark_thread_read, parse_thread_ref
+)
+
+
+def _participant(thread_id, user_id):
+    return ConversationParticipant.query.join(Conversation)\
+        .filter(Conversation.thread_id == thread_id, ConversationParticipant.user_id == user_id).one()
+
+
+class TestConversations:
+    """Test that sending and reading messages maintain conversation state."""
+    
+    def test_parse_thread_ref(self):
+        """Test parsing resource and booking thread ids."""
+        assert parse_thread_ref('resource_12') == ('resource', 12)
+        assert parse_thread_ref('booking_3') == ('booking', 3)
+        assert parse_thread_ref('booking_x') == (None, None)
+        assert parse_thread_ref(None) == (None, None)
+    
+    def test_send_message_updates_conversation(self, client, app, test_user, test_staff, test_resource, login):
+        """Test that sending creates the conversation and bumps the receiver's unread count."""
+        with app.app_context():
+            thread_id = f'resource_{test_resource}'
+            login(client)
+            client.post(f'/messages/thread/{thread_id}/send', data={'content': 'Is the room free on Friday?'})
+            client.post(f'/messages/thread/{thread_id}/send', data={'content': 'Around 2pm?'})
+            
+            conversation = Conversation.query.filter_by(thread_id=thread_id).one()
+            assert conversation.resource_id == test_resource
+            assert conversation.last_message_preview == 'Around 2pm?'
+            assert conversation.last_sender_id == test_user
+            assert Message.query.filter_by(conversation_id=conversation.id).count() == 2
+            
+            assert _participant(thread_id, test_staff).unread_count == 2
+            assert _participant(thread_id, test_user).unread_count == 0
+            assert _participant(thread_id, test_user).last_message_at == conversation.last_message_at
+    
+    def test_viewing_thread_resets_unread_count(self, client, app, test_user, test_staff, test_resource, login):
+        """Test that the receiver's unread count drops to zero when they open the thread."""
+        thread_id = f'resource_{test_resource}'
+        
+        # Each user's requests run in their own app context so they do not share g
+        sender = app.test_client()
+        with app.app_context():
+            login(sender)
+            sender.post(f'/messages/thread/{thread_id}/send', data={'content': 'Hello'})
+        assert _participant(thread_id, test_staff).unread_count == 1
+        
+        with app.app_context():
+            login(client, 'staff@example.com')
+            assert client.get(f'/messages/thread/{thread_id}').status_code == 200
+        
+        db.session.expire_all()
+        assert _participant(thread_id, test_staff).unread_count == 0
+    
+    def test_threads_listed_from_conversations(self, app, test_user, test_staff, test_resource):
+        """Test the inbox fields and ordering for each participant."""
+        with app.app_context():
+            booking = Booking(resource_id=test_resource, user_id=test_user,
+                              start_time=datetime.utcnow() + timedelta(days=1),
+                              end_time=datetime.utcnow() + timedelta(days=1, hours=1),
+                              status='approved')
+            db.session.add(booking)
+            db.session.commit()
+            
+            for thread_id, minutes_ago in ((f'resource_{test_resource}', 10), (f'booking_{booking.id}', 5)):
+                db.session.add(Message(thread_id=thread_id, sender_id=test_staff, receiver_id=test_user,
+                                       content=f'About {thread_id}',
+                                       created_at=datetime.utcnow() - timedelta(minutes=minutes_ago)))
+            db.session.commit()
+            backfill_conversations()
+            
+            threads = get_message_threads(test_user)
+            assert [t['thread_id'] for t in threads] == [f'booking_{booking.id}', f'resource_{test_resource}']
+            assert threads[0]['booking'].id == booking.id
+            assert threads[0]['resource'].id == test_resource
+            assert threads[0]['other_user'].id == test_staff
+            assert threads[0]['last_message_preview'] == f'About booking_{booking.id}'
+            assert threads[0]['unread_count'] == 1
+            assert threads[1]['booking'] is None
+            
+            staff_threads = get_message_threads(test_staff)
+            assert [t['unread_count'] for t in staff_threads] == [0, 0]
+            assert staff_threads[0]['other_user'].id == test_user
+    
+    def test_thread_list_is_one_indexed_query(self, app, test_user, test_staff, test_resource, record_statements):
+        """Test that the inbox is a single query walking the participant index in order."""
+        with app.app_context():
+            for i in range(20):
+                db.session.add(Message(thread_id=f'direct_thread_{i}', sender_id=test_staff, receiver_id=test_user,
+                                       content='Hi', created_at=datetime.utcnow() - timedelta(minutes=i)))
+            db.session.commit()
+            backfill_conversations()
+            db.session.expire_all()
+            
+            with record_statements(parameters=True) as statements:
+                threads = get_message_threads(test_user)
+            assert len(threads) == 20
+            assert len(statements) == 1
+            
+            statement, parameters = statements[0]
+            plan = ' '.join(row[-1] for row in db.session.connection().exec_driver_sql(
+                'EXPLAIN QUERY PLAN ' + statement, parameters
+            ))
+            assert 'ix_conversation_participants_user_last' in plan
+            assert 'TEMP B-TREE FOR ORDER BY' not in plan
+    
+    def test_new_conversation_rolls_back_with_the_message(self, app, test_user, test_staff, test_resource):
+        """Test that creating a conversation after only reads stays in the caller's transaction."""
+        db.session.commit()
+        assert db.session.get(User, test_user) is not None
+        
+        get_or_create_conversation(f'resource_{test_resource}', [test_user, test_staff])
+        db.session.rollback()
+        
+        assert Conversation.query.count() == 0
+        assert ConversationParticipant.query.count() == 0
+    
+    def test_concurrently_added_participant_is_not_an_error(self, app, test_user, test_staff, test_resource,
+                                                            monkeypatch):
+        """Test that a participant row inserted by a concurrent request does not fail the send."""
+        thread_id = f'resource_{test_resource}'
+        get_or_create_conversation(thread_id, [test_user, test_staff])
+        db.session.commit()
+        
+        # Both requests read the participants before either inserted them
+        monkeypatch.setattr('src.views.messages._participant_ids', lambda conversation_id: set())
+        db.session.add(Message(thread_id=thread_id, sender_id=test_user, receiver_id=test_staff, content='Hi'))
+        get_or_create_conversation(thread_id, [test_user, test_staff])
+        db.session.commit()
+        
+        assert ConversationParticipant.query.count() == 2
+        assert Message.query.count() == 1
+    
+    def test_only_members_can_post(self, client, app, test_user, test_staff, test_admin, test_resource, login):
+        """Test that someone outside a thread cannot post to it or join it."""
+        thread_id = f'resource_{test_resource}'
+        sender = app.test_client()
+        with app.app_context():
+            login(sender)
+            sender.post(f'/messages/thread/{thread_id}/send', data={'content': 'Hello'})
+        
+        with app.app_context():
+            login(client, 'admin@example.com')
+            response = client.post(f'/messages/thread/{thread_id}/send', data={'content': 'Butting in'},
+                                   follow_redirects=True)
+        assert b'You do not have permission to post in this thread.' in response.data
+        assert Message.query.count() == 1
+        assert ConversationParticipant.query.filter_by(user_id=test_admin).count() == 0
+    
+    def test_conversation_listed_once(self, app, test_user, test_staff, test_admin, test_resource):
+        """Test that a conversation with extra participants still appears once in the inbox."""
+        db.session.add(Message(thread_id=f'resource_{test_resource}', sender_id=test_user,
+                               receiver_id=test_staff, content='Hello'))
+        db.session.commit()
+        backfill_conversations()
+        conversation = Conversation.query.one()
+        db.session.add(ConversationParticipant(conversation_id=conversation.id, user_id=test_admin))
+        db.session.commit()
+        
+        threads = get_message_threads(test_user)
+        assert len(threads) == 1
+        assert threads[0]['other_user'].id == min(test_staff, test_admin)
+    
+    def test_list_page_renders(self, client, app, test_user, test_staff, test_resource, login):
+        """Test that the messages page shows the thread title, preview and unread badge."""
+        db.session.add(Message(thread_id=f'resource_{test_resource}', sender_id=test_user,
+                               receiver_id=test_staff, content='Starting the thread', read=True))
+        db.session.commit()
+        backfill_conversations()
+        
+        # Each user's requests run in their own app context so they do not share g
+        staff_client = app.test_client()
+        with app.app_context():
+            login(staff_client, 'staff@example.com')
+            staff_client.post(f'/messages/thread/resource_{test_resource}/send', data={'content': 'Room is free'})
+        
+        with app.app_context():
+            login(client)
+            response = client.get('/messages/')
+        assert response.status_code == 200
+        assert b'Test Study Room' in response.data
+        assert b'Room is free' in response.data
+        assert b'1 new' in response.data
+
+
+class TestConversationBackfill:
+    """Test building conversations from an existing message log."""
+    
+    def test_backfill_from_messages(self, app, test_user, test_staff, test_resource):
+        """Test participants, last message, unread counts and message links."""
+        with app.app_context():
+            now = datetime.utcnow()
+            thread_id = f'resource_{test_resource}'
+            db.session.add_all([
+                Message(thread_id=thread_id, sender_id=test_user, receiver_id=test_staff,
+                        content='First', read=True, created_at=now - timedelta(minutes=30)),
+                Message(thread_id=thread_id, sender_id=test_staff, receiver_id=test_user,
+                        content='Second', created_at=now - timedelta(minutes=20)),
+                Message(thread_id=thread_id, sender_id=test_staff, receiver_id=test_user,
+                        content='Latest', created_at=now - timedelta(minutes=10)),
+            ])
+            db.session.commit()
+            
+            assert backfill_conversations() == 1
+            
+            conversation = Conversation.query.filter_by(thread_id=thread_id).one()
+            assert conversation.resource_id == test_resource
+            assert conversation.last_message_preview == 'Latest'
+            assert conversation.last_sender_id == test_staff
+            assert conversation.created_at == now - timedelta(minutes=30)
+            assert {p.user_id: p.unread_count for p in conversation.participants} == {test_user: 2, test_staff: 0}
+            assert Message.query.filter(Message.conversation_id.is_(None)).count() == 0
+            
+            # Running again creates nothing new
+            assert backfill_conversations() == 0
+            assert Conversation.query.count() == 1
+    
+    def test_backfill_gives_unthreaded_messages_a_direct_thread(self, app, test_user, test_staff):
+        """Test that messages without a thread id get one thread per pair of users."""
+        with app.app_context():
+            db.session.add_all([
+                Message(thread_id=None, sender_id=test_user, receiver_id=test_staff, content='Hi'),
+                Message(thread_id=None, sender_id=test_staff, receiver_id=test_user, content='Hello back'),
+            ])
+            db.session.commit()
+            
+            assert backfill_conversations() == 1
+            
+            low, high = sorted((test_user, test_staff))
+            threads = get_message_threads(test_user)
+            assert [t['thread_id'] for t in threads] == [f'direct_{low}_{high}']
+            assert threads[0]['unread_count'] == 1
+            assert threads[0]['resource'] is None
+
+
+class TestThreadHistory:
+    """Test cursor-based paging of a thread and set-based mark-read."""
+    
+    def _add_thread(self, thread_id, sender_id, receiver_id, count):
+        start = datetime.utcnow() - timedelta(hours=count)
+        messages = [
+            Message(thread_id=thread_id, sender_id=sender_id, receiver_id=receiver_id,
+                    content=f'Message {i}', created_at=start + timedelta(minutes=i))
+            for i in range(count)
+        ]
+        db.session.add_all(messages)
+        db.session.commit()
+        return [m.id for m in messages]
+    
+    def test_pages_walk_back_through_history(self, app, test_user, test_staff):
+        """Test that following the cursor visits every message once, newest page first."""
+        ids = self._add_thread('booking_1', test_staff, test_user, 120)
+        
+        page, cursor = get_thread_page('booking_1', per_page=50)
+        assert [m.id for m in page] == ids[70:]
+        
+        seen = [m.id for m in page]
+        while cursor:
+            page, cursor = get_thread_page('booking_1', before=cursor, per_page=50)
+            seen = [m.id for m in page] + seen
+        assert seen == ids
+    
+    def test_cursor_must_belong_to_thread(self, app, test_user, test_staff):
+        """Test that a message id from another thread is rejected."""
+        other_ids = self._add_thread('booking_2', test_staff, test_user, 2)
+        self._add_thread('booking_1', test_staff, test_user, 2)
+        with pytest.raises(ValueError):
+            get_thread_page('booking_1', before=other_ids[0])
+    
+    def test_page_query_uses_thread_index(self, app, test_user, test_staff, record_statements):
+        """Test that a page is an index range scan without a sort step."""
+        self._add_thread('booking_1', test_staff, test_user, 10)
+        with record_statements(parameters=True) as statements:
+            get_thread_page('booking_1', per_page=5)
+        
+        statement, parameters = statements[0]
+        plan = ' '.join(row[-1] for row in db.session.connection().exec_driver_sql(
+            'EXPLAIN QUERY PLAN ' + statement, parameters
+        ))
+        assert 'ix_messages_thread_created' in plan
+        assert 'TEMP B-TREE FOR ORDER BY' not in plan
+    
+    def test_mark_thread_read_is_one_update(self, app, test_user, test_staff, record_statements):
+        """Test that only the reader's unread messages in the thread are marked read."""
+        self._add_thread('booking_1', test_staff, test_user, 5)
+        self._add_thread('booking_1', test_user, test_staff, 2)
+        self._add_thread('booking_2', test_staff, test_user, 3)
+        
+        with record_statements() as statements:
+            count = mark_thread_read('booking_1', test_user)
+        assert count == 5
+        assert [s for s in statements if s.lstrip().upper().startswith('UPDATE MESSAGES')] == [statements[0]]
+        
+        db.session.expire_all()
+        assert Message.query.filter_by(thread_id='booking_1', read=False).count() == 2
+        assert Message.query.filter_by(thread_id='booking_2', read=False).count() == 3
+        assert mark_thread_read('booking_1', test_user) == 0
+    
+    def test_thread_view_links_older_history(self, client, app, test_user, test_staff, login):
+        """Test the thread page shows the latest page and a link to older messages."""
+        ids = self._add_thread('booking_1', test_staff, test_user, 60)
+        
+        with app.app_context():
+            login(client)
+            response = client.get('/messages/thread/booking_1')
+            assert response.status_code == 200
+            assert b'Message 59' in response.data
+            assert b'>Message 9<' not in response.data
+            assert f'before={ids[10]}'.encode() in response.data
+            
+            older = client.get(f'/messages/thread/booking_1?before={ids[10]}')
+            assert b'>Message 9<' in older.data
+            assert b'Jump to latest messages' in older.data
+            
+            # A bad cursor falls back to the latest page
+            assert b'Message 59' in client.get('/messages/thread/booking_1?before=999999').data
@@ -0,0 +1,115 @@
+"""Tests for notification retention, archival and the paged notification list."""
+import pytest
+from datetime import datetime, timedelta
+from src.database import db
+from src.models import Notification, NotificationArchive
+from src.utils.notifications import apply_notification_retention, archive_old_notifications, purge_notification_archive
+from src.views.notifications import get_notification_page
+
+
+def _add_notifications(user_id, count, days_old=0, read=False, title='Notice'):
+    created_at = datetime.utcnow() - timedelta(days=days_old)
+    notifications = [Notification(user_id=user_id, type='announcement', title=f'{title} {i}',
+                                  message='Hello.', read=read, created_at=created_at - timedelta(seconds=i))
+                     for i in range(count)]
+    db.session.add_all(notifications)
+    db.session.commit()
+    return [n.id for n in notifications]
+
+
+class TestNotificationArchival:
+    """Test moving notifications outside the retention policy to the archive."""
+    
+    def test_old_read_notifications_are_archived(self, app, test_user):
+        """Test that only read notifications older than the window are moved."""
+        old_read = _add_notifications(test_user, 3, days_old=120, read=True, title='Old read')
+        old_unread = _add_notifications(test_user, 1, days_old=120, read=False, title='Old unread')
+        recent_read = _add_notifications(test_user, 2, days_old=5, read=True, title='Recent read')
+        
+        assert archive_old_notifications(batch_size=2) == 3
+        
+        remaining = {n.id for n in Notification.query.all()}
+        assert remaining == set(old_unread + recent_read)
+        archived = NotificationArchive.query.order_by(NotificationArchive.notification_id).all()
+        assert [a.notification_id for a in archived] == sorted(old_read)
+        assert archived[0].user_id == test_user
+        assert archived[0].title.startswith('Old read')
+    
+    def test_notifications_beyond_per_user_limit_are_archived(self, app, test_user, test_staff):
+        """Test that each user keeps only their newest read notifications within the limit."""
+        app.config['NOTIFICATION_KEEP_PER_USER'] = 3
+        newest = _add_notifications(test_user, 3, days_old=1, read=True, title='Newest')
+        older = _add_notifications(test_user, 4, days_old=2, read=True, title='Older')
+        unread = _add_notifications(test_user, 1, days_old=3, read=False, title='Unread')
+        staff_ids = _add_notifications(test_staff, 3, days_old=2, read=True)
+        
+        assert archive_old_notifications() == 4
+        
+        remaining = {n.id for n in Notification.query.all()}
+        assert remaining == set(newest + unread + staff_ids)
+        assert {a.notification_id for a in NotificationArchive.query} == set(older)
+    
+    def test_nothing_to_archive(self, app, test_user):
+        """Test that a table within the policy is left alone."""
+        _add_notifications(test_user, 3, days_old=1, read=True)
+        assert apply_notification_retention() == (0, 0)
+        assert Notification.query.count() == 3
+    
+    def test_expired_archive_rows_are_purged(self, app, test_user):
+        """Test that archived notifications are deleted after the archive window."""
+        _add_notifications(test_user, 2, days_old=120, read=True)
+        archive_old_notifications()
+        NotificationArchive.query.update({NotificationArchive.archived_at: datetime.utcnow() - timedelta(days=800)})
+        _add_notifications(test_user, 1, days_old=100, read=True)
+        archive_old_notifications()
+        
+        assert purge_notification_archive(batch_size=1) == 2
+        assert NotificationArchive.query.count() == 1
+        
+        app.config['NOTIFICATION_ARCHIVE_RETENTION_DAYS'] = 0
+        NotificationArchive.query.update({NotificationArchive.archived_at: datetime.utcnow() - timedelta(days=800)})
+        assert purge_notification_archive() == 0
+    
+    def test_cli_command(self, app, runner, test_user):
+        """Test the archive-notifications command."""
+        _add_notifications(test_user, 2, days_old=120, read=True)
+        result = runner.invoke(args=['archive-notifications'])
+        assert 'Archived 2 notification(s); purged 0 archived notification(s).' in result.output
+
+
+class TestNotificationList:
+    """Test the paged notification list."""
+    
+    def test_pages_walk_backwards(self, app, test_user):
+        """Test that pages are newest first and chain through the cursor."""
+        ids = _add_notifications(test_user, 25)
+        
+        first, cursor = get_notification_page(test_user, per_page=20)
+        assert [n.id for n in first] == ids[:20]
+        second, last_cursor = get_notification_page(test_user, before=cursor, per_page=20)
+        assert [n.id for n in second] == ids[20:]
+        assert last_cursor is None
+    
+    def test_foreign_cursor_rejected(self, app, test_user, test_staff):
+        """Test that another user's notification cannot be used as a cursor."""
+        other_id = _add_notifications(test_staff, 1)[0]
+        with pytest.raises(ValueError):
+            get_notification_page(test_user, before=other_id)
+    
+    def test_list_page_marks_read_and_links_older(self, client, app, test_user, login):
+        """Test that the page shows new badges, marks everything read and links the next page."""
+        _add_notifications(test_user, 5, days_old=1, read=True, title='Seen')
+        _add_notifications(test_user, 20, title='Fresh')
+        login(client)
+        
+        response = client.get('/notifications/')
+        assert response.status_code == 200
+        assert response.data.count(b'rounded-pill">New</span>') == 20
+        assert b'Older notifications' in response.data
+        assert b'Seen 0' not in response.data
+        db.session.expire_all()
+        assert Notification.query.filter_by(user_id=test_user, read=False).count() == 0
+        
+        response = client.get('/notifications/?before=999999')
+        assert response.status_code == 200
+        assert b'Fresh 0' in response.data
@@ -0,0 +1,203 @@
+"""Tests for the notification service: bulk inserts, deferred dispatch and fan-out routes."""
+import pytest
+from datetime import datetime, timedelta
+from src.database import db
+from src.models import Booking, Notification, Resource, User
+from src.utils.notification_stream import broker, get_unread_count
+from src.utils.notifications import get_dispatcher, notify_many, notify_users
+
+
+def _users(count, role='student'):
+    users = [User(email=f'user{i}@example.com', name=f'User {i}', role=role) for i in range(count)]
+    for user in users:
+        user.set_password('password123')
+    db.session.add_all(users)
+    db.session.commit()
+    return [user.id for user in users]
+
+
+def _notification_inserts(statements):
+    """The INSERT statements against the notifications table among recorded statements."""
+    return [s for s in statements if s.startswith('INSERT INTO notifications')]
+
+
+class TestNotifyMany:
+    """Test bulk creation of notifications."""
+    
+    def test_single_insert_for_many_users(self, app, record_statements):
+        """Test that notifying many users issues one INSERT statement."""
+        user_ids = _users(25)
+        
+        with record_statements() as statements:
+            sent = notify_users(user_ids + user_ids[:5], 'announcement', 'Hello', 'Welcome back.')
+        db.session.commit()
+        
+        assert sent == 25
+        assert len(_notification_inserts(statements)) == 1
+        assert Notification.query.filter_by(type='announcement').count() == 25
+    
+    def test_events_and_counts_follow_commit(self, app):
+        """Test that pushed events carry ids and cached counts change only after commit."""
+        user_id = _users(1)[0]
+        assert get_unread_count(user_id) == 0
+        subscriber = broker.subscribe(user_id)
+        try:
+            notify_users([user_id], 'announcement', 'Hello', 'Welcome back.')
+            assert subscriber.empty()
+            db.session.commit()
+            
+            events = [subscriber.get_nowait() for _ in range(subscriber.qsize())]
+            notification_events = [data for event_type, data in events if event_type == 'notification']
+            assert len(notification_events) == 1
+            assert notification_events[0]['id'] is not None
+            assert get_unread_count(user_id) == 1
+        finally:
+            broker.unsubscribe(user_id, subscriber)
+    
+    def test_rollback_discards_notifications(self, app):
+        """Test that rolled back bulk notifications leave no rows or cached counts."""
+        user_id = _users(1)[0]
+        assert get_unread_count(user_id) == 0
+        
+        notify_users([user_id], 'announcement', 'Hello', 'Welcome back.')
+        db.session.rollback()
+        
+        assert Notification.query.count() == 0
+        assert get_unread_count(user_id) == 0
+    
+    def test_empty_batch_is_a_no_op(self, app, record_statements):
+        """Test that no statement is issued when there is nobody to notify."""
+        with record_statements() as statements:
+            sent = notify_many([])
+        assert sent == 0
+        assert _notification_inserts(statements) == []
+
+
+class TestDeferredDispatch:
+    """Test notifications written by the background dispatcher."""
+    
+    def test_written_after_commit(self, app):
+        """Test that deferred notifications are inserted once the transaction commits."""
+        user_ids = _users(3)
+        
+        notify_users(user_ids, 'announcement', 'Hello', 'Welcome back.', defer=True)
+        assert Notification.query.count() == 0
+        db.session.commit()
+        get_dispatcher(app).join()
+        
+        db.session.expire_all()
+        assert Notification.query.filter_by(type='announcement').count() == 3
+    
+    def test_dropped_on_rollback(self, app):
+        """Test that deferred notifications of a rolled back transaction are never written."""
+        user_ids = _users(3)
+        
+        notify_users(user_ids, 'announcement', 'Hello', 'Welcome back.', defer=True)
+        db.session.rollback()
+        db.session.commit()
+        get_dispatcher(app).join()
+        
+        assert Notification.query.count() == 0
+
+
+class TestFanOutRoutes:
+    """Test the routes that notify many users at once."""
+    
+    def _book(self, user_id, resource_id, days):
+        start = datetime.utcnow() + timedelta(days=days)
+        db.session.add(Booking(resource_id=resource_id, user_id=user_id, status='approved',
+                               start_time=start, end_time=start + timedelta(hours=1)))
+    
+    def test_archive_notifies_upcoming_bookers(self, client, app, test_admin, test_resource, login):
+        """Test that archiving a resource notifies each user with an upcoming booking once."""
+        booker, other_booker, past_booker = _users(3)
+        self._book(booker, test_resource, 1)
+        self._book(booker, test_resource, 2)
+        self._book(other_booker, test_resource, 3)
+        self._book(past_booker, test_resource, -3)
+        db.session.commit()
+        
+        login(client, 'admin@example.com')
+        client.post(f'/admin/resources/{test_resource}/archive')
+        
+        notified = [n.user_id for n in Notification.query.filter_by(type='resource_archived')]
+        assert sorted(notified) == sorted([booker, other_booker])
+        assert Resource.query.get(test_resource).status == 'archived'
+    
+    def test_broadcast_by_role(self, client, app, test_admin, login):
+        """Test that an announcement reaches only the selected role."""
+        students = _users(4)
+        
+        login(client, 'admin@example.com')
+        response = client.post('/admin/broadcast', data={
+            'title': 'Maintenance', 'message': 'The hub is down tonight.', 'role': 'student'
+        }, follow_redirects=True)
+        
+        assert b'Announcement sent to 4 user(s).' in response.data
+        notified = [n.user_id for n in Notification.query.filter_by(type='announcement')]
+        assert sorted(notified) == sorted(students)
+    
+    def test_broadcast_requires_message(self, client, app, test_admin, login):
+        """Test that an empty announcement is rejected."""
+        login(client, 'admin@example.com')
+        response = client.post('/admin/broadcast', data={'title': 'Empty', 'message': ''},
+                               follow_redirects=True)
+        
+        assert b'An announcement needs a title and a message.' in response.data
+        assert Notification.query.count() == 0
+
+
+class TestBulkStateRoutes:
+    """Test the set-based notification state endpoints."""
+    
+    def _seed(self, user_id):
+        db.session.add_all(
+            [Notification(user_id=user_id, type='new_message', title='Message', message='Hi.') for _ in range(3)] +
+            [Notification(user_id=user_id, type='booking_approved', title='Approved', message='Ok.') for _ in range(2)] +
+            [Notification(user_id=user_id, type='booking_approved', title='Old', message='Ok.', read=True)]
+        )
+        db.session.commit()
+    
+    def _post(self, client, path, payload=None):
+        return client.post(path, json=payload or {})
+    
+    def test_mark_by_type_uses_one_update(self, client, app, test_user, login, record_statements):
+        """Test marking a type read in a single statement and keeping the cached count."""
+        self._seed(test_user)
+        login(client)
+        assert get_unread_count(test_user) == 5
+        
+        with record_statements() as statements:
+            response = self._post(client, '/notifications/mark-read', {'type': 'new_message'})
+        
+        assert response.get_json() == {'success': True, 'count': 3}
+        assert len([s for s in statements if s.startswith('UPDATE notifications')]) == 1
+        assert get_unread_count(test_user) == 2
+    
+    def test_mark_by_ids_ignores_other_users(self, client, app, test_user, test_staff, login):
+        """Test that only the caller's own notifications are marked."""
+        self._seed(test_user)
+        self._seed(test_staff)
+        own = [n.id for n in Notification.query.filter_by(user_id=test_user, read=False).limit(2)]
+        other = Notification.query.filter_by(user_id=test_staff, read=False).first().id
+        login(client)
+        
+        response = self._post(client, '/notifications/mark-read', {'ids': own + [other]})
+        assert response.get_json()['count'] == 2
+        assert Notification.query.filter_by(user_id=test_staff, read=False).count() == 5
+    
+    def test_mark_all_and_delete_read_return_counts(self, client, app, test_user, login):
+        """Test mark-all-read and delete-read report affected rows."""
+        self._seed(test_user)
+        login(client)
+        
+        assert self._post(client, '/notifications/mark-all-read').get_json() == {'success': True, 'count': 5}
+        assert self._post(client, '/notifications/mark-all-read').get_json() == {'success': True, 'count': 0}
+        assert self._post(client, '/notifications/delete-read').get_json() == {'success': True, 'count': 6}
+        assert Notification.query.filter_by(user_id=test_user).count() == 0
+    
+    @pytest.mark.parametrize('payload', [{}, {'ids': 'all'}, {'ids': [1, 'two']}, {'ids': [True]}, {'type': ''}])
+    def test_invalid_requests_rejected(self, client, app, test_user, payload, login):
+        """Test that malformed bulk requests are rejected."""
+        login(client)
+        assert self._post(client, '/notifications/mark-read', payload).status_code == 400
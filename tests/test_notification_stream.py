@@ -0,0 +1,140 @@
+"""Tests for the notification pub/sub broker and Server-Sent Events stream."""
+import pytest
+from src.database import db
+from src.models import Notification
+from src.utils.notification_stream import NotificationBroker, SUBSCRIBER_QUEUE_SIZE, broker
+
+
+def _drain(subscriber):
+    events = []
+    while not subscriber.empty():
+        events.append(subscriber.get_nowait())
+    return events
+
+
+def _notification(user_id, title='Booking Approved'):
+    return Notification(user_id=user_id, type='booking_approved', title=title,
+                        message='Your booking was approved.', link='/bookings/', read=False)
+
+
+class TestNotificationBroker:
+    """Test the in-process fan-out."""
+    
+    def test_publish_reaches_every_subscriber_of_user(self):
+        """Test fan-out to all of a user's subscribers and no one else."""
+        test_broker = NotificationBroker()
+        first, second = test_broker.subscribe(1), test_broker.subscribe(1)
+        other = test_broker.subscribe(2)
+        
+        test_broker.publish(1, 'unread')
+        assert _drain(first) == [('unread', None)]
+        assert _drain(second) == [('unread', None)]
+        assert _drain(other) == []
+        
+        test_broker.unsubscribe(1, first)
+        test_broker.unsubscribe(1, second)
+        assert test_broker.subscriber_count(1) == 0
+        assert test_broker.subscriber_count() == 1
+    
+    def test_full_queue_collapses_to_resync(self):
+        """Test that a stalled subscriber gets a single resync instead of blocking publishers."""
+        test_broker = NotificationBroker()
+        subscriber = test_broker.subscribe(1)
+        for _ in range(SUBSCRIBER_QUEUE_SIZE + 5):
+            test_broker.publish(1, 'unread')
+        
+        # The 101st event replaced the backlog; the 4 after it queue up behind the resync
+        assert _drain(subscriber) == [('resync', None)] + [('unread', None)] * 4
+
+
+class TestNotificationEvents:
+    """Test that committed notification changes are published."""
+    
+    def test_new_notification_published_after_commit(self, app, test_user):
+        """Test that a notification is only published once its transaction commits."""
+        subscriber = broker.subscribe(test_user)
+        try:
+            db.session.add(_notification(test_user))
+            db.session.flush()
+            assert _drain(subscriber) == []
+            
+            db.session.commit()
+            events = _drain(subscriber)
+            assert len(events) == 1
+            event_type, data = events[0]
+            assert event_type == 'notification'
+            assert data['title'] == 'Booking Approved'
+            assert data['id'] is not None
+        finally:
+            broker.unsubscribe(test_user, subscriber)
+    
+    def test_rolled_back_notification_not_published(self, app, test_user):
+        """Test that rolled back notifications never reach subscribers."""
+        subscriber = broker.subscribe(test_user)
+        try:
+            db.session.add(_notification(test_user))
+            db.session.flush()
+            db.session.rollback()
+            db.session.commit()
+            assert _drain(subscriber) == []
+        finally:
+            broker.unsubscribe(test_user, subscriber)
+    
+    def test_marking_read_publishes_unread_change(self, app, test_user):
+        """Test that changing read state through the ORM publishes an unread event."""
+        notification = _notification(test_user)
+        db.session.add(notification)
+        db.session.commit()
+        
+        subscriber = broker.subscribe(test_user)
+        try:
+            notification.read = True
+            db.session.commit()
+            assert _drain(subscriber) == [('unread', None)]
+        finally:
+            broker.unsubscribe(test_user, subscriber)
+
+
+class TestNotificationStream:
+    """Test the /notifications/stream endpoint."""
+    
+    def test_stream_requires_login(self, client):
+        """Test that anonymous users are redirected to log in."""
+        assert client.get('/notifications/stream').status_code == 302
+    
+    def test_stream_pushes_notifications_and_counts(self, client, app, test_user, login):
+        """Test the initial count, pushed notifications and cleanup on close."""
+        app.config['NOTIFICATION_STREAM_HEARTBEAT'] = 0.05
+        app.config['NOTIFICATION_STREAM_MAX_AGE'] = 0.3
+        db.session.add(_notification(test_user, title='Earlier'))
+        db.session.commit()
+        
+        login(client)
+        response = client.get('/notifications/stream', buffered=False)
+        assert response.mimetype == 'text/event-stream'
+        assert broker.subscriber_count(test_user) == 1
+        
+        chunks = iter(response.response)
+        assert next(chunks) == b'retry: 5000\n\n'
+        assert next(chunks) == b'event: unread_count\ndata: {"count": 1}\n\n'
+        
+        db.session.add(_notification(test_user, title='Booking Approved'))
+        db.session.commit()
+        
+        body = b''.join(chunks).decode()
+        assert 'event: notification\ndata: {' in body and '"title": "Booking Approved"' in body
+        assert 'event: unread_count\ndata: {"count": 2}' in body
+        assert ': keep-alive' in body
+        assert broker.subscriber_count(test_user) == 0
+    
+    def test_pages_only_stream_in_single_process(self, client, app, test_user, login):
+        """Test that pages just poll unless the deployment is single-process."""
+        login(client)
+        html = client.get('/dashboard/').get_data(as_text=True)
+        assert 'new EventSource' not in html
+        assert 'setInterval(loadNotifications, 30000)' in html
+        
+        app.config['NOTIFICATION_STREAM_SINGLE_PROCESS'] = True
+        html = client.get('/dashboard/').get_data(as_text=True)
+        assert 'new EventSource' in html
+        assert 'setInterval(loadNotifications, 300000)' in html
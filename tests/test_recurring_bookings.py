@@ -0,0 +1,198 @@
+"""Tests for recurring booking expansion, conflict checking and series operations."""
+import pytest
+from datetime import datetime, timedelta, date
+from src.database import db
+from src.models import Booking, Notification, Resource
+from src.utils.recurrence import expand_occurrences, find_overlaps, MAX_OCCURRENCES
+from src.views.bookings import create_booking_series
+
+
+def _next_monday_at(hour):
+    today = datetime.utcnow().replace(hour=hour, minute=0, second=0, microsecond=0)
+    return today + timedelta(days=7 - today.weekday())
+
+
+class TestRecurrenceExpansion:
+    """Unit tests for expanding a series into occurrences."""
+    
+    def test_non_recurring_booking_has_one_occurrence(self):
+        """Test that 'none' yields just the original interval."""
+        start = datetime(2030, 1, 7, 10, 0)
+        assert expand_occurrences(start, start + timedelta(hours=1)) == [(start, start + timedelta(hours=1))]
+    
+    def test_weekly_expansion_by_count(self):
+        """Test weekly expansion limited by occurrence count."""
+        start = datetime(2030, 1, 7, 10, 0)
+        occurrences = expand_occurrences(start, start + timedelta(hours=1), 'weekly', count=3)
+        assert [s for s, _ in occurrences] == [start, start + timedelta(weeks=1), start + timedelta(weeks=2)]
+    
+    def test_daily_expansion_until_date_is_inclusive(self):
+        """Test daily expansion up to and including the end date."""
+        start = datetime(2030, 1, 7, 10, 0)
+        occurrences = expand_occurrences(start, start + timedelta(hours=1), 'daily', until=date(2030, 1, 11))
+        assert len(occurrences) == 5
+    
+    def test_expansion_is_capped(self):
+        """Test that series cannot grow past MAX_OCCURRENCES."""
+        start = datetime(2030, 1, 7, 10, 0)
+        occurrences = expand_occurrences(start, start + timedelta(hours=1), 'daily', count=1000)
+        assert len(occurrences) == MAX_OCCURRENCES
+    
+    def test_recurring_booking_requires_end(self):
+        """Test that a recurring booking needs an end date or count."""
+        start = datetime(2030, 1, 7, 10, 0)
+        with pytest.raises(ValueError):
+            expand_occurrences(start, start + timedelta(hours=1), 'weekly')
+    
+    def test_find_overlaps_sweep(self):
+        """Test the sorted sweep against unsorted and long existing intervals."""
+        base = datetime(2030, 1, 7, 10, 0)
+        occurrences = [(base + timedelta(days=i), base + timedelta(days=i, hours=1)) for i in range(5)]
+        existing = [
+            (base + timedelta(days=3, minutes=30), base + timedelta(days=3, hours=2)),  # overlaps day 3
+            (base - timedelta(days=1), base + timedelta(minutes=1)),                    # overlaps day 0
+            (base + timedelta(days=1, hours=1), base + timedelta(days=1, hours=2)),     # adjacent, no overlap
+        ]
+        assert find_overlaps(occurrences, existing) == [occurrences[0], occurrences[3]]
+
+
+class TestRecurringBookingRoutes:
+    """Integration tests for creating, cancelling and editing a series."""
+    
+    def _create_series(self, client, resource_id, start, count=4):
+        return client.post(f'/bookings/create/{resource_id}', data={
+            'date': start.strftime('%Y-%m-%d'),
+            'start_time': start.strftime('%H:%M'),
+            'end_time': (start + timedelta(hours=1)).strftime('%H:%M'),
+            'recurrence': 'weekly',
+            'recurrence_count': count
+        })
+    
+    def test_series_is_bulk_inserted_and_linked(self, client, app, test_user, test_resource, login):
+        """Test that all occurrences are created with one series id and counted."""
+        with app.app_context():
+            login(client)
+            start = _next_monday_at(10)
+            response = self._create_series(client, test_resource, start)
+            assert response.status_code == 302
+            
+            bookings = Booking.query.filter_by(resource_id=test_resource).order_by(Booking.start_time).all()
+            assert len(bookings) == 4
+            assert len({b.series_id for b in bookings}) == 1
+            assert bookings[0].series_id is not None
+            assert [b.start_time for b in bookings] == [start + timedelta(weeks=i) for i in range(4)]
+            assert Resource.query.get(test_resource).booking_count == 4
+    
+    def test_series_conflict_rejects_whole_series(self, client, app, test_user, test_resource, login):
+        """Test that one conflicting occurrence blocks the entire series."""
+        with app.app_context():
+            start = _next_monday_at(10)
+            db.session.add(Booking(
+                resource_id=test_resource,
+                user_id=test_user,
+                start_time=start + timedelta(weeks=2, minutes=30),
+                end_time=start + timedelta(weeks=2, hours=2),
+                status='approved'
+            ))
+            db.session.commit()
+            
+            login(client)
+            response = self._create_series(client, test_resource, start)
+            assert response.status_code == 200
+            assert b'conflicts with existing bookings' in response.data
+            assert Booking.query.filter_by(resource_id=test_resource).count() == 1
+    
+    def test_empty_series_is_rejected(self, client, app, test_user, test_resource, login):
+        """Test that a series with no occurrences is refused instead of inserting nothing."""
+        with app.app_context():
+            login(client)
+            start = _next_monday_at(10)
+            response = self._create_series(client, test_resource, start, count=0)
+            assert b'must be at least 1' in response.data
+            
+            response = client.post(f'/bookings/create/{test_resource}', data={
+                'date': start.strftime('%Y-%m-%d'),
+                'start_time': start.strftime('%H:%M'),
+                'end_time': (start + timedelta(hours=1)).strftime('%H:%M'),
+                'recurrence': 'daily',
+                'recurrence_until': (start - timedelta(days=1)).strftime('%Y-%m-%d')
+            })
+            assert response.status_code == 200
+            assert b'must not be before the booking date' in response.data
+            assert Booking.query.count() == 0
+            
+            with pytest.raises(ValueError):
+                create_booking_series(test_resource, test_user, [], 'approved', '', 'daily')
+    
+    def test_cancel_series_is_set_based(self, client, app, test_user, test_resource, login):
+        """Test that cancelling a series cancels every upcoming occurrence."""
+        with app.app_context():
+            login(client)
+            self._create_series(client, test_resource, _next_monday_at(10))
+            series_id = Booking.query.filter_by(resource_id=test_resource).first().series_id
+            
+            response = client.post(f'/bookings/series/{series_id}/cancel',
+                                   headers={'Content-Type': 'application/json'})
+            assert response.get_json() == {'success': True, 'cancelled_count': 4}
+            
+            db.session.expire_all()
+            statuses = {b.status for b in Booking.query.filter_by(series_id=series_id)}
+            assert statuses == {'cancelled'}
+            titles = [n.title for n in Notification.query.filter_by(type='booking_cancelled')]
+            assert titles == ['Booking Series Cancelled'] * 2
+    
+    def test_update_series_moves_all_occurrences(self, client, app, test_user, test_resource, login):
+        """Test moving a series to new times, ignoring its own occurrences as conflicts."""
+        with app.app_context():
+            login(client)
+            start = _next_monday_at(10)
+            self._create_series(client, test_resource, start)
+            series_id = Booking.query.filter_by(resource_id=test_resource).first().series_id
+            
+            response = client.post(f'/bookings/api/series/{series_id}',
+                                   json={'start_time': '10:30', 'end_time': '12:00', 'notes': 'Moved'})
+            assert response.get_json() == {'success': True, 'updated_count': 4}
+            
+            db.session.expire_all()
+            bookings = Booking.query.filter_by(series_id=series_id).order_by(Booking.start_time).all()
+            assert [b.start_time for b in bookings] == [start + timedelta(weeks=i, minutes=30) for i in range(4)]
+            assert all(b.end_time.hour == 12 and b.notes == 'Moved' for b in bookings)
+    
+    def test_update_series_reports_conflicts(self, client, app, test_user, test_resource, login):
+        """Test that moving a series onto another booking is rejected."""
+        with app.app_context():
+            login(client)
+            start = _next_monday_at(10)
+            self._create_series(client, test_resource, start)
+            series_id = Booking.query.filter_by(resource_id=test_resource).first().series_id
+            db.session.add(Booking(
+                resource_id=test_resource,
+                user_id=test_user,
+                start_time=start + timedelta(weeks=1, hours=3),
+                end_time=start + timedelta(weeks=1, hours=4),
+                status='approved'
+            ))
+            db.session.commit()
+            
+            response = client.post(f'/bookings/api/series/{series_id}',
+                                   json={'start_time': '13:00', 'end_time': '14:00'})
+            assert response.status_code == 409
+            assert len(response.get_json()['conflicts']) == 1
+    
+    def test_update_series_cannot_move_into_the_past(self, client, app, test_user, test_resource, login,
+                                                     make_booking):
+        """Test that moving today's occurrence to an earlier time of day is rejected."""
+        now = datetime.utcnow()
+        start = now.replace(second=0, microsecond=0) + timedelta(minutes=2)
+        if start.date() != now.date():
+            pytest.skip('No time left today for an upcoming occurrence')
+        make_booking(test_user, test_resource, start, hours=0.5, series_id='today')
+        make_booking(test_user, test_resource, start + timedelta(weeks=1), hours=0.5, series_id='today')
+        login(client)
+        
+        response = client.post('/bookings/api/series/today', json={'start_time': '00:00', 'end_time': '00:30'})
+        assert response.status_code == 400
+        assert response.get_json() == {'error': 'Cannot book in the past.'}
+        db.session.expire_all()
+        assert sorted(b.start_time for b in Booking.query.filter_by(series_id='today')) == \
+            [start, start + timedelta(weeks=1)]
@@ -0,0 +1,244 @@
+"""Integration tests for resource browsing, sorting and pagination."""
+import pytest
+from datetime import datetime, timedelta
+from src.database import db
+from src.models import Booking, Resource, ResourceEquipment
+
+
+@pytest.fixture
+def catalog(app, test_staff):
+    """Create a small catalog with ties in every sort key. Returns resource IDs."""
+    with app.app_context():
+        base_time = datetime(2025, 1, 1, 12, 0)
+        resource_ids = []
+        for i in range(7):
+            resource = Resource(
+                title=f'Room {i}',
+                description='A bookable room',
+                category='study-room' if i % 2 else 'event-space',
+                location=f'Building {i}',
+                capacity=4,
+                status='published',
+                owner_id=test_staff,
+                created_at=base_time + timedelta(hours=i // 2),
+                rating_sum=(i % 3) * 2,
+                review_count=1 if i % 3 else 0,
+                booking_count=i % 3
+            )
+            db.session.add(resource)
+            db.session.flush()
+            resource_ids.append(resource.id)
+        db.session.commit()
+        yield resource_ids
+
+
+def _walk_pages(client, **params):
+    """Follow next_cursor through every page of the browse API."""
+    ids = []
+    cursor = None
+    while True:
+        query = dict(params, per_page=2)
+        if cursor:
+            query['cursor'] = cursor
+        data = client.get('/resources/api/browse', query_string=query).get_json()
+        assert len(data['resources']) <= 2
+        ids.extend(r['id'] for r in data['resources'])
+        cursor = data['next_cursor']
+        if not cursor:
+            return ids
+
+
+class TestBrowsePagination:
+    """Test keyset pagination for every sort mode."""
+    
+    @pytest.mark.parametrize('sort_by', ['recent', 'rating', 'popular'])
+    def test_pages_cover_catalog_in_order(self, client, app, catalog, sort_by):
+        """Test that walking every page returns each resource exactly once, in order."""
+        with app.app_context():
+            ids = [rid for rid in _walk_pages(client, sort=sort_by) if rid in catalog]
+            assert sorted(ids) == sorted(catalog)
+            
+            resources = {r.id: r for r in Resource.query.all()}
+            key = {
+                'recent': lambda rid: resources[rid].created_at,
+                'rating': lambda rid: resources[rid].rating,
+                'popular': lambda rid: resources[rid].booking_count
+            }[sort_by]
+            assert ids == sorted(catalog, key=lambda rid: (key(rid), rid), reverse=True)
+    
+    def test_pages_respect_filters(self, client, app, catalog):
+        """Test that category filters apply across pages."""
+        with app.app_context():
+            ids = _walk_pages(client, category='study-room')
+            assert set(catalog[1::2]) <= set(ids)
+            assert not set(catalog[::2]) & set(ids)
+    
+    def test_invalid_cursor_rejected_by_api(self, client, catalog):
+        """Test that a malformed cursor returns a 400 from the JSON endpoint."""
+        response = client.get('/resources/api/browse?cursor=not-a-cursor')
+        assert response.status_code == 400
+    
+    def test_html_browse_links_next_page(self, client, catalog):
+        """Test that the HTML page renders a link to the next page."""
+        response = client.get('/resources/browse?per_page=2')
+        assert response.status_code == 200
+        assert b'Next page' in response.data
+        assert response.data.count(b'View Details') == 2
+
+
+@pytest.fixture
+def searchable(app, test_staff):
+    """Create resources with distinctive text for search tests. Returns resource IDs by key."""
+    with app.app_context():
+        data = {
+            'title': ('Zeppelin Projector Lounge', 'Quiet room', 'Building Q'),
+            'description': ('Quiet Room', 'Has a zeppelin poster on the wall', 'Building Q'),
+            'equipment': ('Media Room', 'Bring your own laptop', 'Building Q'),
+            'xss': ('<b>Zeppelin</b> Hall', '<script>alert(1)</script> zeppelin', 'Building Q'),
+        }
+        ids = {}
+        for key, (title, description, location) in data.items():
+            resource = Resource(
+                title=title,
+                description=description,
+                category='study-room',
+                location=location,
+                capacity=4,
+                status='published',
+                owner_id=test_staff
+            )
+            db.session.add(resource)
+            db.session.flush()
+            ids[key] = resource.id
+        db.session.add(ResourceEquipment(resource_id=ids['equipment'], equipment_name='Zeppelinscope'))
+        db.session.commit()
+        yield ids
+
+
+class TestBrowseSearch:
+    """Test full-text search in browse."""
+    
+    def _search(self, client, search, **params):
+        data = client.get('/resources/api/browse', query_string=dict(params, search=search)).get_json()
+        return data['resources']
+    
+    def test_prefix_search_matches_equipment(self, client, app, searchable):
+        """Test that partial words match titles, descriptions and equipment names."""
+        assert app.config['SEARCH_FTS_ENABLED']
+        ids = [r['id'] for r in self._search(client, 'zeppel')]
+        assert set(ids) == set(searchable.values())
+    
+    def test_title_matches_rank_above_description_matches(self, client, searchable):
+        """Test that results are ranked by relevance by default."""
+        ids = [r['id'] for r in self._search(client, 'zeppelin')]
+        assert ids.index(searchable['title']) < ids.index(searchable['description'])
+    
+    def test_search_index_follows_edits(self, app, client, searchable):
+        """Test that the index is kept in sync with resource and equipment changes."""
+        with app.app_context():
+            resource = Resource.query.get(searchable['title'])
+            resource.title = 'Renamed Lounge'
+            ResourceEquipment.query.filter_by(resource_id=searchable['equipment']).delete()
+            db.session.delete(Resource.query.get(searchable['xss']))
+            db.session.commit()
+        
+        ids = [r['id'] for r in self._search(client, 'zeppelin')]
+        assert ids == [searchable['description']]
+        assert [r['id'] for r in self._search(client, 'renamed')] == [searchable['title']]
+    
+    def test_snippets_are_highlighted_and_escaped(self, client, searchable):
+        """Test that snippets mark matches without letting stored HTML through."""
+        results = {r['id']: r for r in self._search(client, 'zeppelin')}
+        assert '<mark>zeppelin</mark>' in results[searchable['description']]['snippet']
+        assert '<script>' not in results[searchable['xss']]['snippet']
+        
+        response = client.get('/resources/browse?search=zeppelin')
+        assert b'<mark>' in response.data
+        assert b'<script>alert(1)</script>' not in response.data
+    
+    def test_search_operators_are_treated_as_text(self, client, searchable):
+        """Test that FTS5 syntax in user input does not cause errors."""
+        response = client.get('/resources/api/browse', query_string={'search': '"zeppelin OR NEAR( *'})
+        assert response.status_code == 200
+    
+    def test_like_fallback_without_fts(self, app, client, searchable):
+        """Test that search falls back to ILIKE when FTS5 is unavailable."""
+        app.config['SEARCH_FTS_ENABLED'] = False
+        results = self._search(client, 'zeppelin')
+        assert searchable['equipment'] not in [r['id'] for r in results]
+        assert searchable['title'] in [r['id'] for r in results]
+        assert all(r['snippet'] is None for r in results)
+
+
+class TestBrowseFreeBetween:
+    """Test the free-between, category and capacity filters."""
+    
+    def _browse(self, client, **params):
+        data = client.get('/resources/api/browse', query_string=params).get_json()
+        return [r['id'] for r in data['resources']]
+    
+    def test_booked_resources_are_excluded(self, client, app, catalog, test_user):
+        """Test that approved and pending bookings overlapping the window exclude a resource."""
+        day = datetime.utcnow().date() + timedelta(days=3)
+        start = datetime(day.year, day.month, day.day, 15)
+        db.session.add_all([
+            Booking(resource_id=catalog[1], user_id=test_user, status='approved',
+                    start_time=start - timedelta(minutes=30), end_time=start + timedelta(minutes=30)),
+            Booking(resource_id=catalog[3], user_id=test_user, status='pending',
+                    start_time=start + timedelta(minutes=45), end_time=start + timedelta(hours=2)),
+            Booking(resource_id=catalog[5], user_id=test_user, status='cancelled',
+                    start_time=start, end_time=start + timedelta(hours=1)),
+            Booking(resource_id=catalog[5], user_id=test_user, status='approved',
+                    start_time=start + timedelta(hours=1), end_time=start + timedelta(hours=2))
+        ])
+        db.session.commit()
+        
+        window = {'free_date': day.isoformat(), 'free_start': '15:00', 'free_end': '16:00'}
+        assert set(self._browse(client, category='study-room', **window)) == {catalog[5]}
+        assert set(self._browse(client, category='study-room')) == set(catalog[1::2])
+    
+    def test_opening_hours_and_capacity(self, client, app, catalog):
+        """Test that closed resources and resources that are too small are left out."""
+        resource = db.session.get(Resource, catalog[0])
+        resource.availability_rules = 'Mon-Fri 9AM-12PM'
+        db.session.get(Resource, catalog[2]).capacity = 12
+        db.session.commit()
+        
+        day = datetime.utcnow().date() + timedelta(days=3)
+        window = {'free_date': day.isoformat(), 'free_start': '15:00', 'free_end': '16:00'}
+        ids = self._browse(client, category='event-space', **window)
+        assert catalog[0] not in ids and catalog[2] in ids
+        assert self._browse(client, category='event-space', capacity=10) == [catalog[2]]
+    
+    def test_closed_resources_do_not_shorten_pages(self, client, app, catalog):
+        """Test that pages are topped up past closed resources and only the last page has no cursor."""
+        for resource_id in catalog[4:]:
+            db.session.get(Resource, resource_id).availability_rules = 'Mon-Fri 9AM-12PM'
+        db.session.commit()
+        
+        day = datetime.utcnow().date() + timedelta(days=3)
+        params = {'per_page': 2, 'free_date': day.isoformat(), 'free_start': '15:00', 'free_end': '16:00'}
+        first = client.get('/resources/api/browse', query_string=params).get_json()
+        assert [r['id'] for r in first['resources']] == [catalog[3], catalog[2]]
+        assert first['next_cursor']
+        
+        second = client.get('/resources/api/browse', query_string=dict(params, cursor=first['next_cursor'])).get_json()
+        assert [r['id'] for r in second['resources']] == [catalog[1], catalog[0]]
+        assert second['next_cursor'] is None
+    
+    def test_invalid_window(self, client, catalog):
+        """Test that the API rejects a malformed window and the page ignores it."""
+        window = {'free_date': '2030-01-01', 'free_start': '16:00', 'free_end': '15:00'}
+        assert client.get('/resources/api/browse', query_string=window).status_code == 400
+        response = client.get('/resources/browse', query_string=window)
+        assert response.status_code == 200
+        assert b'Invalid free time range' in response.data
+    
+    def test_html_links_keep_window(self, client, catalog):
+        """Test that next-page links carry the free-between filter."""
+        day = datetime.utcnow().date() + timedelta(days=3)
+        response = client.get('/resources/browse', query_string={
+            'per_page': 2, 'free_date': day.isoformat(), 'free_start': '15:00', 'free_end': '16:00'
+        })
+        assert b'Next page' in response.data
+        assert f'free_date={day.isoformat()}'.encode() in response.data
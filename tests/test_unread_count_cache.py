@@ -0,0 +1,158 @@
+"""Tests for the counter cache backends and the cached unread notification count."""
+import pytest
+from src.database import db
+from src.models import Notification
+from src.utils.cache import MemoryCache, NullCache, create_cache, get_cache
+from src.utils.notification_stream import _apply_to_cache, get_unread_count, unread_cache_key
+
+
+def _notification(user_id, read=False):
+    return Notification(user_id=user_id, type='new_message', title='New Message',
+                        message='You have a new message.', read=read)
+
+
+class TestMemoryCache:
+    """Test the in-process LRU/TTL backend."""
+    
+    def test_entries_expire(self, monkeypatch):
+        """Test that entries are dropped after the TTL."""
+        now = [1000.0]
+        monkeypatch.setattr('src.utils.cache.time.monotonic', lambda: now[0])
+        cache = MemoryCache(ttl=10)
+        cache.set('a', 1)
+        now[0] += 9
+        assert cache.get('a') == 1
+        now[0] += 2
+        assert cache.get('a') is None
+    
+    def test_least_recently_used_evicted(self):
+        """Test LRU eviction once maxsize is reached."""
+        cache = MemoryCache(maxsize=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        assert cache.get('a') == 1
+        assert cache.get('b') is None
+        assert cache.get('c') == 3
+    
+    def test_incr_only_updates_existing_keys(self):
+        """Test that incr never creates a partial value."""
+        cache = MemoryCache()
+        assert cache.incr('a', 1) is None
+        assert cache.get('a') is None
+        cache.set('a', 5)
+        assert cache.incr('a', -2) == 3
+    
+    def test_create_cache_from_url(self):
+        """Test backend selection by URL."""
+        assert isinstance(create_cache('memory://'), MemoryCache)
+        assert isinstance(create_cache('none'), NullCache)
+        with pytest.raises(ValueError):
+            create_cache('memcached://localhost')
+
+
+class TestUnreadCountCache:
+    """Test write-through maintenance of cached unread counts."""
+    
+    def test_count_served_from_cache(self, app, test_user, record_statements):
+        """Test that only the first lookup touches the database."""
+        db.session.add_all([_notification(test_user), _notification(test_user, read=True)])
+        db.session.commit()
+        
+        with record_statements() as statements:
+            get_unread_count(test_user)
+        assert statements
+        with record_statements() as statements:
+            assert get_unread_count(test_user) == 1
+        assert statements == []
+    
+    def test_new_notifications_increment_after_commit(self, app, test_user):
+        """Test that committed notifications increment the count and rolled back ones do not."""
+        assert get_unread_count(test_user) == 0
+        
+        db.session.add(_notification(test_user))
+        db.session.flush()
+        assert get_cache().get(unread_cache_key(test_user)) == 0
+        db.session.commit()
+        assert get_cache().get(unread_cache_key(test_user)) == 1
+        
+        db.session.add(_notification(test_user))
+        db.session.flush()
+        db.session.rollback()
+        assert get_unread_count(test_user) == 1
+    
+    def test_helpers_increment_count(self, app, test_user, record_statements):
+        """Test that notifications from the view helpers are counted."""
+        from src.utils.notifications import create_notification
+        assert get_unread_count(test_user) == 0
+        
+        create_notification(test_user, 'booking_approved', 'Booking Approved', 'Approved.')
+        db.session.commit()
+        with record_statements() as statements:
+            assert get_unread_count(test_user) == 1
+        assert statements == []
+    
+    def test_mark_read_routes_update_count(self, client, app, test_user, login):
+        """Test mark_read decrements and mark_all_read resets the cached count."""
+        notifications = [_notification(test_user) for _ in range(3)]
+        db.session.add_all(notifications)
+        db.session.commit()
+        first_id = notifications[0].id
+        
+        login(client)
+        assert client.get('/notifications/api/unread-count').get_json() == {'count': 3}
+        
+        client.post(f'/notifications/{first_id}/mark-read')
+        client.post(f'/notifications/{first_id}/mark-read')  # Already read: no change
+        assert client.get('/notifications/api/unread-count').get_json() == {'count': 2}
+        
+        client.post('/notifications/mark-all-read')
+        assert get_cache().get(unread_cache_key(test_user)) == 0
+        assert Notification.query.filter_by(user_id=test_user, read=False).count() == 0
+    
+    def test_mark_all_read_ignores_stale_cached_zero(self, client, app, test_user, login):
+        """Test that a stale zero from another process's cache does not skip the UPDATE."""
+        db.session.add_all([_notification(test_user) for _ in range(2)])
+        db.session.commit()
+        get_cache().set(unread_cache_key(test_user), 0)
+        
+        login(client)
+        response = client.post('/notifications/mark-all-read')
+        assert response.get_json() == {'success': True, 'count': 2}
+        assert Notification.query.filter_by(user_id=test_user, read=False).count() == 0
+        assert get_cache().get(unread_cache_key(test_user)) == 0
+    
+    def test_negative_count_is_dropped_without_rereading(self, app, test_user):
+        """Test that a decrement below zero drops the entry using the value incr returned."""
+        class ExpiringCache(MemoryCache):
+            """Cache whose entries have expired by the time they are read back."""
+            def get(self, key):
+                return None
+        
+        cache = ExpiringCache()
+        cache.set(unread_cache_key(test_user), 0)
+        _apply_to_cache(cache, test_user, ('incr', -1))
+        assert unread_cache_key(test_user) not in cache._data
+    
+    def test_endpoint_skips_database_when_cached(self, client, app, test_user, login, record_statements):
+        """Test that a warm unread-count request does not query notifications."""
+        db.session.add(_notification(test_user))
+        db.session.commit()
+        login(client)
+        client.get('/notifications/api/unread-count')
+        
+        with record_statements() as statements:
+            client.get('/notifications/api/unread-count')
+        assert not [s for s in statements if 'notifications' in s]
+    
+    def test_viewing_list_resets_count(self, client, app, test_user, login):
+        """Test that opening the notifications page marks everything read."""
+        db.session.add_all([_notification(test_user), _notification(test_user)])
+        db.session.commit()
+        login(client)
+        
+        assert client.get('/notifications/').status_code == 200
+        assert get_unread_count(test_user) == 0
+        db.session.expire_all()
+        assert Notification.query.filter_by(user_id=test_user, read=False).count() == 0